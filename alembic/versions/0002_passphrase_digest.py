@@ -0,0 +1,65 @@
+"""store passphrase digest instead of encrypted passphrase
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.tools.encryption import decrypt_data, digest_passphrase
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('secrets', sa.Column('passphrase_digest', sa.String(length=64), nullable=True))
+
+    # Переносим пароли: расшифровываем и сохраняем ключевой дайджест (пачками по id)
+    connection = op.get_bind()
+    secrets = sa.table(
+        'secrets',
+        sa.column('id', sa.Integer),
+        sa.column('encrypted_passphrase', sa.String),
+        sa.column('passphrase_digest', sa.String)
+    )
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(secrets.c.id, secrets.c.encrypted_passphrase)
+            .where(secrets.c.id > last_id, secrets.c.encrypted_passphrase.isnot(None))
+            .order_by(secrets.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        connection.execute(
+            secrets.update()
+            .where(secrets.c.id == sa.bindparam('b_id'))
+            .values(passphrase_digest=sa.bindparam('b_digest')),
+            [
+                {'b_id': row.id, 'b_digest': digest_passphrase(decrypt_data(row.encrypted_passphrase))}
+                for row in rows
+            ]
+        )
+        last_id = rows[-1].id
+
+    op.drop_column('secrets', 'encrypted_passphrase')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Пароль из дайджеста не восстановить: откат снял бы защиту паролем с существующих секретов
+    raise RuntimeError("Migration 0002 is irreversible: passphrases cannot be recovered from their digests.")
@@ -0,0 +1,54 @@
+"""add materialized expires_at with partial index for live secrets
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('secrets', sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True))
+
+    # Заполняем expires_at для существующих строк диапазонами id, чтобы не держать
+    # блокировку на всю таблицу одним UPDATE
+    connection = op.get_bind()
+    max_id = connection.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM secrets")).scalar_one()
+    for start in range(0, max_id + 1, BATCH_SIZE):
+        connection.execute(
+            sa.text(
+                "UPDATE secrets "
+                "SET expires_at = COALESCE(created_at, now()) + make_interval(secs => COALESCE(ttl_seconds, 3600)) "
+                "WHERE id > :start AND id <= :end AND expires_at IS NULL"
+            ),
+            {"start": start, "end": start + BATCH_SIZE}
+        )
+
+    op.alter_column('secrets', 'expires_at', nullable=False)
+    op.create_index(
+        'ix_secrets_expires_at_live',
+        'secrets',
+        ['expires_at'],
+        unique=False,
+        postgresql_where=sa.text('is_deleted = false AND is_accessed = false')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_secrets_expires_at_live', table_name='secrets')
+    op.drop_column('secrets', 'expires_at')
@@ -0,0 +1,41 @@
+"""add streamed secrets stored as encrypted chunks
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # server_default: существующие строки получают false без перезаписи таблицы
+    op.add_column(
+        'secrets',
+        sa.Column('is_streamed', sa.Boolean(), server_default=sa.false(), nullable=False)
+    )
+    op.create_table(
+        'secret_chunks',
+        sa.Column('secret_id', sa.Integer(), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['secret_id'], ['secrets.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('secret_id', 'seq')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('secret_chunks')
+    op.drop_column('secrets', 'is_streamed')
@@ -0,0 +1,147 @@
+"""partition secrets by expiry day
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.database.partitions import DEFAULT_PARTITION, day_bounds, partition_name
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+# Секции дней создаются на две недели вперёд; дальше их создаёт обслуживание (maintain_partitions).
+# Уже истёкшие строки и строки с большим TTL попадают в секцию по умолчанию
+PRECREATE_DAYS = 14
+
+COLUMNS = (
+    'id, encrypted_secret, passphrase_digest, ttl_seconds, secret_key, '
+    'created_at, expires_at, is_accessed, is_deleted, is_streamed'
+)
+
+
+def _copy_rows(connection, source: str, target: str) -> None:
+    # Перенос строк диапазонами id, чтобы не копировать таблицу одним запросом
+    max_id = connection.execute(sa.text(f"SELECT COALESCE(MAX(id), 0) FROM {source}")).scalar_one()
+    for start in range(0, max_id + 1, BATCH_SIZE):
+        connection.execute(
+            sa.text(
+                f"INSERT INTO {target} ({COLUMNS}) SELECT {COLUMNS} FROM {source} "
+                "WHERE id > :start AND id <= :end"
+            ),
+            {"start": start, "end": start + BATCH_SIZE}
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Внешний ключ на секционированную таблицу должен включать ключ секционирования,
+    # а журнал и сегменты должны переживать удаление секции: внешние ключи удаляются
+    op.drop_constraint('secret_logs_secret_id_fkey', 'secret_logs', type_='foreignkey')
+    op.drop_constraint('secret_chunks_secret_id_fkey', 'secret_chunks', type_='foreignkey')
+
+    # Старая таблица переименовывается; последовательность id переходит к новой таблице
+    op.drop_index('ix_secrets_expires_at_live', table_name='secrets')
+    op.drop_index('ix_secrets_secret_key', table_name='secrets')
+    op.drop_index('ix_secrets_id', table_name='secrets')
+    op.execute("ALTER TABLE secrets RENAME TO secrets_legacy")
+    op.execute("ALTER TABLE secrets_legacy RENAME CONSTRAINT secrets_pkey TO secrets_legacy_pkey")
+    op.execute("ALTER SEQUENCE secrets_id_seq OWNED BY NONE")
+
+    op.create_table(
+        'secrets',
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('secrets_id_seq')"), nullable=False),
+        sa.Column('encrypted_secret', sa.String(), nullable=False),
+        sa.Column('passphrase_digest', sa.String(length=64), nullable=True),
+        sa.Column('ttl_seconds', sa.Integer(), nullable=True),
+        sa.Column('secret_key', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('is_accessed', sa.Boolean(), nullable=True),
+        sa.Column('is_deleted', sa.Boolean(), nullable=True),
+        sa.Column('is_streamed', sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.PrimaryKeyConstraint('id', 'expires_at'),
+        postgresql_partition_by='RANGE (expires_at)'
+    )
+    op.execute("ALTER SEQUENCE secrets_id_seq OWNED BY secrets.id")
+    op.create_index('ix_secrets_secret_key', 'secrets', ['secret_key'], unique=False)
+    op.create_index(
+        'ix_secrets_expires_at_live',
+        'secrets',
+        ['expires_at'],
+        unique=False,
+        postgresql_where=sa.text('is_deleted = false AND is_accessed = false')
+    )
+
+    op.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF secrets DEFAULT")
+    today = datetime.now(timezone.utc).date()
+    for offset in range(PRECREATE_DAYS + 1):
+        day = today + timedelta(days=offset)
+        start, end = day_bounds(day)
+        op.execute(
+            f"CREATE TABLE {partition_name(day)} PARTITION OF secrets "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+    # Ключи существующих секретов не содержат дня: поиск по ним просматривает все секции,
+    # пока эти секреты не истекут
+    _copy_rows(op.get_bind(), 'secrets_legacy', 'secrets')
+    op.drop_table('secrets_legacy')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE secrets RENAME TO secrets_partitioned")
+    op.execute("ALTER TABLE secrets_partitioned RENAME CONSTRAINT secrets_pkey TO secrets_partitioned_pkey")
+    op.drop_index('ix_secrets_expires_at_live', table_name='secrets_partitioned')
+    op.drop_index('ix_secrets_secret_key', table_name='secrets_partitioned')
+    op.execute("ALTER SEQUENCE secrets_id_seq OWNED BY NONE")
+
+    op.create_table(
+        'secrets',
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('secrets_id_seq')"), nullable=False),
+        sa.Column('encrypted_secret', sa.String(), nullable=False),
+        sa.Column('passphrase_digest', sa.String(length=64), nullable=True),
+        sa.Column('ttl_seconds', sa.Integer(), nullable=True),
+        sa.Column('secret_key', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('is_accessed', sa.Boolean(), nullable=True),
+        sa.Column('is_deleted', sa.Boolean(), nullable=True),
+        sa.Column('is_streamed', sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("ALTER SEQUENCE secrets_id_seq OWNED BY secrets.id")
+
+    connection = op.get_bind()
+    _copy_rows(connection, 'secrets_partitioned', 'secrets')
+    op.execute("DROP TABLE secrets_partitioned CASCADE")
+
+    op.create_index('ix_secrets_id', 'secrets', ['id'], unique=False)
+    op.create_index('ix_secrets_secret_key', 'secrets', ['secret_key'], unique=True)
+    op.create_index(
+        'ix_secrets_expires_at_live',
+        'secrets',
+        ['expires_at'],
+        unique=False,
+        postgresql_where=sa.text('is_deleted = false AND is_accessed = false')
+    )
+
+    # Записи журнала и сегменты секретов из удалённых секций больше не на что ссылаются
+    op.execute("UPDATE secret_logs SET secret_id = NULL WHERE secret_id NOT IN (SELECT id FROM secrets)")
+    op.execute("DELETE FROM secret_chunks WHERE secret_id NOT IN (SELECT id FROM secrets)")
+    op.create_foreign_key('secret_logs_secret_id_fkey', 'secret_logs', 'secrets', ['secret_id'], ['id'])
+    op.create_foreign_key(
+        'secret_chunks_secret_id_fkey', 'secret_chunks', 'secrets', ['secret_id'], ['id'], ondelete='CASCADE'
+    )
@@ -0,0 +1,109 @@
+"""partition secret_logs by month
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.database.partitions import LOG_DEFAULT_PARTITION, add_months, log_partition_name, month_bounds, month_start
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+# Секции создаются для всех месяцев с записями и на два месяца вперёд; дальше их создаёт
+# обслуживание (maintain_log_partitions)
+PRECREATE_MONTHS = 2
+
+COLUMNS = 'id, secret_id, secret_key, action, ip_address, created_at'
+
+
+def _copy_rows(connection, source: str, target: str) -> None:
+    # Перенос строк диапазонами id; записи без времени получают время миграции
+    max_id = connection.execute(sa.text(f"SELECT COALESCE(MAX(id), 0) FROM {source}")).scalar_one()
+    for start in range(0, max_id + 1, BATCH_SIZE):
+        connection.execute(
+            sa.text(
+                f"INSERT INTO {target} ({COLUMNS}) "
+                "SELECT id, secret_id, secret_key, action, ip_address, COALESCE(created_at, now()) "
+                f"FROM {source} WHERE id > :start AND id <= :end"
+            ),
+            {"start": start, "end": start + BATCH_SIZE}
+        )
+
+
+def _create_table(name: str, partitioned: bool) -> None:
+    op.create_table(
+        name,
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('secret_logs_id_seq')"), nullable=False),
+        sa.Column('secret_id', sa.Integer(), nullable=True),
+        sa.Column('secret_key', sa.String(), nullable=True),
+        sa.Column('action', sa.String(), nullable=True),
+        sa.Column('ip_address', sa.String(), nullable=True),
+        sa.Column(
+            'created_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now() if partitioned else None,
+            nullable=not partitioned
+        ),
+        sa.PrimaryKeyConstraint(*(('id', 'created_at') if partitioned else ('id',))),
+        **({'postgresql_partition_by': 'RANGE (created_at)'} if partitioned else {})
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('ix_secret_logs_secret_key', table_name='secret_logs')
+    op.drop_index('ix_secret_logs_id', table_name='secret_logs')
+    op.execute("ALTER TABLE secret_logs RENAME TO secret_logs_legacy")
+    op.execute("ALTER TABLE secret_logs_legacy RENAME CONSTRAINT secret_logs_pkey TO secret_logs_legacy_pkey")
+    op.execute("ALTER SEQUENCE secret_logs_id_seq OWNED BY NONE")
+
+    # Первичный ключ секционированной таблицы включает created_at; отдельный индекс по id не нужен
+    _create_table('secret_logs', partitioned=True)
+    op.execute("ALTER SEQUENCE secret_logs_id_seq OWNED BY secret_logs.id")
+    op.create_index('ix_secret_logs_secret_key', 'secret_logs', ['secret_key'], unique=False)
+
+    connection = op.get_bind()
+    current_month = month_start(datetime.now(timezone.utc).date())
+    oldest = connection.execute(sa.text("SELECT MIN(created_at) FROM secret_logs_legacy")).scalar_one()
+    month = month_start(oldest.astimezone(timezone.utc).date()) if oldest is not None else current_month
+    op.execute(f"CREATE TABLE {LOG_DEFAULT_PARTITION} PARTITION OF secret_logs DEFAULT")
+    while month <= add_months(current_month, PRECREATE_MONTHS):
+        start, end = month_bounds(month)
+        op.execute(
+            f"CREATE TABLE {log_partition_name(month)} PARTITION OF secret_logs "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        month = add_months(month, 1)
+
+    _copy_rows(connection, 'secret_logs_legacy', 'secret_logs')
+    op.drop_table('secret_logs_legacy')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE secret_logs RENAME TO secret_logs_partitioned")
+    op.execute("ALTER TABLE secret_logs_partitioned RENAME CONSTRAINT secret_logs_pkey TO secret_logs_partitioned_pkey")
+    op.drop_index('ix_secret_logs_secret_key', table_name='secret_logs_partitioned')
+    op.execute("ALTER SEQUENCE secret_logs_id_seq OWNED BY NONE")
+
+    _create_table('secret_logs', partitioned=False)
+    op.execute("ALTER SEQUENCE secret_logs_id_seq OWNED BY secret_logs.id")
+
+    # Секции, уже удалённые по сроку хранения, остаются только в архиве
+    _copy_rows(op.get_bind(), 'secret_logs_partitioned', 'secret_logs')
+    op.execute("DROP TABLE secret_logs_partitioned CASCADE")
+
+    op.create_index('ix_secret_logs_id', 'secret_logs', ['id'], unique=False)
+    op.create_index('ix_secret_logs_secret_key', 'secret_logs', ['secret_key'], unique=False)
@@ -0,0 +1,40 @@
+"""purge payload of consumed and deleted secrets
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Данные прочитанных, удалённых и истёкших секретов очищаются (NULL)
+    op.alter_column('secrets', 'encrypted_secret', existing_type=sa.String(), nullable=True)
+    # Строки, оставшиеся с данными, очищает уплотнение (app/tools/compaction.py) пачками
+    op.create_index(
+        'ix_secrets_dead_payload',
+        'secrets',
+        ['id'],
+        unique=False,
+        postgresql_where=sa.text('(is_accessed = true OR is_deleted = true) AND encrypted_secret IS NOT NULL')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_secrets_dead_payload', table_name='secrets')
+    # Очищенные данные не восстановить: прочитанные и удалённые секреты получают пустую строку
+    op.execute("UPDATE secrets SET encrypted_secret = '' WHERE encrypted_secret IS NULL")
+    op.alter_column('secrets', 'encrypted_secret', existing_type=sa.String(), nullable=False)
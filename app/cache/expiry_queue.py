@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Iterable, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # Только для аннотаций: клиент Redis загружается при создании пула (init_redis)
+    import redis.asyncio as redis
+
+
+# Очередь истечения: sorted set, где member — ключ секрета, score — время истечения (unix time)
+EXPIRY_QUEUE_KEY = "secrets:expiry"
+
+# Атомарное извлечение наступивших элементов: ZRANGEBYSCORE + ZREM в одном скрипте,
+# поэтому один и тот же ключ не достанется двум воркерам
+POP_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+return due
+"""
+
+_pop_due_script = None
+
+
+def _get_pop_due_script(redis_client: redis.Redis):
+    global _pop_due_script
+    if _pop_due_script is None or _pop_due_script.registered_client is not redis_client:
+        _pop_due_script = redis_client.register_script(POP_DUE_SCRIPT)
+    return _pop_due_script
+
+
+def schedule_expiry(client, secret_key: str, expires_at: datetime):
+    """
+    Добавление ключа секрета в очередь истечения.
+
+    Параметры:
+        - client: Клиент Redis или конвейер (pipeline), в который добавляется команда.
+        - secret_key (str): Уникальный ключ секрета.
+        - expires_at (datetime): Время истечения секрета.
+    """
+    return client.zadd(EXPIRY_QUEUE_KEY, {secret_key: expires_at.timestamp()})
+
+
+def unschedule_expiry(client, secret_keys: Iterable[str]):
+    """
+    Удаление ключей из очереди истечения (секрет прочитан или удалён раньше срока).
+
+    Параметры:
+        - client: Клиент Redis или конвейер (pipeline), в который добавляется команда.
+        - secret_keys (Iterable[str]): Уникальные ключи секретов.
+    """
+    return client.zrem(EXPIRY_QUEUE_KEY, *secret_keys)
+
+
+async def pop_due_secrets(redis_client: redis.Redis, now: float, limit: int) -> List[str]:
+    """
+    Извлечение из очереди ключей секретов, срок которых наступил.
+
+    Параметры:
+        - redis_client (redis.Redis): Клиент Redis.
+        - now (float): Текущее время (unix time); извлекаются элементы со score <= now.
+        - limit (int): Максимальное количество извлекаемых ключей.
+
+    Возвращает:
+        - List[str]: Ключи секретов (извлечённые элементы удалены из очереди).
+    """
+    return await _get_pop_due_script(redis_client)(keys=[EXPIRY_QUEUE_KEY], args=[now, limit])
+
+
+async def restore_due_secrets(redis_client: redis.Redis, secret_keys: Iterable[str], due_at: float) -> int:
+    """
+    Возврат извлечённых ключей в очередь (если их не удалось обработать).
+
+    Параметры:
+        - redis_client (redis.Redis): Клиент Redis.
+        - secret_keys (Iterable[str]): Ключи секретов.
+        - due_at (float): Время повторной обработки (unix time).
+    """
+    return await redis_client.zadd(EXPIRY_QUEUE_KEY, {secret_key: due_at for secret_key in secret_keys})
+
+
+async def get_expiry_queue_stats(redis_client: redis.Redis, now: float) -> dict:
+    """
+    Размер очереди истечения и количество элементов, срок которых уже наступил.
+    """
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.zcard(EXPIRY_QUEUE_KEY)
+        pipe.zcount(EXPIRY_QUEUE_KEY, "-inf", now)
+        size, due = await pipe.execute()
+    return {"scheduled": size, "due": due}
@@ -1,22 +1,150 @@
-import redis
+from __future__ import annotations
+
+import time
+from typing import Dict, Optional, TYPE_CHECKING
+
 from fastapi import HTTPException
 
+from ..config import app_config_instance
 from ..tools.logger_config import setup_logger
+from ..tools.metrics import register_collector
+
+if TYPE_CHECKING:
+    # Клиент Redis загружается при создании пула (init_redis), а не при импорте
+    import redis.asyncio as redis
 
 logger = setup_logger(__name__)
 
-def get_redis_client():
+# Единственный на процесс пул соединений и клиент Redis.
+# Создаются и закрываются lifespan-менеджером приложения (см. get_lifespan).
+_redis_pool: Optional[redis.BlockingConnectionPool] = None
+_redis_client: Optional[redis.Redis] = None
+
+
+async def init_redis() -> redis.Redis:
+    """
+    Создание пула соединений и клиента Redis.
+
+    Повторный вызов возвращает уже созданный клиент.
+
+    Возвращает:
+        - redis.Redis: Асинхронный клиент Redis, работающий поверх общего пула.
+    """
+    global _redis_pool, _redis_client
+
+    if _redis_client is not None:
+        return _redis_client
+
+    import redis.asyncio as redis
+
+    # BlockingConnectionPool при исчерпании пула ждёт освобождения соединения
+    # (не дольше REDIS_POOL_TIMEOUT), а не открывает новые соединения без ограничений
+    _redis_pool = redis.BlockingConnectionPool(
+        host=app_config_instance.REDIS_HOST,
+        port=app_config_instance.REDIS_PORT,
+        db=app_config_instance.REDIS_DB,
+        max_connections=app_config_instance.REDIS_MAX_CONNECTIONS,
+        timeout=app_config_instance.REDIS_POOL_TIMEOUT,
+        socket_timeout=app_config_instance.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=app_config_instance.REDIS_SOCKET_CONNECT_TIMEOUT,
+        health_check_interval=app_config_instance.REDIS_HEALTH_CHECK_INTERVAL,
+        decode_responses=True
+    )
+    _redis_client = redis.Redis(connection_pool=_redis_pool)
+    logger.info(
+        "Redis pool created: %s:%s, max_connections=%s",
+        app_config_instance.REDIS_HOST, app_config_instance.REDIS_PORT, app_config_instance.REDIS_MAX_CONNECTIONS
+    )
+    return _redis_client
+
+
+async def close_redis() -> None:
+    """
+    Закрытие клиента и всех соединений пула Redis.
+    """
+    global _redis_pool, _redis_client
+
+    if _redis_client is not None:
+        await _redis_client.aclose()
+    if _redis_pool is not None:
+        await _redis_pool.disconnect()
+        logger.info("Redis pool closed")
+
+    _redis_pool = None
+    _redis_client = None
+
+
+def get_redis_client() -> redis.Redis:
+    """
+    Получение общего клиента Redis.
+
+    Возвращает:
+        - redis.Redis: Асинхронный клиент Redis.
+
+    Вызывает:
+        - HTTPException (500): Если пул ещё не создан (приложение не запущено).
+    """
+    if _redis_client is None:
+        logger.error("Redis client is not initialized")
+        raise HTTPException(status_code=500, detail="Redis client is not initialized")
+    return _redis_client
+
+
+def get_redis_pool_stats() -> Dict[str, int | bool]:
+    """
+    Статистика пула соединений Redis.
+
+    Возвращает:
+        - Dict[str, int | bool]: Размер пула, количество занятых и свободных соединений.
+    """
+    if _redis_pool is None:
+        return {"initialized": False}
+
+    in_use = len(_redis_pool._in_use_connections)
+    idle = len(_redis_pool._available_connections)
+    return {
+        "initialized": True,
+        "max_connections": _redis_pool.max_connections,
+        "in_use_connections": in_use,
+        "idle_connections": idle,
+        "free_slots": _redis_pool.max_connections - in_use
+    }
+
+
+def _pool_metrics() -> Dict[tuple, int]:
+    stats = get_redis_pool_stats()
+    if not stats["initialized"]:
+        return {}
+    return {
+        ("max",): stats["max_connections"],
+        ("in_use",): stats["in_use_connections"],
+        ("idle",): stats["idle_connections"]
+    }
+
+
+register_collector("redis_pool_connections", "Redis connection pool state.", ("state",), _pool_metrics)
+
+
+async def check_redis_health() -> Dict[str, int | float | bool | str]:
+    """
+    Проверка доступности Redis (PING) вместе со статистикой пула.
+
+    Возвращает:
+        - Dict[str, int | float | bool | str]: Статус, задержка PING (мс) и статистика пула.
+    """
+    stats = get_redis_pool_stats()
+    if _redis_client is None:
+        return {"status": "down", **stats}
+
+    started = time.perf_counter()
     try:
-        redis_client = redis.Redis(
-            host="redis",
-            port=6379,
-            decode_responses=True
-        )
-        if not redis_client.ping():
-            logger.error("Could not connect to Redis")
-            raise HTTPException(status_code=500, detail="Could not connect to Redis")
-        logger.info("Successfully connected to Redis")
-        return redis_client
+        await _redis_client.ping()
     except Exception as e:
-        logger.error(f"Redis connection error: {e}")
-        raise HTTPException(status_code=500, detail=f"Redis connection error: {str(e)}")
\ No newline at end of file
+        logger.error("Redis health check failed: %s", e)
+        return {"status": "down", "error": str(e), **stats}
+
+    return {
+        "status": "ok",
+        "ping_ms": round((time.perf_counter() - started) * 1000, 3),
+        **stats
+    }
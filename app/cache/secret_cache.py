@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Iterable, Optional, TYPE_CHECKING, Tuple
+
+from ..config import app_config_instance
+from ..tools.profiling import SPAN_REDIS, profiled
+from .expiry_queue import EXPIRY_QUEUE_KEY, schedule_expiry, unschedule_expiry
+
+if TYPE_CHECKING:
+    # Только для аннотаций: клиент Redis загружается при создании пула (init_redis)
+    import redis.asyncio as redis
+
+# Время жизни записи в кеше (не больше TTL самого секрета)
+CACHE_TTL_SECONDS = app_config_instance.CACHE_TTL_SECONDS
+
+# Секрет и дайджест пароля хранятся вместе в одном хеше:
+# secret:<secret_key> -> {secret, passphrase_digest}
+SECRET_FIELD = "secret"
+PASSPHRASE_DIGEST_FIELD = "passphrase_digest"
+
+# Результаты атомарного чтения записи из кеша
+CONSUME_OK = "ok"
+CONSUME_INVALID_PASSPHRASE = "invalid_passphrase"
+CONSUME_PASSPHRASE_NOT_SET = "passphrase_not_set"
+CONSUME_TOMBSTONE = "tombstone"
+
+# Надгробия: короткоживущие отметки о прочитанных, удалённых и истёкших секретах.
+# Повторные запросы по такому ключу получают ответ без обращения к БД.
+# tombstone:<secret_key> -> состояние секрета
+TOMBSTONE_ACCESSED = "accessed"
+TOMBSTONE_DELETED = "deleted"
+TOMBSTONE_EXPIRED = "expired"
+
+# Атомарная проверка пароля и чтение с удалением (GETDEL для хеша):
+# запись удаляется только при верном пароле, и между проверкой и удалением
+# никакой другой клиент не может получить ту же запись.
+# ARGV[1] — дайджест пароля из запроса ('' — пароль не передан).
+# Прочитанный секрет заодно убирается из очереди истечения (KEYS[2], ARGV[2] — ключ секрета).
+# Если записи в кеше нет, в том же вызове проверяется надгробие (KEYS[3]).
+# Надгробие прочитанного секрета здесь не ставится: секрет считается прочитанным только после
+# пометки в БД, которая может не пройти (секрет удалён или истёк, а запись в кеше осталась).
+# Сравниваются ключевые дайджесты (HMAC), а не сами пароли, поэтому время
+# сравнения в Lua не раскрывает ничего полезного о пароле.
+# Записи прежнего формата (с зашифрованным паролем) считаются промахом кеша:
+# решение принимается по данным БД.
+CONSUME_SCRIPT = """
+local secret = redis.call('HGET', KEYS[1], 'secret')
+if not secret or redis.call('HEXISTS', KEYS[1], 'passphrase') == 1 then
+    local state = redis.call('GET', KEYS[3])
+    if state then
+        return {'tombstone', state}
+    end
+    return nil
+end
+local expected = redis.call('HGET', KEYS[1], 'passphrase_digest') or ''
+if expected ~= ARGV[1] then
+    if expected == '' then
+        return {'passphrase_not_set'}
+    end
+    return {'invalid_passphrase'}
+end
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', KEYS[2], ARGV[2])
+return {'ok', secret}
+"""
+
+# Перезапись полей только существующей записи: если запись уже прочитана
+# или удалена, она не должна «воскреснуть»
+REWRITE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV))
+return 1
+"""
+
+_consume_script = None
+_rewrite_script = None
+
+# Счётчики обращений к надгробиям (на процесс) для подбора TOMBSTONE_TTL_SECONDS
+_tombstone_stats = {"hits": 0, "misses": 0}
+
+
+def secret_cache_key(secret_key: str) -> str:
+    """
+    Ключ Redis, под которым хранится секрет вместе с паролем.
+    """
+    return f"secret:{secret_key}"
+
+
+def tombstone_key(secret_key: str) -> str:
+    """
+    Ключ Redis надгробия секрета.
+    """
+    return f"tombstone:{secret_key}"
+
+
+def _count_tombstone_lookup(state: Optional[str]) -> None:
+    _tombstone_stats["hits" if state else "misses"] += 1
+
+
+def _get_consume_script(redis_client: redis.Redis):
+    """
+    Регистрация Lua-скрипта (один раз на клиент): дальше он вызывается через EVALSHA.
+    """
+    global _consume_script
+    if _consume_script is None or _consume_script.registered_client is not redis_client:
+        _consume_script = redis_client.register_script(CONSUME_SCRIPT)
+    return _consume_script
+
+
+def _get_rewrite_script(redis_client: redis.Redis):
+    global _rewrite_script
+    if _rewrite_script is None or _rewrite_script.registered_client is not redis_client:
+        _rewrite_script = redis_client.register_script(REWRITE_SCRIPT)
+    return _rewrite_script
+
+
+@profiled(SPAN_REDIS)
+async def cache_secret(
+        redis_client: redis.Redis,
+        secret_key: str,
+        encrypted_secret: str,
+        passphrase_digest: Optional[str],
+        ttl_seconds: Optional[int] = None,
+        expires_at: Optional[datetime] = None
+) -> None:
+    """
+    Сохранение зашифрованного секрета и дайджеста пароля в кеше одной транзакцией (HSET + EXPIRE).
+    Если передано время истечения, в той же транзакции секрет ставится в очередь истечения (ZADD).
+
+    Параметры:
+        - redis_client (redis.Redis): Клиент Redis.
+        - secret_key (str): Уникальный ключ секрета.
+        - encrypted_secret (str): Зашифрованный секрет.
+        - passphrase_digest (Optional[str]): Дайджест пароля (если есть).
+        - ttl_seconds (Optional[int]): TTL секрета; запись в кеше не переживёт сам секрет.
+        - expires_at (Optional[datetime]): Время истечения секрета для очереди истечения.
+    """
+    async with redis_client.pipeline(transaction=True) as pipe:
+        _queue_cache_write(pipe, secret_key, encrypted_secret, passphrase_digest, ttl_seconds, expires_at)
+        await pipe.execute()
+
+
+@profiled(SPAN_REDIS)
+async def cache_secrets(redis_client: redis.Redis, secrets: Iterable) -> None:
+    """
+    Сохранение пачки секретов в кеше одним конвейером (за один обмен с Redis).
+
+    Параметры:
+        - redis_client (redis.Redis): Клиент Redis.
+        - secrets (Iterable): Объекты с полями secret_key, encrypted_secret,
+          passphrase_digest, ttl_seconds и expires_at (например, models.Secret).
+    """
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for secret in secrets:
+            _queue_cache_write(
+                pipe,
+                secret.secret_key,
+                secret.encrypted_secret,
+                secret.passphrase_digest,
+                secret.ttl_seconds,
+                secret.expires_at
+            )
+        await pipe.execute()
+
+
+def _queue_cache_write(
+        pipe,
+        secret_key: str,
+        encrypted_secret: str,
+        passphrase_digest: Optional[str],
+        ttl_seconds: Optional[int],
+        expires_at: Optional[datetime]
+) -> None:
+    mapping = {SECRET_FIELD: encrypted_secret}
+    if passphrase_digest:
+        mapping[PASSPHRASE_DIGEST_FIELD] = passphrase_digest
+
+    expire = min(CACHE_TTL_SECONDS, ttl_seconds) if ttl_seconds else CACHE_TTL_SECONDS
+    key = secret_cache_key(secret_key)
+
+    pipe.hset(key, mapping=mapping)
+    pipe.expire(key, expire)
+    if expires_at is not None:
+        schedule_expiry(pipe, secret_key, expires_at)
+
+
+@profiled(SPAN_REDIS)
+async def consume_cached_secret(
+        redis_client: redis.Redis,
+        secret_key: str,
+        passphrase_digest: Optional[str]
+) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    Атомарная проверка пароля и получение с удалением записи из кеша за один запрос к Redis.
+
+    Параметры:
+        - redis_client (redis.Redis): Клиент Redis.
+        - secret_key (str): Уникальный ключ секрета.
+        - passphrase_digest (Optional[str]): Дайджест пароля из запроса.
+
+    Возвращает:
+        - Optional[Tuple[str, Optional[str]]]:
+            - None: Записи нет в кеше.
+            - (CONSUME_OK, encrypted_secret): Пароль верен, запись удалена из кеша.
+            - (CONSUME_INVALID_PASSPHRASE, None) / (CONSUME_PASSPHRASE_NOT_SET, None):
+              Пароль не подошёл, запись осталась в кеше.
+            - (CONSUME_TOMBSTONE, state): Записи нет, но секрет уже прочитан, удалён или истёк.
+    """
+    result = await _get_consume_script(redis_client)(
+        keys=[secret_cache_key(secret_key), EXPIRY_QUEUE_KEY, tombstone_key(secret_key)],
+        args=[passphrase_digest or "", secret_key]
+    )
+    if not result:
+        _count_tombstone_lookup(None)
+        return None
+    status = result[0]
+    if status == CONSUME_TOMBSTONE:
+        _count_tombstone_lookup(result[1])
+        return status, result[1]
+    return status, (result[1] if status == CONSUME_OK else None)
+
+
+@profiled(SPAN_REDIS)
+async def evict_cached_secrets(
+        redis_client: redis.Redis,
+        secret_keys: Iterable[str],
+        tombstone: Optional[str] = None
+) -> int:
+    """
+    Удаление записей из кеша одной командой UNLINK (и ключей из очереди истечения — в том же конвейере).
+    Если передано состояние, в том же конвейере ставятся надгробия.
+
+    Параметры:
+        - redis_client (redis.Redis): Клиент Redis.
+        - secret_keys (Iterable[str]): Уникальные ключи секретов.
+        - tombstone (Optional[str]): Состояние для надгробий (TOMBSTONE_DELETED / TOMBSTONE_EXPIRED).
+
+    Возвращает:
+        - int: Количество удалённых записей.
+    """
+    secret_keys = list(secret_keys)
+    if not secret_keys:
+        return 0
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.unlink(*(secret_cache_key(secret_key) for secret_key in secret_keys))
+        unschedule_expiry(pipe, secret_keys)
+        if tombstone:
+            _set_tombstones(pipe, secret_keys, tombstone)
+        removed, *_ = await pipe.execute()
+    return removed
+
+
+def _set_tombstones(pipe, secret_keys: Iterable[str], state: str) -> None:
+    ttl = app_config_instance.TOMBSTONE_TTL_SECONDS
+    if ttl <= 0:
+        return
+    for secret_key in secret_keys:
+        pipe.set(tombstone_key(secret_key), state, ex=ttl)
+
+
+@profiled(SPAN_REDIS)
+async def set_tombstone(redis_client: redis.Redis, secret_key: str, state: str) -> None:
+    """
+    Установка надгробия для одного секрета (например, когда исход определён по данным БД).
+
+    Параметры:
+        - redis_client (redis.Redis): Клиент Redis.
+        - secret_key (str): Уникальный ключ секрета.
+        - state (str): Состояние секрета (TOMBSTONE_ACCESSED / TOMBSTONE_DELETED / TOMBSTONE_EXPIRED).
+    """
+    ttl = app_config_instance.TOMBSTONE_TTL_SECONDS
+    if ttl > 0:
+        await redis_client.set(tombstone_key(secret_key), state, ex=ttl)
+
+
+@profiled(SPAN_REDIS)
+async def get_tombstone(redis_client: redis.Redis, secret_key: str) -> Optional[str]:
+    """
+    Состояние секрета по надгробию.
+
+    Возвращает:
+        - Optional[str]: Состояние или None, если надгробия нет.
+    """
+    state = await redis_client.get(tombstone_key(secret_key))
+    _count_tombstone_lookup(state)
+    return state
+
+
+def get_tombstone_stats() -> Dict[str, int | float]:
+    """
+    Попадания и промахи по надгробиям с момента запуска процесса.
+    """
+    hits, misses = _tombstone_stats["hits"], _tombstone_stats["misses"]
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        "ttl_seconds": app_config_instance.TOMBSTONE_TTL_SECONDS
+    }
+
+
+async def rewrite_cached_secrets(redis_client: redis.Redis, entries: Dict[str, Dict[str, str]]) -> int:
+    """
+    Замена полей существующих записей кеша (например, после перешифрования) одним конвейером.
+
+    Параметры:
+        - redis_client (redis.Redis): Клиент Redis.
+        - entries (Dict[str, Dict[str, str]]): secret_key -> новые значения полей.
+
+    Возвращает:
+        - int: Количество обновлённых записей (отсутствующие в кеше пропускаются).
+    """
+    if not entries:
+        return 0
+
+    script = _get_rewrite_script(redis_client)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for secret_key, fields in entries.items():
+            args = [item for pair in fields.items() for item in pair]
+            await script(keys=[secret_cache_key(secret_key)], args=args, client=pipe)
+        results = await pipe.execute()
+    return sum(results)
@@ -1,21 +1,294 @@
 from dotenv import load_dotenv
 import os
-from typing import Optional
+from typing import Optional, Sequence
 
 # Загрузка переменных окружения из .env файла
 load_dotenv()
 
+_TRUE_VALUES = ("1", "true", "yes", "on")
+_FALSE_VALUES = ("0", "false", "no", "off")
+
+
+def _env_raw(name: str) -> Optional[str]:
+    value = os.getenv(name)
+    return value.strip() if value is not None and value.strip() else None
+
+
+def _check_range(name: str, value: int | float, minimum: Optional[float], maximum: Optional[float]):
+    if minimum is not None and value < minimum:
+        raise ValueError(f"{name} must be >= {minimum}, got {value}")
+    if maximum is not None and value > maximum:
+        raise ValueError(f"{name} must be <= {maximum}, got {value}")
+    return value
+
+
+def _env_int(name: str, default: int, minimum: Optional[int] = None, maximum: Optional[int] = None) -> int:
+    """
+    Целое число из переменной окружения (default, если переменная не задана).
+
+    Вызывает:
+        - ValueError: Значение не является целым числом или вне допустимого диапазона.
+    """
+    raw = _env_raw(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {raw!r}") from None
+    return _check_range(name, value, minimum, maximum)
+
+
+def _env_float(name: str, default: float, minimum: Optional[float] = None, maximum: Optional[float] = None) -> float:
+    """
+    Число с плавающей точкой из переменной окружения (default, если переменная не задана).
+
+    Вызывает:
+        - ValueError: Значение не является числом или вне допустимого диапазона.
+    """
+    raw = _env_raw(name)
+    if raw is None:
+        return float(default)
+    try:
+        value = float(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {raw!r}") from None
+    return _check_range(name, value, minimum, maximum)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """
+    Флаг из переменной окружения: 1 / true / yes / on или 0 / false / no / off.
+
+    Вызывает:
+        - ValueError: Значение не распознано.
+    """
+    raw = _env_raw(name)
+    if raw is None:
+        return default
+    if raw.lower() in _TRUE_VALUES:
+        return True
+    if raw.lower() in _FALSE_VALUES:
+        return False
+    raise ValueError(f"{name} must be a boolean (1/0), got {raw!r}")
+
+
+def _env_str(name: str, default: str, choices: Optional[Sequence[str]] = None) -> str:
+    """
+    Строка из переменной окружения (default, если переменная не задана).
+
+    Вызывает:
+        - ValueError: Значение не входит в choices.
+    """
+    value = os.getenv(name, default)
+    if choices is not None and value not in choices:
+        raise ValueError(f"{name} must be one of {', '.join(choices)}, got {value!r}")
+    return value
+
 
 class Config:
     """
     Класс конфигурации приложения.
 
+    Значения читаются из окружения с проверкой типа и допустимых значений:
+    ошибка конфигурации обнаруживается при запуске, а не при первом запросе.
+
     Поля:
         - USE_DOCKER (bool): Флаг использования Docker.
         - DATABASE_URL (Optional[str]): URL базы данных.
+        - DB_POOL_SIZE (int): Количество постоянных соединений в пуле PostgreSQL.
+        - DB_MAX_OVERFLOW (int): Сколько соединений сверх DB_POOL_SIZE может быть открыто при пиковой нагрузке.
+        - DB_POOL_TIMEOUT (float): Максимальное ожидание свободного соединения из пула (в секундах).
+        - DB_POOL_RECYCLE (int): Время жизни соединения (в секундах), после которого оно пересоздаётся (-1 — без ограничения).
+        - DB_POOL_PRE_PING (bool): Проверять ли соединение перед выдачей из пула.
+        - DB_COMMAND_TIMEOUT (float): Таймаут выполнения запроса asyncpg (в секундах, 0 — без ограничения).
+        - REDIS_HOST (str): Хост Redis.
+        - REDIS_PORT (int): Порт Redis.
+        - REDIS_DB (int): Номер базы Redis.
+        - REDIS_MAX_CONNECTIONS (int): Размер пула соединений Redis.
+        - REDIS_POOL_TIMEOUT (float): Максимальное ожидание свободного соединения из пула (в секундах).
+        - REDIS_SOCKET_TIMEOUT (float): Таймаут операций чтения/записи (в секундах).
+        - REDIS_SOCKET_CONNECT_TIMEOUT (float): Таймаут установки соединения (в секундах).
+        - REDIS_HEALTH_CHECK_INTERVAL (int): Интервал проверки простаивающих соединений (в секундах).
+        - CACHE_TTL_SECONDS (int): Время хранения созданного секрета в кеше Redis (в секундах).
+        - WARMUP_ENABLED (bool): Прогревать ли пулы, шифры и запросы до приёма запросов.
+        - WARMUP_DB_CONNECTIONS (int): Сколько соединений PostgreSQL открыть при прогреве (по умолчанию — DB_POOL_SIZE).
+        - WARMUP_REDIS_CONNECTIONS (int): Сколько соединений Redis открыть при прогреве.
+        - WARMUP_TIMEOUT_SECONDS (float): Максимальная длительность прогрева (в секундах).
+        - RATE_LIMIT_ENABLED (bool): Ограничивать ли частоту чтения и удаления секретов (429 + Retry-After).
+        - RATE_LIMIT_READ_PER_IP (str): Лимит чтения на IP-адрес ("<запросов>/<секунд>", пусто — без лимита).
+        - RATE_LIMIT_READ_PER_KEY (str): Лимит чтения одного секрета (попытки подбора пароля).
+        - RATE_LIMIT_DELETE_PER_IP (str): Лимит удаления на IP-адрес.
+        - RATE_LIMIT_DELETE_PER_KEY (str): Лимит удаления одного секрета.
+        - ADMISSION_ENABLED (bool): Ограничивать ли число одновременно обрабатываемых запросов воркера (503 + Retry-After).
+        - ADMISSION_MAX_IN_FLIGHT (int): Сколько запросов воркер обрабатывает одновременно.
+        - ADMISSION_MAX_QUEUE (int): Сколько запросов может ждать свободного места (0 — без очереди).
+        - ADMISSION_QUEUE_TIMEOUT_SECONDS (float): Максимальное ожидание в очереди (в секундах).
+        - ADMISSION_DB_WAIT_THRESHOLD_SECONDS (float): Ожидание соединения из пула PostgreSQL (в секундах), начиная с которого новые запросы отклоняются (0 — не учитывать).
+        - ADMISSION_RETRY_AFTER_SECONDS (int): Значение заголовка Retry-After в ответе 503.
+        - PARTITION_MAINTENANCE_ENABLED (bool): Создавать и удалять секции secrets при периодической очистке.
+        - PARTITION_PRECREATE_DAYS (int): На сколько дней вперёд создавать секции (секретам с большим TTL — секция по умолчанию).
+        - PARTITION_DROP_GRACE_HOURS (float): Через сколько часов после истечения последней строки секция удаляется.
+        - PARTITION_LOCK_TIMEOUT_SECONDS (float): Максимальное ожидание блокировки таблицы при создании и удалении секций.
+        - LOG_RETENTION_MONTHS (int): Сколько полных месяцев журнала secret_logs хранить в БД кроме текущего (0 — хранить всё).
+        - LOG_ARCHIVE_DIR (str): Каталог для выгрузки секций журнала перед удалением (пусто — удалять без выгрузки).
+        - COMPACTION_ENABLED (bool): Очищать ли оставшиеся данные прочитанных и удалённых секретов при периодической очистке.
+        - COMPACTION_BATCH_SIZE (int): Сколько строк очищается одной транзакцией.
+        - COMPACTION_PAUSE_SECONDS (float): Пауза между пачками (в секундах), ограничивает нагрузку на запись и WAL.
+        - COMPACTION_TIME_BUDGET_SECONDS (float): Максимальная длительность одного запуска уплотнения.
+        - SECRET_BATCH_MAX_SIZE (int): Максимальное количество секретов в одном запросе POST /secret/batch.
+        - STREAM_CHUNK_SIZE (int): Размер сегмента потокового секрета (в байтах).
+        - STREAM_MAX_BYTES (int): Максимальный размер потокового секрета (в байтах).
+        - STREAM_FETCH_CHUNKS (int): Сколько сегментов читается из БД за один запрос при отдаче.
+        - CRYPTO_OFFLOAD_THRESHOLD_BYTES (int): Размер данных, начиная с которого шифрование выполняется в пуле.
+        - CRYPTO_EXECUTOR (str): Пул для шифрования больших данных: thread / process.
+        - CRYPTO_MAX_WORKERS (int): Размер пула шифрования.
+        - KEY_ROTATION_ENABLED (bool): Запускать ли фоновое перешифрование основным ключом.
+        - KEY_ROTATION_BATCH_SIZE (int): Размер пачки при перешифровании.
+        - KEY_ROTATION_PAUSE_SECONDS (float): Пауза между пачками (в секундах).
+        - AUDIT_QUEUE_MAX_SIZE (int): Ёмкость очереди журнала действий.
+        - AUDIT_BATCH_SIZE (int): Максимальный размер пачки записей журнала.
+        - AUDIT_FLUSH_INTERVAL (float): Максимальное время накопления пачки (в секундах).
+        - AUDIT_OVERFLOW_POLICY (str): Поведение при переполнении очереди: block / drop / sample.
+        - AUDIT_SAMPLE_RATE (float): Доля сохраняемых событий для политики sample.
+        - CLEANUP_CHUNK_SIZE (int): Размер пачки при очистке истёкших секретов.
+        - CLEANUP_TIME_BUDGET_SECONDS (float): Максимальная длительность одного запуска очистки.
+        - TOMBSTONE_TTL_SECONDS (int): Время жизни надгробий прочитанных, удалённых и истёкших секретов (0 — отключены).
+        - CLEANER_LEADER_BACKEND (str): Способ выбора лидера очистки: postgres (advisory lock) / redis (аренда).
+        - CLEANER_ADVISORY_LOCK_ID (int): Идентификатор advisory-блокировки лидера очистки.
+        - CLEANER_LEASE_TTL_SECONDS (float): TTL аренды лидерства в Redis (больше суммы CLEANUP_TIME_BUDGET_SECONDS и COMPACTION_TIME_BUDGET_SECONDS).
+        - CLEANER_LEADER_CHECK_INTERVAL (float): Интервал проверки лидерства (в секундах).
+        - EXPIRY_SCHEDULER_ENABLED (bool): Запускать ли точное истечение секретов по очереди в Redis.
+        - EXPIRY_SCHEDULER_INTERVAL (float): Пауза между опросами пустой очереди истечения (в секундах).
+        - EXPIRY_SCHEDULER_BATCH_SIZE (int): Максимальный размер пачки из очереди истечения.
+        - LOG_LEVEL (str): Общий уровень логирования.
+        - LOG_FORMAT (str): Формат вывода логов: json / text.
+        - LOG_LEVELS (str): Уровни отдельных модулей ("app.crud=WARNING,app.tools.secret_cleaner=DEBUG").
+        - LOG_SAMPLE_RATES (str): Доли сохраняемых записей ниже WARNING для частых событий ("app.crud.secrets=0.1").
+        - DATABASE_ECHO (bool): Выводить ли в лог SQL-запросы.
+        - PROFILING_ENABLED (bool): Записывать ли участки запросов (Redis, БД, шифрование, журнал) для разбивки времени.
+        - PROFILE_SAMPLE_RATE (float): Доля запросов, профиль которых сохраняется в файл.
+        - PROFILE_ADMIN_TOKEN (str): Значение заголовка X-Profile-Token, по которому профиль сохраняется всегда (пусто — отключено).
+        - PROFILE_SLOW_REQUEST_MS (float): Порог длительности запроса (в мс), начиная с которого разбивка выводится в лог.
+        - PROFILE_DUMP_DIR (str): Каталог для сохранённых профилей.
     """
     # Определение USE_DOCKER
-    USE_DOCKER: bool = os.getenv("USE_DOCKER", "0") == "1"
+    USE_DOCKER: bool = _env_bool("USE_DOCKER", False)
+
+    # Пул соединений PostgreSQL
+    DB_POOL_SIZE: int = _env_int("DB_POOL_SIZE", 5, minimum=1)
+    DB_MAX_OVERFLOW: int = _env_int("DB_MAX_OVERFLOW", 10, minimum=0)
+    DB_POOL_TIMEOUT: float = _env_float("DB_POOL_TIMEOUT", 30, minimum=0)
+    DB_POOL_RECYCLE: int = _env_int("DB_POOL_RECYCLE", 1800, minimum=-1)
+    DB_POOL_PRE_PING: bool = _env_bool("DB_POOL_PRE_PING", True)
+    DB_COMMAND_TIMEOUT: float = _env_float("DB_COMMAND_TIMEOUT", 30, minimum=0)
+
+    # Настройки подключения к Redis (по умолчанию — сервис "redis" из docker-compose)
+    REDIS_HOST: str = _env_str("REDIS_HOST", "redis")
+    REDIS_PORT: int = _env_int("REDIS_PORT", 6379)
+    REDIS_DB: int = _env_int("REDIS_DB", 0)
+    REDIS_MAX_CONNECTIONS: int = _env_int("REDIS_MAX_CONNECTIONS", 50, minimum=1)
+    REDIS_POOL_TIMEOUT: float = _env_float("REDIS_POOL_TIMEOUT", 5)
+    REDIS_SOCKET_TIMEOUT: float = _env_float("REDIS_SOCKET_TIMEOUT", 2)
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = _env_float("REDIS_SOCKET_CONNECT_TIMEOUT", 2)
+    REDIS_HEALTH_CHECK_INTERVAL: int = _env_int("REDIS_HEALTH_CHECK_INTERVAL", 30)
+
+    # Кеш секретов
+    CACHE_TTL_SECONDS: int = _env_int("CACHE_TTL_SECONDS", 300, minimum=1)
+
+    # Прогрев при запуске: первые запросы после развёртывания не открывают соединения
+    WARMUP_ENABLED: bool = _env_bool("WARMUP_ENABLED", True)
+    WARMUP_DB_CONNECTIONS: int = _env_int("WARMUP_DB_CONNECTIONS", DB_POOL_SIZE, minimum=0)
+    WARMUP_REDIS_CONNECTIONS: int = _env_int("WARMUP_REDIS_CONNECTIONS", 5, minimum=0)
+    WARMUP_TIMEOUT_SECONDS: float = _env_float("WARMUP_TIMEOUT_SECONDS", 10, minimum=0)
+
+    # Ограничение частоты запросов (корзина токенов в Redis)
+    RATE_LIMIT_ENABLED: bool = _env_bool("RATE_LIMIT_ENABLED", True)
+    RATE_LIMIT_READ_PER_IP: str = _env_str("RATE_LIMIT_READ_PER_IP", "120/60")
+    RATE_LIMIT_READ_PER_KEY: str = _env_str("RATE_LIMIT_READ_PER_KEY", "10/60")
+    RATE_LIMIT_DELETE_PER_IP: str = _env_str("RATE_LIMIT_DELETE_PER_IP", "60/60")
+    RATE_LIMIT_DELETE_PER_KEY: str = _env_str("RATE_LIMIT_DELETE_PER_KEY", "")
+
+    # Контроль допуска: при перегрузке запросы быстро получают 503, а не ждут в очередях пулов
+    ADMISSION_ENABLED: bool = _env_bool("ADMISSION_ENABLED", True)
+    ADMISSION_MAX_IN_FLIGHT: int = _env_int("ADMISSION_MAX_IN_FLIGHT", 100, minimum=1)
+    ADMISSION_MAX_QUEUE: int = _env_int("ADMISSION_MAX_QUEUE", 50, minimum=0)
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = _env_float("ADMISSION_QUEUE_TIMEOUT_SECONDS", 1, minimum=0)
+    ADMISSION_DB_WAIT_THRESHOLD_SECONDS: float = _env_float("ADMISSION_DB_WAIT_THRESHOLD_SECONDS", 0.5, minimum=0)
+    ADMISSION_RETRY_AFTER_SECONDS: int = _env_int("ADMISSION_RETRY_AFTER_SECONDS", 1, minimum=1)
+
+    # Секции secrets по дню истечения
+    PARTITION_MAINTENANCE_ENABLED: bool = _env_bool("PARTITION_MAINTENANCE_ENABLED", True)
+    PARTITION_PRECREATE_DAYS: int = _env_int("PARTITION_PRECREATE_DAYS", 14, minimum=1)
+    PARTITION_DROP_GRACE_HOURS: float = _env_float("PARTITION_DROP_GRACE_HOURS", 24, minimum=0)
+    PARTITION_LOCK_TIMEOUT_SECONDS: float = _env_float("PARTITION_LOCK_TIMEOUT_SECONDS", 5, minimum=0.1)
+
+    # Секции журнала secret_logs по месяцу записи: хранение и выгрузка в архив (JSONL, gzip)
+    LOG_RETENTION_MONTHS: int = _env_int("LOG_RETENTION_MONTHS", 12, minimum=0)
+    LOG_ARCHIVE_DIR: str = _env_str("LOG_ARCHIVE_DIR", "archive/secret_logs")
+
+    # Уплотнение: очистка данных прочитанных и удалённых секретов, оставшихся в таблицах
+    COMPACTION_ENABLED: bool = _env_bool("COMPACTION_ENABLED", True)
+    COMPACTION_BATCH_SIZE: int = _env_int("COMPACTION_BATCH_SIZE", 1000, minimum=1)
+    COMPACTION_PAUSE_SECONDS: float = _env_float("COMPACTION_PAUSE_SECONDS", 0.2, minimum=0)
+    COMPACTION_TIME_BUDGET_SECONDS: float = _env_float("COMPACTION_TIME_BUDGET_SECONDS", 60, minimum=0)
+
+    # Пакетное создание секретов
+    SECRET_BATCH_MAX_SIZE: int = _env_int("SECRET_BATCH_MAX_SIZE", 1000, minimum=1)
+
+    # Потоковые секреты (сегменты AES-GCM)
+    STREAM_CHUNK_SIZE: int = _env_int("STREAM_CHUNK_SIZE", 64 * 1024, minimum=1)
+    STREAM_MAX_BYTES: int = _env_int("STREAM_MAX_BYTES", 100 * 1024 * 1024)
+    STREAM_FETCH_CHUNKS: int = _env_int("STREAM_FETCH_CHUNKS", 16, minimum=1)
+
+    # Шифрование больших данных вне цикла событий
+    CRYPTO_OFFLOAD_THRESHOLD_BYTES: int = _env_int("CRYPTO_OFFLOAD_THRESHOLD_BYTES", 64 * 1024)
+    CRYPTO_EXECUTOR: str = _env_str("CRYPTO_EXECUTOR", "thread", choices=("thread", "process"))
+    CRYPTO_MAX_WORKERS: int = _env_int("CRYPTO_MAX_WORKERS", 4, minimum=1)
+
+    # Ротация ключей шифрования
+    KEY_ROTATION_ENABLED: bool = _env_bool("KEY_ROTATION_ENABLED", False)
+    KEY_ROTATION_BATCH_SIZE: int = _env_int("KEY_ROTATION_BATCH_SIZE", 500, minimum=1)
+    KEY_ROTATION_PAUSE_SECONDS: float = _env_float("KEY_ROTATION_PAUSE_SECONDS", 0.5)
+
+    # Фоновая запись журнала действий
+    AUDIT_QUEUE_MAX_SIZE: int = _env_int("AUDIT_QUEUE_MAX_SIZE", 10000, minimum=1)
+    AUDIT_BATCH_SIZE: int = _env_int("AUDIT_BATCH_SIZE", 500, minimum=1)
+    AUDIT_FLUSH_INTERVAL: float = _env_float("AUDIT_FLUSH_INTERVAL", 1.0)
+    AUDIT_OVERFLOW_POLICY: str = _env_str("AUDIT_OVERFLOW_POLICY", "block", choices=("block", "drop", "sample"))
+    AUDIT_SAMPLE_RATE: float = _env_float("AUDIT_SAMPLE_RATE", 0.1, minimum=0, maximum=1)
+
+    # Очистка истёкших секретов
+    CLEANUP_CHUNK_SIZE: int = _env_int("CLEANUP_CHUNK_SIZE", 1000, minimum=1)
+    CLEANUP_TIME_BUDGET_SECONDS: float = _env_float("CLEANUP_TIME_BUDGET_SECONDS", 60)
+
+    # Надгробия прочитанных, удалённых и истёкших секретов в Redis
+    TOMBSTONE_TTL_SECONDS: int = _env_int("TOMBSTONE_TTL_SECONDS", 86400)
+
+    # Выбор одного процесса, выполняющего очистку
+    CLEANER_LEADER_BACKEND: str = _env_str("CLEANER_LEADER_BACKEND", "postgres", choices=("postgres", "redis"))
+    CLEANER_ADVISORY_LOCK_ID: int = _env_int("CLEANER_ADVISORY_LOCK_ID", 724501)
+    CLEANER_LEASE_TTL_SECONDS: float = _env_float("CLEANER_LEASE_TTL_SECONDS", 180)
+    CLEANER_LEADER_CHECK_INTERVAL: float = _env_float("CLEANER_LEADER_CHECK_INTERVAL", 15)
+
+    # Точное истечение секретов (очередь истечения в Redis)
+    EXPIRY_SCHEDULER_ENABLED: bool = _env_bool("EXPIRY_SCHEDULER_ENABLED", True)
+    EXPIRY_SCHEDULER_INTERVAL: float = _env_float("EXPIRY_SCHEDULER_INTERVAL", 1.0)
+    EXPIRY_SCHEDULER_BATCH_SIZE: int = _env_int("EXPIRY_SCHEDULER_BATCH_SIZE", 500, minimum=1)
+
+    # Логирование
+    LOG_LEVEL: str = _env_str("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = _env_str("LOG_FORMAT", "json", choices=("json", "text"))
+    LOG_LEVELS: str = _env_str("LOG_LEVELS", "")
+    LOG_SAMPLE_RATES: str = _env_str("LOG_SAMPLE_RATES", "")
+    DATABASE_ECHO: bool = _env_bool("DATABASE_ECHO", False)
+
+    # Профилирование запросов
+    PROFILING_ENABLED: bool = _env_bool("PROFILING_ENABLED", False)
+    PROFILE_SAMPLE_RATE: float = _env_float("PROFILE_SAMPLE_RATE", 0.0, minimum=0, maximum=1)
+    PROFILE_ADMIN_TOKEN: str = _env_str("PROFILE_ADMIN_TOKEN", "")
+    PROFILE_SLOW_REQUEST_MS: float = _env_float("PROFILE_SLOW_REQUEST_MS", 500)
+    PROFILE_DUMP_DIR: str = _env_str("PROFILE_DUMP_DIR", "profiles")
 
     def __init__(self):
         """
@@ -30,5 +303,21 @@ class Config:
         if not self.DATABASE_URL:
             raise ValueError("DATABASE_URL is not set in environment variables.")
 
+        # Без ключа HMAC не создаётся и не читается ни один секрет с паролем:
+        # ошибка в настройке не даст приложению стартовать
+        if _env_raw("PASSPHRASE_DIGEST_KEY") is None:
+            raise ValueError("PASSPHRASE_DIGEST_KEY is not set in environment variables.")
+
+        # Аренда лидера очистки продлевается и во время цикла, но цикл с ограниченными
+        # по времени этапами должен укладываться в одну аренду
+        cycle_budget = self.CLEANUP_TIME_BUDGET_SECONDS
+        if self.COMPACTION_ENABLED:
+            cycle_budget += self.COMPACTION_TIME_BUDGET_SECONDS
+        if self.CLEANER_LEASE_TTL_SECONDS <= cycle_budget:
+            raise ValueError(
+                f"CLEANER_LEASE_TTL_SECONDS must be greater than the cleanup cycle time budget "
+                f"({cycle_budget}s), got {self.CLEANER_LEASE_TTL_SECONDS}"
+            )
+
 # Создаём глобальный экземпляр конфигурации
-app_config_instance = Config()
\ No newline at end of file
+app_config_instance = Config()
@@ -1,5 +1,14 @@
 from .create_secret import create_secret
-from .get_secret import get_secret
+from .create_secrets_batch import create_secrets_batch
+from .create_streamed_secret import create_streamed_secret
+from .get_secret import get_secret, get_secret_stream
 from .delete_secret import delete_secret
 
-__all__ = ["create_secret", "get_secret", "delete_secret"]
\ No newline at end of file
+__all__ = [
+    "create_secret",
+    "create_secrets_batch",
+    "create_streamed_secret",
+    "get_secret",
+    "get_secret_stream",
+    "delete_secret"
+]
\ No newline at end of file
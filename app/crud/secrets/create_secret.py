@@ -1,13 +1,16 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from ...database import schemas, models
 from ...cache.redis_config import get_redis_client
+from ...cache.secret_cache import cache_secret
+from ...tools.audit_log import record_audit_event
+from ...tools.crypto_dispatcher import encrypt_data_async
 from ...tools.logger_config import setup_logger
 
 logger = setup_logger(__name__)
 
 
-def create_secret(
-        db: Session,  # Сессия базы данных SQLAlchemy
+async def create_secret(
+        db: AsyncSession,  # Асинхронная сессия базы данных SQLAlchemy
         secret_data: schemas.SecretCreate,  # Данные для создания секрета (из Pydantic-схемы)
         ip_address: str  # IP-адрес клиента, создающего секрет
 ) -> schemas.SecretResponse:  # Возвращаемый объект (Pydantic-схема)
@@ -15,7 +18,7 @@ def create_secret(
     Создание нового секрета.
 
     Параметры:
-        - db (Session): Сессия базы данных SQLAlchemy.
+        - db (AsyncSession): Асинхронная сессия базы данных SQLAlchemy.
         - secret_data (schemas.SecretCreate): Данные для создания секрета (secret, passphrase, ttl_seconds).
         - ip_address (str): IP-адрес клиента, создающего секрет.
 
@@ -23,56 +26,46 @@ def create_secret(
         - schemas.SecretResponse: Ответ с уникальным ключом доступа к секрету.
     """
     # === Шаг 1: Создание нового секрета ===
-    # Создаём экземпляр модели Secret с указанием времени жизни (ttl_seconds).
-    db_secret = models.Secret(
-        ttl_seconds=secret_data.ttl_seconds  # TTL может быть None, если не указано
-    )
+    # Создаём экземпляр модели Secret и сразу вычисляем время истечения (expires_at).
+    db_secret = models.Secret()
+    db_secret.set_expiry(secret_data.ttl_seconds)  # TTL может быть None, если не указано
 
     # === Шаг 2: Шифрование и сохранение секрета и пароля ===
-    # Используем метод set_secret для шифрования и сохранения секрета и пароля.
-    db_secret.set_secret(
-        secret=secret_data.secret,  # Конфиденциальные данные
-        passphrase=secret_data.passphrase  # Опциональный пароль
-    )
+    # Большие секреты шифруются в пуле, чтобы не задерживать цикл событий.
+    db_secret.encrypted_secret = await encrypt_data_async(secret_data.secret)  # Конфиденциальные данные
+    db_secret.set_passphrase(secret_data.passphrase)  # Опциональный пароль
 
     # === Шаг 3: Добавление секрета в базу данных ===
     # Добавляем секрет в базу данных и фиксируем изменения.
+    # id и secret_key заполняются при вставке, поэтому повторное чтение (refresh) не требуется.
     db.add(db_secret)
-    db.commit()
-    db.refresh(db_secret)  # Обновляем объект db_secret, чтобы получить все поля из БД
+    await db.commit()
 
     # === Шаг 4: Сохранение секрета и пароля в Redis ===
     try:
         redis_client = get_redis_client()  # Получаем клиент Redis
 
-        # Сохраняем зашифрованный секрет в Redis
-        redis_client.set(
-            f"secret:{db_secret.secret_key}",  # Ключ для Redis (уникальный ключ секрета)
-            db_secret.encrypted_secret,  # Зашифрованный секрет
-            ex=300  # TTL = 5 минут (300 секунд)
+        # Секрет и дайджест пароля хранятся под одним ключом, TTL записи не превышает TTL секрета
+        await cache_secret(
+            redis_client,
+            db_secret.secret_key,
+            db_secret.encrypted_secret,
+            db_secret.passphrase_digest,
+            ttl_seconds=db_secret.ttl_seconds,
+            expires_at=db_secret.expires_at  # Постановка в очередь истечения
         )
-
-        # Если есть пароль, сохраняем зашифрованный пароль в Redis
-        if db_secret.encrypted_passphrase:
-            redis_client.set(
-                f"passphrase:{db_secret.secret_key}",  # Ключ для Redis (уникальный ключ пароля)
-                db_secret.encrypted_passphrase,  # Зашифрованный пароль
-                ex=300  # TTL = 5 минут (300 секунд)
-            )
     except Exception as e:
         # Если Redis недоступен, логируем ошибку, но продолжаем работу
-        logger.error(f"Redis error during secret creation: {e}")
+        logger.error("Redis error during secret creation: %s", e)
 
     # === Шаг 5: Логирование создания секрета ===
-    # Создаём запись в логе о создании секрета.
-    log = models.SecretLog(
+    # Запись в журнал ставится в очередь и сохраняется в БД пачкой, без отдельного коммита.
+    await record_audit_event(
         secret_id=db_secret.id,  # ID созданного секрета
         secret_key=db_secret.secret_key,  # Уникальный ключ секрета
         action="secret_created",  # Действие: "создание секрета"
         ip_address=ip_address  # IP-адрес клиента
     )
-    db.add(log)
-    db.commit()
 
     # === Шаг 6: Возвращение ответа ===
     # Возвращаем объект SecretResponse с уникальным ключом доступа к секрету.
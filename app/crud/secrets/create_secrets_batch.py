@@ -0,0 +1,72 @@
+from typing import List
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...cache.redis_config import get_redis_client
+from ...cache.secret_cache import cache_secrets
+from ...database import models, schemas
+from ...tools.crypto_dispatcher import encrypt_many
+from ...tools.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+async def create_secrets_batch(
+        db: AsyncSession,
+        secrets_data: List[schemas.SecretCreate],
+        ip_address: str
+) -> schemas.SecretBatchResponse:
+    """
+    Создание пачки секретов в одной транзакции.
+
+    Секреты вставляются многострочными INSERT (insertmanyvalues), записи журнала
+    о создании — одним многострочным INSERT в той же транзакции, а в Redis
+    все секреты записываются одним конвейером.
+
+    Параметры:
+        - db (AsyncSession): Асинхронная сессия базы данных SQLAlchemy.
+        - secrets_data (List[schemas.SecretCreate]): Данные секретов (secret, passphrase, ttl_seconds).
+        - ip_address (str): IP-адрес клиента, создающего секреты.
+
+    Возвращает:
+        - schemas.SecretBatchResponse: Ключи доступа в порядке секретов в запросе.
+    """
+    # === Шаг 1: Шифрование и подготовка секретов ===
+    # Вся пачка шифруется одним вызовом (при большом объёме — в пуле)
+    encrypted_secrets = await encrypt_many([secret_data.secret for secret_data in secrets_data])
+
+    db_secrets = []
+    for secret_data, encrypted_secret in zip(secrets_data, encrypted_secrets):
+        db_secret = models.Secret()
+        db_secret.set_expiry(secret_data.ttl_seconds)
+        db_secret.encrypted_secret = encrypted_secret
+        db_secret.set_passphrase(secret_data.passphrase)
+        db_secrets.append(db_secret)
+
+    # === Шаг 2: Вставка секретов и журнала одной транзакцией ===
+    # flush вставляет все секреты пачками многострочных INSERT ... RETURNING и заполняет id
+    db.add_all(db_secrets)
+    await db.flush()
+    await db.execute(
+        insert(models.SecretLog),
+        [
+            {
+                "secret_id": db_secret.id,
+                "secret_key": db_secret.secret_key,
+                "action": "secret_created",
+                "ip_address": ip_address
+            }
+            for db_secret in db_secrets
+        ]
+    )
+    await db.commit()
+
+    # === Шаг 3: Сохранение секретов в Redis одним конвейером ===
+    try:
+        await cache_secrets(get_redis_client(), db_secrets)
+    except Exception as e:
+        # Если Redis недоступен, секреты читаются из БД
+        logger.error("Redis error during batch secret creation: %s", e)
+
+    return schemas.SecretBatchResponse(secret_keys=[db_secret.secret_key for db_secret in db_secrets])
@@ -0,0 +1,174 @@
+from typing import AsyncIterator, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...cache.expiry_queue import schedule_expiry
+from ...cache.redis_config import get_redis_client
+from ...config import app_config_instance
+from ...database import models, schemas
+from ...tools.audit_log import record_audit_event
+from ...tools.crypto_dispatcher import encrypt_chunk_async
+from ...tools.encryption import new_stream_key
+from ...tools.logger_config import setup_logger
+from ...tools.profiling import SPAN_REDIS, span
+
+logger = setup_logger(__name__)
+
+# Сколько сегментов вставляется в БД одним запросом (и одной короткой транзакцией)
+CHUNKS_PER_INSERT = 8
+
+
+async def create_streamed_secret(
+        db: AsyncSession,
+        body: AsyncIterator[bytes],
+        passphrase: Optional[str],
+        ttl_seconds: Optional[int],
+        ip_address: str
+) -> schemas.SecretResponse:
+    """
+    Создание секрета из потока (тела запроса) с шифрованием по сегментам.
+
+    Тело читается по частям и режется на сегменты по STREAM_CHUNK_SIZE байт;
+    каждый сегмент шифруется AES-GCM ключом данных секрета и сразу отправляется
+    в БД, поэтому в памяти находится не больше CHUNKS_PER_INSERT сегментов
+    независимо от размера секрета. Потоковые секреты не кешируются в Redis.
+
+    Загрузка длится столько, сколько клиент передаёт тело, поэтому соединение с БД
+    не удерживается на всё это время: секрет сохраняется сразу «незавершённым»
+    (без ключа данных — читатели получают 404), каждая пачка сегментов — отдельной
+    короткой транзакцией, а в конце ключ данных записывается условным UPDATE.
+    При ошибке загрузки секрет помечается удалённым вместе с удалением сегментов;
+    если это не удалось (например, упал процесс), сегменты удалит уплотнение
+    после истечения секрета.
+
+    Параметры:
+        - db (AsyncSession): Асинхронная сессия базы данных SQLAlchemy.
+        - body (AsyncIterator[bytes]): Тело запроса.
+        - passphrase (Optional[str]): Опциональный пароль.
+        - ttl_seconds (Optional[int]): Время жизни секрета в секундах.
+        - ip_address (str): IP-адрес клиента, создающего секрет.
+
+    Возвращает:
+        - schemas.SecretResponse: Ответ с уникальным ключом доступа к секрету.
+
+    Вызывает:
+        - HTTPException: 413 Payload Too Large, если тело больше STREAM_MAX_BYTES;
+          410, если секрет истёк до окончания загрузки.
+    """
+    chunk_size = app_config_instance.STREAM_CHUNK_SIZE
+    max_bytes = app_config_instance.STREAM_MAX_BYTES
+
+    # === Шаг 1: Создание незавершённого секрета ===
+    # id и secret_key нужны сразу: ключ секрета входит в AAD сегментов.
+    # Ключ данных записывается только в конце (шаг 3)
+    data_key, encrypted_data_key = new_stream_key()
+    db_secret = models.Secret(is_streamed=True)
+    db_secret.set_expiry(ttl_seconds)
+    db_secret.set_passphrase(passphrase)
+    db.add(db_secret)
+    await db.commit()
+    # Откат (при ошибке загрузки) сбрасывает атрибуты объекта, поэтому условие строки запоминается
+    secret_id, secret_key = db_secret.id, db_secret.secret_key
+    secret_row = db_secret.row_condition()
+
+    # === Шаг 2: Шифрование и сохранение сегментов ===
+    pending: List[dict] = []
+    seq = 0
+    received = 0
+    buffer = bytearray()
+    held: Optional[bytes] = None  # Полный сегмент, который ещё не известно, последний ли он
+
+    async def add_chunk(data: bytes, final: bool) -> None:
+        nonlocal seq
+        pending.append({
+            "secret_id": secret_id,
+            "seq": seq,
+            "data": await encrypt_chunk_async(data_key, secret_key, seq, data, final)
+        })
+        seq += 1
+        if len(pending) >= CHUNKS_PER_INSERT or final:
+            # Коммит возвращает соединение в пул, пока ожидается следующая часть тела
+            await db.execute(insert(models.SecretChunk), pending)
+            await db.commit()
+            pending.clear()
+
+    try:
+        async for part in body:
+            received += len(part)
+            if received > max_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Secret is larger than {max_bytes} bytes"
+                )
+            buffer += part
+            while len(buffer) >= chunk_size:
+                if held is not None:
+                    await add_chunk(held, final=False)
+                held = bytes(buffer[:chunk_size])
+                del buffer[:chunk_size]
+
+        # Последний сегмент: неполный остаток или полный удержанный сегмент
+        # (пустой секрет хранится одним пустым сегментом)
+        if buffer or held is None:
+            if held is not None:
+                await add_chunk(held, final=False)
+            await add_chunk(bytes(buffer), final=True)
+        else:
+            await add_chunk(held, final=True)
+
+        # === Шаг 3: Завершение загрузки ===
+        # Условие is_deleted = false: секрет мог истечь во время загрузки,
+        # тогда очистка уже пометила его удалённым и его сегменты удаляются
+        result = await db.execute(
+            update(models.Secret)
+            .where(secret_row, models.Secret.is_deleted == False)
+            .values(encrypted_secret=encrypted_data_key)
+        )
+        if result.rowcount == 0:
+            raise HTTPException(status_code=410, detail="Secret expired before the upload finished")
+        await db.commit()
+    except BaseException:
+        await _discard_upload(db, secret_id, secret_key, secret_row)
+        raise
+
+    # === Шаг 4: Постановка в очередь истечения ===
+    try:
+        with span(SPAN_REDIS, "schedule_expiry"):
+            await schedule_expiry(get_redis_client(), secret_key, db_secret.expires_at)
+    except Exception as e:
+        logger.error("Redis error during streamed secret creation: %s", e)
+
+    await record_audit_event(
+        secret_id=secret_id,
+        secret_key=secret_key,
+        action="secret_created",
+        ip_address=ip_address
+    )
+
+    return schemas.SecretResponse(secret_key=secret_key)
+
+
+async def _discard_upload(db: AsyncSession, secret_id: int, secret_key: str, secret_row) -> None:
+    """
+    Удаление незавершённой загрузки: секрет помечается удалённым, его сегменты удаляются.
+
+    Параметры:
+        - db (AsyncSession): Асинхронная сессия базы данных SQLAlchemy.
+        - secret_id (int): ID незавершённого секрета.
+        - secret_key (str): Ключ незавершённого секрета.
+        - secret_row: Условие выбора строки секрета (Secret.row_condition).
+    """
+    try:
+        await db.rollback()
+        await db.execute(delete(models.SecretChunk).where(models.SecretChunk.secret_id == secret_id))
+        await db.execute(
+            update(models.Secret)
+            .where(secret_row)
+            .values(is_deleted=True, **models.PURGED_PAYLOAD)
+        )
+        await db.commit()
+    except Exception as e:
+        # Сегменты останутся до истечения секрета, затем их удалит уплотнение
+        logger.error("Failed to discard unfinished stream upload %s: %s", secret_key, e)
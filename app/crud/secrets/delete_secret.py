@@ -1,15 +1,18 @@
 from typing import Optional, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...cache.redis_config import get_redis_client
+from ...cache.secret_cache import TOMBSTONE_DELETED, TOMBSTONE_EXPIRED, evict_cached_secrets, get_tombstone
 from ...database import models
+from ...tools.audit_log import record_audit_event
 from ...tools.logger_config import setup_logger
 
 logger = setup_logger(__name__)
 
-def delete_secret(
-        db: Session,  # Сессия базы данных SQLAlchemy
+async def delete_secret(
+        db: AsyncSession,  # Асинхронная сессия базы данных SQLAlchemy
         secret_key: str,  # Уникальный ключ секрета
         ip_address: str  # IP-адрес клиента, запрашивающего удаление
 ) -> Tuple[bool, Optional[int]]:  # Возвращает кортеж (успех/неудача, ID секрета или None)
@@ -17,7 +20,7 @@ def delete_secret(
     Мягкое удаление секрета.
 
     Параметры:
-        - db (Session): Сессия базы данных SQLAlchemy.
+        - db (AsyncSession): Асинхронная сессия базы данных SQLAlchemy.
         - secret_key (str): Уникальный ключ секрета.
         - ip_address (str): IP-адрес клиента, запрашивающего удаление.
 
@@ -27,11 +30,21 @@ def delete_secret(
             - (False, None): Если секрет не найден.
             - (False, secret_id): Если секрет уже удалён.
     """
+    # === Шаг 0: Проверка надгробия ===
+    # Удалённый или истёкший секрет повторно не удаляется: ответ без обращения к БД.
+    # Прочитанный секрет по-прежнему можно удалить.
+    try:
+        if await get_tombstone(get_redis_client(), secret_key) in (TOMBSTONE_DELETED, TOMBSTONE_EXPIRED):
+            return False, None
+    except Exception as e:
+        logger.error("Redis error during tombstone lookup: %s", e)
+
     # === Шаг 1: Поиск секрета в БД ===
-    # Ищем секрет по secret_key.
-    secret = db.query(models.Secret).filter(
-        models.Secret.secret_key == secret_key
-    ).first()
+    # Ищем секрет по secret_key (в секции дня, записанного в ключе).
+    result = await db.execute(
+        select(models.Secret).where(models.Secret.key_condition(secret_key))
+    )
+    secret = result.scalars().first()
 
     if not secret:
         # Если секрет не найден, возвращаем (False, None).
@@ -46,29 +59,30 @@ def delete_secret(
     try:
         redis_client = get_redis_client()  # Получаем клиент Redis
 
-        # Удаляем секрет из Redis
-        redis_client.delete(f"secret:{secret_key}")
-
-        # Удаляем пароль из Redis, если он существует
-        redis_client.delete(f"passphrase:{secret_key}")
+        # Удаляем секрет вместе с паролем из Redis и ставим надгробие
+        await evict_cached_secrets(redis_client, [secret_key], tombstone=TOMBSTONE_DELETED)
     except Exception as e:
         # Если Redis недоступен, логируем ошибку, но продолжаем работу
-        logger.error(f"Redis error during secret deletion: {e}")
+        logger.error("Redis error during secret deletion: %s", e)
 
     # === Шаг 4: Мягкое удаление ===
-    # Помечаем секрет как удалённый (is_deleted = True).
+    # Помечаем секрет как удалённый (is_deleted = True) и тем же UPDATE очищаем его данные.
     secret.is_deleted = True
+    secret.purge_payload()
+    # Сегменты непрочитанного потокового секрета удаляются в той же транзакции
+    # (сегменты прочитанного может ещё читать передача; их удалит уплотнение)
+    if secret.is_streamed and not secret.is_accessed:
+        await db.execute(delete(models.SecretChunk).where(models.SecretChunk.secret_id == secret.id))
 
     # === Шаг 5: Логирование успешного удаления ===
-    # Создаём запись в логе об успешном удалении.
-    log = models.SecretLog(
+    # Фиксируем удаление, затем ставим запись в журнал в очередь.
+    await db.commit()
+    await record_audit_event(
         secret_id=secret.id,
         secret_key=secret_key,
         action="delete_successful",
         ip_address=ip_address
     )
-    db.add(log)
-    db.commit()
 
     # === Шаг 6: Возвращаем результат ===
     # Возвращаем (True, secret_id) для подтверждения успешного удаления.
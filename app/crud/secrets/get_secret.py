@@ -1,17 +1,33 @@
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, Optional
 
 from ...cache.redis_config import get_redis_client
+from ...cache.secret_cache import (
+    CONSUME_INVALID_PASSPHRASE,
+    CONSUME_OK,
+    CONSUME_TOMBSTONE,
+    TOMBSTONE_ACCESSED,
+    TOMBSTONE_EXPIRED,
+    consume_cached_secret,
+    get_tombstone,
+    set_tombstone
+)
+from ...config import app_config_instance
 from ...database import models
-from ...tools.encryption import decrypt_data
+from ...database.config import AsyncSessionLocal
+from ...tools.crypto_dispatcher import decrypt_chunk_async, decrypt_data_async
+from ...tools.encryption import digest_passphrase, open_stream_key
+from ...tools.audit_log import record_audit_event
 from ...tools.logger_config import setup_logger
+from ...tools.metrics import secret_reads
 
 logger = setup_logger(__name__)
 
-def get_secret(
-        db: Session,
+async def get_secret(
+        db: AsyncSession,
         secret_key: str,
         passphrase: Optional[str] = None,
         ip_address: str = "unknown"
@@ -20,7 +36,7 @@ def get_secret(
     Получение секрета по ключу с автоматическим удалением истёкших.
 
     Параметры:
-        - db (Session): Сессия базы данных SQLAlchemy.
+        - db (AsyncSession): Асинхронная сессия базы данных SQLAlchemy.
         - secret_key (str): Уникальный ключ секрета.
         - passphrase (Optional[str]): Опциональный пароль для доступа к секрету.
         - ip_address (str): IP-адрес клиента, запрашивающего секрет.
@@ -35,72 +51,270 @@ def get_secret(
             - 410 Gone: Если секрет уже был получен или истек срок его действия.
             - 500 Internal Server Error: При ошибке дешифрования.
     """
+    # === Шаг 0: Атомарное получение секрета из кеша ===
+    # Пароль проверяется, а запись читается и удаляется одним скриптом, поэтому
+    # два конкурентных запроса не могут получить один и тот же секрет из Redis.
+    # Дайджест вычисляется до обращения к Redis: ошибка ключа HMAC — не ошибка Redis
+    passphrase_digest = digest_passphrase(passphrase)
+    cached = None
     try:
         redis_client = get_redis_client()  # Получаем клиент Redis
+        cached = await consume_cached_secret(redis_client, secret_key, passphrase_digest)
+    except Exception as e:
+        # Если Redis недоступен, логируем ошибку и продолжаем работу
+        logger.error("Redis error during secret retrieval: %s", e)
+        secret_reads.inc("cache", "error")
+        secret_reads.inc("db_fallback", "error")
+    else:
+        if cached is None:
+            secret_reads.inc("cache", "miss")
+            secret_reads.inc("db_fallback", "miss")
+        else:
+            secret_reads.inc("cache", "tombstone" if cached[0] == CONSUME_TOMBSTONE else "hit")
+
+    if cached:
+        status, encrypted_secret = cached
 
-        # Проверяем наличие секрета в Redis
-        encrypted_secret = redis_client.get(f"secret:{secret_key}")
-        encrypted_passphrase = redis_client.get(f"passphrase:{secret_key}")
-
-        if encrypted_secret:
-            # Удаляем секрет и пароль из Redis после чтения
-            redis_client.delete(f"secret:{secret_key}")
-            if encrypted_passphrase:
-                redis_client.delete(f"passphrase:{secret_key}")
-
-            # Проверяем пароль, если он существует
-            if encrypted_passphrase:
-                decrypted_passphrase = decrypt_data(encrypted_passphrase)
-                if decrypted_passphrase != passphrase:
-                    _log_access_attempt(
-                        db,
-                        None,
-                        secret_key,
-                        "access_attempt_failed",
-                        ip_address
-                    )
-                    raise HTTPException(
-                        status_code=403,
-                        detail="Invalid passphrase"
-                    )
-            elif passphrase is not None:
-                _log_access_attempt(
-                    db,
+        # Секрет уже прочитан, удалён или истёк: ответ по надгробию, без обращения к БД
+        if status == CONSUME_TOMBSTONE:
+            if encrypted_secret == TOMBSTONE_ACCESSED:
+                await _log_access_attempt(
                     None,
                     secret_key,
-                    "access_attempt_failed",
+                    "access_attempt_already_used",
                     ip_address
                 )
                 raise HTTPException(
-                    status_code=403,
-                    detail="Passphrase was not set for this secret"
+                    status_code=410,
+                    detail="Secret already accessed"
                 )
+            raise HTTPException(
+                status_code=404,
+                detail="Secret not found"
+            )
+
+        if status != CONSUME_OK:
+            await _log_access_attempt(
+                None,
+                secret_key,
+                "access_attempt_failed",
+                ip_address
+            )
+            raise HTTPException(
+                status_code=403,
+                detail="Invalid passphrase" if status == CONSUME_INVALID_PASSPHRASE
+                else "Passphrase was not set for this secret"
+            )
 
+        # Помечаем секрет прочитанным и в БД. Если это не удалось (секрет уже прочитан,
+        # удалён или истёк), ответ формируется по данным БД ниже.
+        secret_id = await _claim_secret(
+            db,
+            models.Secret.key_condition(secret_key),
+            models.Secret.expires_at > func.now()
+        )
+        if secret_id is not None:
+            await db.commit()
+            # Надгробие ставится только после пометки в БД; при неудаче исход определяется по БД ниже
+            await _set_tombstone(secret_key, TOMBSTONE_ACCESSED)
+            await _log_access_attempt(
+                secret_id,
+                secret_key,
+                "access_successful",
+                ip_address
+            )
             # Дешифруем и возвращаем секрет
-            return decrypt_data(encrypted_secret)
+            return await decrypt_data_async(encrypted_secret)
+        secret_reads.inc("db_fallback", "claim_failed")
 
+    # === Шаги 1-4: Поиск секрета в БД и проверка пароля, срока действия и доступа ===
+    secret = await _load_secret_for_access(db, secret_key, passphrase, ip_address)
+
+    if secret.is_streamed:
+        raise HTTPException(
+            status_code=409,
+            detail="Secret was uploaded as a stream, use GET /secret/{secret_key}/stream"
+        )
+
+    # === Шаг 5: Дешифрование секрета ===
+    try:
+        decrypted_secret = await decrypt_data_async(secret.encrypted_secret)
     except Exception as e:
-        # Если Redis недоступен, логируем ошибку и продолжаем работу
-        logger.error(f"Redis error during secret retrieval: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Error decrypting secret"
+        )
 
+    # === Шаг 6: Пометка секрета как прочитанного ===
+    # Условный UPDATE: из двух конкурентных запросов секрет получит только один
+    if await _claim_secret(db, secret.row_condition()) is None:
+        raise HTTPException(
+            status_code=410,
+            detail="Secret already accessed"
+        )
+    await db.commit()
+    await _set_tombstone(secret_key, TOMBSTONE_ACCESSED)
+    await _log_access_attempt(
+        secret.id,
+        secret_key,
+        "access_successful",
+        ip_address
+    )
+
+    return decrypted_secret
+
+
+async def get_secret_stream(
+        db: AsyncSession,
+        secret_key: str,
+        passphrase: Optional[str] = None,
+        ip_address: str = "unknown"
+) -> AsyncIterator[bytes]:
+    """
+    Получение потокового секрета: проверки и пометка прочитанным выполняются сразу,
+    а данные отдаются генератором по одному сегменту.
+
+    Параметры:
+        - db (AsyncSession): Асинхронная сессия базы данных SQLAlchemy.
+        - secret_key (str): Уникальный ключ секрета.
+        - passphrase (Optional[str]): Опциональный пароль для доступа к секрету.
+        - ip_address (str): IP-адрес клиента, запрашивающего секрет.
+
+    Возвращает:
+        - AsyncIterator[bytes]: Расшифрованные сегменты секрета.
+
+    Вызывает:
+        - HTTPException: 404, 403 или 410 (как get_secret); 409, если секрет не потоковый.
+    """
+    # Потоковые секреты не кешируются, но надгробие избавляет от запроса к БД
+    try:
+        state = await get_tombstone(get_redis_client(), secret_key)
+    except Exception as e:
+        logger.error("Redis error during tombstone lookup: %s", e)
+        state = None
+    if state == TOMBSTONE_ACCESSED:
+        raise HTTPException(status_code=410, detail="Secret already accessed")
+    if state is not None:
+        raise HTTPException(status_code=404, detail="Secret not found")
+
+    secret = await _load_secret_for_access(db, secret_key, passphrase, ip_address)
+
+    if not secret.is_streamed:
+        raise HTTPException(
+            status_code=409,
+            detail="Secret was not uploaded as a stream, use GET /secret/{secret_key}"
+        )
+
+    try:
+        data_key = open_stream_key(secret.encrypted_secret)
+    except Exception:
+        raise HTTPException(
+            status_code=500,
+            detail="Error decrypting secret"
+        )
+
+    # Секрет помечается прочитанным до начала передачи: второй запрос получит 410
+    if await _claim_secret(db, secret.row_condition()) is None:
+        raise HTTPException(
+            status_code=410,
+            detail="Secret already accessed"
+        )
+    await db.commit()
+    await _set_tombstone(secret_key, TOMBSTONE_ACCESSED)
+    await _log_access_attempt(
+        secret.id,
+        secret_key,
+        "access_successful",
+        ip_address
+    )
+
+    return _stream_chunks(secret.id, secret_key, data_key)
+
+
+async def _stream_chunks(secret_id: int, secret_key: str, data_key: bytes) -> AsyncIterator[bytes]:
+    """
+    Чтение и расшифровка сегментов по порядку страницами по STREAM_FETCH_CHUNKS штук.
+
+    Генератор выполняется после возврата из обработчика, поэтому использует свою сессию.
+    Последний сегмент определяется с опережением на один: его тег проверяется с признаком
+    final, поэтому обрезанный поток не пройдёт проверку.
+    """
+    page_size = app_config_instance.STREAM_FETCH_CHUNKS
+    held = None  # (seq, data) — сегмент, который ещё не известно, последний ли он
+
+    async with AsyncSessionLocal() as db:
+        last_seq = -1
+        while True:
+            rows = (await db.execute(
+                select(models.SecretChunk.seq, models.SecretChunk.data)
+                .where(models.SecretChunk.secret_id == secret_id, models.SecretChunk.seq > last_seq)
+                .order_by(models.SecretChunk.seq)
+                .limit(page_size)
+            )).all()
+
+            for row in rows:
+                # Пропущенный сегмент тоже означает повреждённые данные
+                if row.seq != (held[0] + 1 if held is not None else 0):
+                    raise ValueError(f"Streamed secret {secret_key} is missing chunk {row.seq - 1}")
+                if held is not None:
+                    yield await decrypt_chunk_async(data_key, secret_key, held[0], held[1], final=False)
+                held = (row.seq, row.data)
+
+            if len(rows) < page_size:
+                break
+            last_seq = rows[-1].seq
+
+    if held is None:
+        raise ValueError(f"Streamed secret {secret_key} has no chunks")
+    yield await decrypt_chunk_async(data_key, secret_key, held[0], held[1], final=True)
+
+    # Секрет передан полностью: сегменты больше не нужны (прерванную передачу дочистит уплотнение)
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(models.SecretChunk).where(models.SecretChunk.secret_id == secret_id))
+        await db.commit()
+
+
+async def _load_secret_for_access(
+        db: AsyncSession,
+        secret_key: str,
+        passphrase: Optional[str],
+        ip_address: str
+) -> models.Secret:
+    """
+    Поиск секрета в БД и проверка пароля, срока действия и того, что секрет ещё не прочитан.
+
+    Параметры:
+        - db (AsyncSession): Асинхронная сессия базы данных SQLAlchemy.
+        - secret_key (str): Уникальный ключ секрета.
+        - passphrase (Optional[str]): Пароль из запроса.
+        - ip_address (str): IP-адрес клиента.
+
+    Возвращает:
+        - models.Secret: Секрет, доступный для чтения.
+
+    Вызывает:
+        - HTTPException: 404, 403 или 410 (см. get_secret).
+    """
     # === Шаг 1: Поиск секрета в БД ===
-    secret = db.query(models.Secret).filter(
-        models.Secret.secret_key == secret_key,
-        models.Secret.is_deleted == False
-    ).first()
+    result = await db.execute(
+        select(models.Secret).where(
+            models.Secret.key_condition(secret_key),
+            models.Secret.is_deleted == False
+        )
+    )
+    secret = result.scalars().first()
 
-    if not secret:
+    # Непрочитанный секрет без данных — потоковый, загрузка которого ещё не завершена
+    if not secret or (not secret.is_accessed and secret.encrypted_secret is None):
         raise HTTPException(
             status_code=404,
             detail="Secret not found"
         )
 
     # === Шаг 2: Проверка пароля ===
-    if secret.encrypted_passphrase:
-        decrypted_passphrase = decrypt_data(secret.encrypted_passphrase)
-        if decrypted_passphrase != passphrase:
-            _log_access_attempt(
-                db,
+    if secret.passphrase_digest:
+        if not secret.check_passphrase(passphrase):
+            await _log_access_attempt(
                 secret.id,
                 secret_key,
                 "access_attempt_failed",
@@ -110,9 +324,9 @@ def get_secret(
                 status_code=403,
                 detail="Invalid passphrase"
             )
-    elif passphrase is not None:
-        _log_access_attempt(
-            db,
+    elif passphrase is not None and not secret.is_accessed:
+        # Дайджест прочитанного секрета очищен: такой запрос получит 410 на шаге 4
+        await _log_access_attempt(
             secret.id,
             secret_key,
             "access_attempt_failed",
@@ -124,21 +338,17 @@ def get_secret(
         )
 
     # === Шаг 3: Проверка срока действия секрета ===
-    now = datetime.now(timezone.utc)
-    created_at = secret.created_at.replace(
-        tzinfo=timezone.utc) if secret.created_at.tzinfo is None else secret.created_at
-    expires_at = created_at + timedelta(seconds=secret.ttl_seconds)
-
-    if now > expires_at:
+    if datetime.now(timezone.utc) > secret.expires_at:
         secret.is_deleted = True
-        _log_access_attempt(
-            db,
+        secret.purge_payload()
+        await db.commit()
+        await _set_tombstone(secret_key, TOMBSTONE_EXPIRED)
+        await _log_access_attempt(
             secret.id,
             secret_key,
             "auto_delete_expired_on_access",
             ip_address
         )
-        db.commit()
         raise HTTPException(
             status_code=410,
             detail="Secret expired and has been automatically deleted"
@@ -146,8 +356,8 @@ def get_secret(
 
     # === Шаг 4: Проверка, был ли уже доступ ===
     if secret.is_accessed:
-        _log_access_attempt(
-            db,
+        await _set_tombstone(secret_key, TOMBSTONE_ACCESSED)
+        await _log_access_attempt(
             secret.id,
             secret_key,
             "access_attempt_already_used",
@@ -158,31 +368,48 @@ def get_secret(
             detail="Secret already accessed"
         )
 
-    # === Шаг 5: Дешифрование секрета ===
-    try:
-        decrypted_secret = decrypt_data(secret.encrypted_secret)
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail="Error decrypting secret"
-        )
+    return secret
 
-    # === Шаг 6: Пометка секрета как прочитанного ===
-    secret.is_accessed = True
-    _log_access_attempt(
-        db,
-        secret.id,
-        secret_key,
-        "access_successful",
-        ip_address
+
+async def _claim_secret(db: AsyncSession, *conditions) -> Optional[int]:
+    """
+    Атомарная пометка непрочитанного и неудалённого секрета как прочитанного.
+
+    Тем же UPDATE очищаются шифротекст и дайджест пароля: вызывающий код уже получил
+    шифротекст (из кеша или при проверке), и в БД он больше не нужен.
+
+    Параметры:
+        - db (AsyncSession): Асинхронная сессия базы данных SQLAlchemy.
+        - conditions: Дополнительные условия выбора секрета (например, по secret_key).
+
+    Возвращает:
+        - Optional[int]: ID секрета или None, если подходящий секрет не найден.
+    """
+    result = await db.execute(
+        update(models.Secret)
+        .where(
+            *conditions,
+            models.Secret.is_accessed == False,
+            models.Secret.is_deleted == False
+        )
+        .values(is_accessed=True, **models.PURGED_PAYLOAD)
+        .returning(models.Secret.id)
     )
-    db.commit()
+    return result.scalar_one_or_none()
 
-    return decrypted_secret
+
+async def _set_tombstone(secret_key: str, state: str) -> None:
+    """
+    Установка надгробия, когда исход запроса определён по данным БД (ошибки Redis не критичны).
+    """
+    try:
+        await set_tombstone(get_redis_client(), secret_key, state)
+    except Exception as e:
+        logger.error("Redis error while setting tombstone: %s", e)
+        secret_reads.inc("db_fallback", "redis_error")
 
 
-def _log_access_attempt(
-        db: Session,
+async def _log_access_attempt(
         secret_id: int | None,
         secret_key: str,
         action: str,
@@ -191,18 +418,17 @@ def _log_access_attempt(
     """
     Вспомогательная функция для логирования попыток доступа к секрету.
 
+    Запись ставится в очередь фоновой записи журнала и не требует коммита сессии запроса.
+
     Параметры:
-        - db (Session): Сессия базы данных SQLAlchemy.
         - secret_id (int | None): ID секрета (если доступен).
         - secret_key (str): Уникальный ключ секрета.
         - action (str): Действие, которое необходимо зафиксировать (например, "access_successful").
         - ip_address (str): IP-адрес клиента, совершающего действие.
     """
-    log = models.SecretLog(
+    await record_audit_event(
         secret_id=secret_id,
         secret_key=secret_key,
         action=action,
         ip_address=ip_address
     )
-    db.add(log)
-    db.commit()
\ No newline at end of file
@@ -1,26 +1,160 @@
-from sqlalchemy import create_engine
+import math
+import time
+from typing import Dict, Optional
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from ..config import app_config_instance  # Импортируем класс Config
+from ..tools.metrics import db_pool_checkout_wait, register_collector
+from ..tools.profiling import instrument_engine
 
 
 # Используем DATABASE_URL из экземпляра конфигурации
 POSTGRES_URL = app_config_instance.DATABASE_URL
 
-# Создаем движок с настройками для Alembic
-engine = create_engine(
-    POSTGRES_URL,
-    pool_pre_ping=True,
-    echo=True
-)
+# Приложение работает через asyncpg, а Alembic продолжает использовать исходный URL (psycopg2)
+ASYNC_POSTGRES_URL = make_url(POSTGRES_URL).set(drivername="postgresql+asyncpg")
+
+_engine: Optional[AsyncEngine] = None
+
+# Период полураспада оценки ожидания соединения (в секундах): после спада нагрузки
+# оценка быстро уменьшается, даже если новых выдач соединений нет
+POOL_WAIT_HALF_LIFE_SECONDS = 1.0
+
+
+class PoolWaitTracker:
+    """
+    Оценка ожидания соединения из пула PostgreSQL (для контроля допуска).
+
+    Учитываются завершённые выдачи (скользящее среднее, затухающее со временем)
+    и выдачи, которые ещё ждут: если пул занят целиком, соединения не выдаются,
+    и оценка растёт вместе с ожиданием самой старой из них.
+    """
+
+    def __init__(self, half_life: float = POOL_WAIT_HALF_LIFE_SECONDS):
+        self.half_life = half_life
+        self._average = 0.0
+        self._updated = time.monotonic()
+        self._pending: Dict[int, float] = {}
+        self._next_id = 0
+
+    def start(self) -> int:
+        self._next_id += 1
+        self._pending[self._next_id] = time.monotonic()
+        return self._next_id
+
+    def finish(self, checkout_id: int) -> None:
+        started = self._pending.pop(checkout_id, None)
+        if started is None:
+            return
+        now = time.monotonic()
+        waited = now - started
+        self._average = self._decayed(now) * 0.8 + waited * 0.2
+        self._updated = now
+        db_pool_checkout_wait.observe(waited)
+
+    def current_wait(self) -> float:
+        """
+        Текущая оценка ожидания соединения (в секундах).
+        """
+        now = time.monotonic()
+        oldest = now - min(self._pending.values()) if self._pending else 0.0
+        return max(self._decayed(now), oldest)
+
+    def waiting(self) -> int:
+        return len(self._pending)
+
+    def _decayed(self, now: float) -> float:
+        return self._average * math.pow(0.5, (now - self._updated) / self.half_life)
+
+
+pool_wait_tracker = PoolWaitTracker()
+
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+class _TimedQueuePool(AsyncAdaptedQueuePool):
+    # Время выдачи соединения: ожидание свободного места в пуле, открытие нового соединения
+    # и pre-ping. Выдача выполняется в потоке цикла событий (greenlet), блокировки не нужны
+    def connect(self):
+        checkout_id = pool_wait_tracker.start()
+        try:
+            return super().connect()
+        finally:
+            pool_wait_tracker.finish(checkout_id)
+
+
+def get_engine() -> AsyncEngine:
+    """
+    Асинхронный движок (создаётся при первом обращении — обычно в lifespan, а не при импорте:
+    вместе с ним загружается драйвер asyncpg).
+
+    SQL-запросы выводятся в лог через логгер sqlalchemy.engine (DATABASE_ECHO), без echo=True.
+    """
+    global _engine
+    if _engine is None:
+        _engine = create_async_engine(
+            ASYNC_POSTGRES_URL,
+            poolclass=_TimedQueuePool,
+            pool_size=app_config_instance.DB_POOL_SIZE,
+            max_overflow=app_config_instance.DB_MAX_OVERFLOW,
+            pool_timeout=app_config_instance.DB_POOL_TIMEOUT,
+            pool_recycle=app_config_instance.DB_POOL_RECYCLE,
+            pool_pre_ping=app_config_instance.DB_POOL_PRE_PING,
+            connect_args={"command_timeout": app_config_instance.DB_COMMAND_TIMEOUT or None}
+        )
+        # Замер запросов к БД для профилирования (без активного профиля — только проверка контекста)
+        instrument_engine(_engine)
+        AsyncSessionLocal.configure(bind=_engine)
+    return _engine
+
+
+async def dispose_engine() -> None:
+    """
+    Закрытие всех соединений пула (вызывается из lifespan при остановке).
+    """
+    global _engine
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+        AsyncSessionLocal.configure(bind=None)
+
+
+class _LazySessionMaker(async_sessionmaker):
+    # Сессия, созданная до запуска lifespan (скрипты, фоновые задачи), сама создаёт движок
+    def __call__(self, **local_kw) -> AsyncSession:
+        if self.kw.get("bind") is None and "bind" not in local_kw:
+            get_engine()
+        return super().__call__(**local_kw)
+
+
+# expire_on_commit=False: после коммита атрибуты объектов остаются доступными без
+# повторной (неявной) загрузки, которая невозможна в асинхронной сессии
+AsyncSessionLocal = _LazySessionMaker(
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+
+def _pool_stats():
+    if _engine is None:
+        return {}
+    pool = _engine.sync_engine.pool
+    return {
+        ("size",): pool.size(),
+        ("checked_out",): pool.checkedout(),
+        ("checked_in",): pool.checkedin(),
+        ("overflow",): pool.overflow()
+    }
+
+
+# Состояние пула соединений вычисляется при чтении /metrics
+register_collector("db_pool_connections", "SQLAlchemy connection pool state.", ("state",), _pool_stats)
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
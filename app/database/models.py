@@ -1,54 +1,176 @@
-from datetime import datetime, timezone
-import secrets
+from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, DDL, Integer, String, DateTime, Boolean, Index, LargeBinary, and_, event, false, func, text
 from sqlalchemy.orm import relationship
 from typing import Optional
 
 from .config import Base
-from ..tools.encryption import encrypt_data, decrypt_data
+from .partitions import DEFAULT_PARTITION, LOG_DEFAULT_PARTITION, day_bounds, generate_secret_key, secret_key_day
+from ..tools.encryption import decrypt_data, digest_passphrase, encrypt_data, verify_passphrase
+
+
+# Время жизни секрета по умолчанию (в секундах)
+DEFAULT_TTL_SECONDS = 3600
+
+# Значения, которыми очищаются данные прочитанного, удалённого или истёкшего секрета
+# (в том же UPDATE, что меняет его состояние): шифротекст и дайджест пароля больше не нужны
+PURGED_PAYLOAD = {"encrypted_secret": None, "passphrase_digest": None}
 
 
 class Secret(Base):
     __tablename__ = "secrets"
+    __table_args__ = (
+        # Частичный индекс только по «живым» секретам: по нему очистка находит истёкшие
+        # без последовательного сканирования, а прочитанные и удалённые строки его не раздувают
+        Index(
+            "ix_secrets_expires_at_live",
+            "expires_at",
+            postgresql_where=text("is_deleted = false AND is_accessed = false")
+        ),
+        # Прочитанные и удалённые секреты с неочищенными данными (остались от версий до очистки
+        # данных в том же запросе): по нему их находит уплотнение (compaction.py), индекс почти пуст
+        Index(
+            "ix_secrets_dead_payload",
+            "id",
+            postgresql_where=text("(is_accessed = true OR is_deleted = true) AND encrypted_secret IS NOT NULL")
+        ),
+        # Секции по дню истечения (см. partitions.py); первичный ключ включает ключ секционирования
+        {"postgresql_partition_by": "RANGE (expires_at)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    encrypted_secret = Column(String, nullable=False)  # Храним зашифрованный секрет
-    encrypted_passphrase = Column(String, nullable=True)  # Опциональный зашифрованный пароль
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    encrypted_secret = Column(String, nullable=True)  # Зашифрованный секрет (NULL после прочтения или удаления)
+    passphrase_digest = Column(String(64), nullable=True)  # Опциональный дайджест пароля (HMAC-SHA256)
     ttl_seconds = Column(Integer, default=3600)  # Время жизни секрета (по умолчанию 3600 секунд)
-    secret_key = Column(String, index=True, unique=True, default=lambda: secrets.token_urlsafe(16))  # Уникальный ключ
+    # Уникальный ключ с днём секции (задаётся в set_expiry). Уникальность по всей таблице
+    # не проверяется (уникальный индекс секционированной таблицы должен включать expires_at):
+    # её обеспечивают 128 случайных бит токена
+    secret_key = Column(String, index=True)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))  # Время создания
+    expires_at = Column(DateTime(timezone=True), primary_key=True)  # Время истечения (created_at + ttl_seconds)
     is_accessed = Column(Boolean, default=False)  # Флаг доступа
     is_deleted = Column(Boolean, default=False)  # Флаг удаления
-    logs = relationship("SecretLog", back_populates="secret_ref", cascade="all, delete-orphan")  # Логи
+    # Потоковый секрет: данные хранятся сегментами в secret_chunks,
+    # а в encrypted_secret — зашифрованный ключ данных сегментов
+    is_streamed = Column(Boolean, nullable=False, default=False, server_default=false())
+    # Логи (без внешнего ключа: журнал переживает удаление секции секретов)
+    logs = relationship(
+        "SecretLog",
+        primaryjoin="Secret.id == foreign(SecretLog.secret_id)",
+        back_populates="secret_ref",
+        viewonly=True
+    )
+
+    @classmethod
+    def key_condition(cls, secret_key: str):
+        """
+        Условие поиска по ключу. Для ключа с днём добавляется диапазон expires_at,
+        и PostgreSQL просматривает только одну секцию.
+
+        Параметры:
+            - secret_key (str): Ключ секрета.
+        """
+        day = secret_key_day(secret_key)
+        if day is None:
+            return cls.secret_key == secret_key
+        start, end = day_bounds(day)
+        return and_(cls.secret_key == secret_key, cls.expires_at >= start, cls.expires_at < end)
+
+    def row_condition(self):
+        """
+        Условие выбора этой строки по первичному ключу (id, expires_at) — в одной секции.
+        """
+        return and_(Secret.id == self.id, Secret.expires_at == self.expires_at)
+
+    def set_expiry(self, ttl_seconds: Optional[int] = None):
+        """
+        Задаёт время создания, TTL, время истечения и ключ секрета (ключ содержит день истечения).
+
+        Параметры:
+            - ttl_seconds (Optional[int]): Время жизни в секундах (по умолчанию DEFAULT_TTL_SECONDS).
+        """
+        self.ttl_seconds = ttl_seconds or DEFAULT_TTL_SECONDS
+        self.created_at = datetime.now(timezone.utc)
+        self.expires_at = self.created_at + timedelta(seconds=self.ttl_seconds)
+        self.secret_key = generate_secret_key(self.expires_at)
 
     def set_secret(self, secret: str, passphrase: Optional[str] = None):
         """
-        Шифрует и сохраняет секрет и пароль.
+        Шифрует секрет и сохраняет ключевой дайджест пароля.
+
+        Сам пароль не хранится: для проверки достаточно сравнить дайджесты,
+        а расшифровывать пароль при каждой попытке доступа не нужно.
 
         Параметры:
             - secret (str): Конфиденциальные данные.
             - passphrase (Optional[str]): Опциональный пароль.
         """
         self.encrypted_secret = encrypt_data(secret)
-        self.encrypted_passphrase = encrypt_data(passphrase) if passphrase else None
+        self.set_passphrase(passphrase)
 
-    def get_secret(self) -> tuple:
+    def set_passphrase(self, passphrase: Optional[str] = None):
         """
-        Дешифрует и возвращает секрет и пароль.
+        Сохраняет ключевой дайджест пароля (или None, если пароль не задан).
+
+        Параметры:
+            - passphrase (Optional[str]): Опциональный пароль.
+        """
+        self.passphrase_digest = digest_passphrase(passphrase) if passphrase else None
+
+    def get_secret(self) -> str:
+        """
+        Дешифрует и возвращает секрет.
 
         Возвращает:
-            - tuple: (секрет, пароль). Пароль может быть None, если его нет.
+            - str: Секрет.
+        """
+        return decrypt_data(self.encrypted_secret)
+
+    def check_passphrase(self, passphrase: Optional[str]) -> bool:
+        """
+        Проверяет пароль по сохранённому дайджесту (за постоянное время).
+
+        Параметры:
+            - passphrase (Optional[str]): Пароль из запроса.
+
+        Возвращает:
+            - bool: True, если пароль верен.
+        """
+        return verify_passphrase(passphrase, self.passphrase_digest)
+
+    def purge_payload(self):
+        """
+        Очищает зашифрованные данные и дайджест пароля (секрет прочитан, удалён или истёк).
         """
-        secret = decrypt_data(self.encrypted_secret)
-        passphrase = decrypt_data(self.encrypted_passphrase) if self.encrypted_passphrase else None
-        return secret, passphrase
+        for column, value in PURGED_PAYLOAD.items():
+            setattr(self, column, value)
+
+
+class SecretChunk(Base):
+    """
+    Сегмент потокового секрета, зашифрованный AES-GCM ключом данных секрета.
+    Сегменты удаляются после полной передачи секрета, уплотнением (compaction.py)
+    или вместе с секцией секрета (см. partition_maintenance.py).
+
+    Поля:
+        - secret_id: ID секрета.
+        - seq: Номер сегмента (с 0).
+        - data: Зашифрованные данные сегмента.
+    """
+    __tablename__ = "secret_chunks"
+
+    secret_id = Column(Integer, primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
 
 
 class SecretLog(Base):
     """
     Модель для логирования действий с секретами.
 
+    Таблица секционирована по месяцу created_at: секции старше срока хранения
+    выгружаются в архив и удаляются (см. partition_maintenance.py).
+
     Поля:
         - id: Уникальный идентификатор записи.
         - secret_id: ID секрета (может быть NULL, если секрет удалён).
@@ -58,19 +180,38 @@ class SecretLog(Base):
         - created_at: Время создания записи.
     """
     __tablename__ = "secret_logs"
+    __table_args__ = (
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)  # Уникальный идентификатор записи
-    secret_id = Column(
-        Integer,
-        ForeignKey('secrets.id'),
-        nullable=True
-    )  # ID секрета (может быть NULL)
+    id = Column(Integer, primary_key=True, autoincrement=True)  # Уникальный идентификатор записи
+    secret_id = Column(Integer, nullable=True)  # ID секрета (может быть NULL; секция секрета может быть уже удалена)
     secret_key = Column(String, index=True)  # Уникальный ключ секрета
     action = Column(String)  # Действие (например, "create", "delete", "access")
     ip_address = Column(String)  # IP-адрес клиента
     created_at = Column(
         DateTime(timezone=True),
-        default=lambda: datetime.now(timezone.utc)
-    )  # Время создания записи
+        primary_key=True,
+        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now()
+    )  # Время создания записи (ключ секционирования)
+
+    secret_ref = relationship(
+        "Secret",
+        primaryjoin="Secret.id == foreign(SecretLog.secret_id)",
+        back_populates="logs",
+        viewonly=True
+    )  # Связь с моделью Secret
+
 
-    secret_ref = relationship("Secret", back_populates="logs")  # Связь с моделью Secret
\ No newline at end of file
+# Секции по умолчанию создаются вместе с таблицами (create_all): вставка работает до создания секций
+event.listen(
+    Secret.__table__,
+    "after_create",
+    DDL(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF secrets DEFAULT")
+)
+event.listen(
+    SecretLog.__table__,
+    "after_create",
+    DDL(f"CREATE TABLE IF NOT EXISTS {LOG_DEFAULT_PARTITION} PARTITION OF secret_logs DEFAULT")
+)
\ No newline at end of file
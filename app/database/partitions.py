@@ -0,0 +1,115 @@
+import secrets
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional, Tuple
+
+# Таблица secrets секционирована по дню истечения (expires_at, UTC): секция за день,
+# все строки которой истекли, удаляется целиком вместо построчной очистки.
+# Строки вне созданных секций попадают в секцию по умолчанию.
+PARENT_TABLE = "secrets"
+PARTITION_PREFIX = "secrets_p"
+DEFAULT_PARTITION = "secrets_default"
+
+# Журнал secret_logs секционирован по месяцу записи (created_at, UTC): секции старше
+# срока хранения выгружаются в архив и удаляются целиком.
+LOG_PARENT_TABLE = "secret_logs"
+LOG_PARTITION_PREFIX = "secret_logs_p"
+LOG_DEFAULT_PARTITION = "secret_logs_default"
+LOG_MONTH_FORMAT = "%Y%m"
+
+# День истечения записывается в начало ключа секрета ("20261017.<токен>"): поиск по ключу
+# ограничивается одной секцией. Ключи, созданные до секционирования, дня не содержат.
+KEY_DAY_FORMAT = "%Y%m%d"
+KEY_DAY_SEPARATOR = "."
+
+
+def partition_day(moment: datetime) -> date:
+    """
+    День секции для момента истечения (в UTC).
+    """
+    return moment.astimezone(timezone.utc).date()
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """
+    Границы секции дня: [начало дня, начало следующего дня) в UTC.
+    """
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day.strftime(KEY_DAY_FORMAT)}"
+
+
+def parse_partition_name(name: str) -> Optional[date]:
+    """
+    День секции по её имени (None — не секция дня, например секция по умолчанию).
+    """
+    if not name.startswith(PARTITION_PREFIX):
+        return None
+    try:
+        return datetime.strptime(name[len(PARTITION_PREFIX):], KEY_DAY_FORMAT).date()
+    except ValueError:
+        return None
+
+
+def month_start(moment: date) -> date:
+    """
+    Первый день месяца.
+    """
+    return moment.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    """
+    Первый день месяца, отстоящего от month на months месяцев.
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bounds(month: date) -> Tuple[datetime, datetime]:
+    """
+    Границы секции месяца: [начало месяца, начало следующего месяца) в UTC.
+    """
+    start = month_start(month)
+    return (
+        datetime.combine(start, time.min, tzinfo=timezone.utc),
+        datetime.combine(add_months(start, 1), time.min, tzinfo=timezone.utc)
+    )
+
+
+def log_partition_name(month: date) -> str:
+    return f"{LOG_PARTITION_PREFIX}{month.strftime(LOG_MONTH_FORMAT)}"
+
+
+def parse_log_partition_name(name: str) -> Optional[date]:
+    """
+    Месяц секции журнала по её имени (None — не секция месяца).
+    """
+    if not name.startswith(LOG_PARTITION_PREFIX):
+        return None
+    try:
+        return datetime.strptime(name[len(LOG_PARTITION_PREFIX):], LOG_MONTH_FORMAT).date()
+    except ValueError:
+        return None
+
+
+def generate_secret_key(expires_at: datetime) -> str:
+    """
+    Новый ключ секрета: день секции и случайный токен (128 бит).
+    """
+    return f"{partition_day(expires_at).strftime(KEY_DAY_FORMAT)}{KEY_DAY_SEPARATOR}{secrets.token_urlsafe(16)}"
+
+
+def secret_key_day(secret_key: str) -> Optional[date]:
+    """
+    День секции из ключа секрета (None — ключ без дня или с некорректным днём).
+    """
+    day, sep, token = secret_key.partition(KEY_DAY_SEPARATOR)
+    if not sep or not token or len(day) != 8 or not day.isdigit():
+        return None
+    try:
+        return datetime.strptime(day, KEY_DAY_FORMAT).date()
+    except ValueError:
+        return None
@@ -1,6 +1,8 @@
 from pydantic import BaseModel, validator, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+
+from ..config import app_config_instance
 
 
 class SecretBase(BaseModel):
@@ -33,10 +35,29 @@ class SecretCreate(SecretBase):
     pass
 
 
+class SecretBatchCreate(BaseModel):
+    secrets: List[SecretCreate]  # Каждый элемент проверяется так же, как при создании одного секрета
+
+    @field_validator("secrets")
+    def validate_batch_size(cls, value):
+        """
+        Валидация размера пачки: от 1 до SECRET_BATCH_MAX_SIZE секретов.
+        """
+        if not value:
+            raise ValueError("secrets must not be empty.")
+        if len(value) > app_config_instance.SECRET_BATCH_MAX_SIZE:
+            raise ValueError(f"secrets must contain at most {app_config_instance.SECRET_BATCH_MAX_SIZE} items.")
+        return value
+
+
 class SecretResponse(BaseModel):
     secret_key: str
 
 
+class SecretBatchResponse(BaseModel):
+    secret_keys: List[str]  # Ключи в порядке секретов в запросе
+
+
 class SecretReadResponse(BaseModel):
     secret: str
 
@@ -1,8 +1,15 @@
 from fastapi import FastAPI, Request, Response
 
-from app.routes import secrets
+from app.routes import health, metrics, secrets
+from app.tools.admission import AdmissionMiddleware
+from app.tools.logger_config import configure_logging
+from app.tools.metrics import HttpMetricsMiddleware
+from app.tools.profiling import ProfilingMiddleware
 from app.tools.secret_cleaner import get_lifespan
 
+# Логирование настраивается один раз, до создания приложения и запуска фоновых задач
+configure_logging()
+
 app = FastAPI(lifespan=get_lifespan(test_mode=False))
 
 @app.middleware("http")
@@ -13,6 +20,14 @@ async def add_no_cache_headers(request: Request, call_next):
     response.headers["Expires"] = "0"
     return response
 
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(HttpMetricsMiddleware)
+
+# Контроль допуска подключается последним и поэтому выполняется первым
+app.add_middleware(AdmissionMiddleware)
+
 # Подключаем роуты
 app.include_router(secrets.router, prefix="/secret", tags=["secrets"])
+app.include_router(health.router, prefix="/health", tags=["health"])
+app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
 
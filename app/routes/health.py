@@ -0,0 +1,78 @@
+import time
+
+from fastapi import APIRouter
+
+from ..cache.expiry_queue import get_expiry_queue_stats
+from ..cache.redis_config import check_redis_health, get_redis_client
+from ..cache.secret_cache import get_tombstone_stats
+from ..tools.admission import get_admission_stats
+from ..tools.audit_log import get_audit_stats
+from ..tools.crypto_dispatcher import get_crypto_stats
+from ..tools.secret_cleaner import get_cleaner_status
+from ..tools.warmup import get_warmup_status
+
+router = APIRouter()
+
+
+@router.get("/redis")
+async def redis_health():
+    """
+    Состояние Redis: результат PING и статистика пула соединений.
+    """
+    return await check_redis_health()
+
+
+@router.get("/audit")
+async def audit_health():
+    """
+    Состояние фоновой записи журнала: глубина очереди, отброшенные события, время записи пачек.
+    """
+    return get_audit_stats()
+
+
+@router.get("/expiry")
+async def expiry_health():
+    """
+    Состояние очереди истечения: количество запланированных секретов и секретов с наступившим сроком.
+    """
+    return await get_expiry_queue_stats(get_redis_client(), time.time())
+
+
+@router.get("/cleaner")
+async def cleaner_health():
+    """
+    Выбор лидера очистки: текущий лидер, способ выбора и результат последнего запуска.
+    """
+    return await get_cleaner_status()
+
+
+@router.get("/tombstones")
+async def tombstone_health():
+    """
+    Попадания и промахи по надгробиям (для подбора TOMBSTONE_TTL_SECONDS).
+    """
+    return get_tombstone_stats()
+
+
+@router.get("/crypto")
+async def crypto_health():
+    """
+    Статистика шифрования: количество вызовов, доля вынесенных в пул, объём данных и время.
+    """
+    return get_crypto_stats()
+
+
+@router.get("/warmup")
+async def warmup_health():
+    """
+    Результат прогрева при запуске: открытые соединения PostgreSQL и Redis, длительность.
+    """
+    return get_warmup_status()
+
+
+@router.get("/admission")
+async def admission_health():
+    """
+    Контроль допуска: запросы в обработке и в очереди, ожидание соединения из пула, отказы по причинам.
+    """
+    return get_admission_stats()
@@ -1,12 +1,22 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Request, HTTPException
+from fastapi import APIRouter, Depends, Query, Request, HTTPException
 from fastapi import status as http_status
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..crud.secrets import create_secret, get_secret, delete_secret
-from ..database import schemas, models
+from ..crud.secrets import (
+    create_secret,
+    create_secrets_batch,
+    create_streamed_secret,
+    delete_secret,
+    get_secret,
+    get_secret_stream
+)
+from ..database import schemas
 from ..database.config import get_db
+from ..tools.audit_log import record_audit_event
+from ..tools.rate_limiter import rate_limit
 
 router = APIRouter()
 
@@ -14,20 +24,66 @@ router = APIRouter()
 async def create_new_secret(
     secret_data: schemas.SecretCreate,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
+):
+    return await create_secret(db, secret_data, request.client.host)
+
+
+@router.post("/batch", response_model=schemas.SecretBatchResponse)
+async def create_new_secrets_batch(
+    batch_data: schemas.SecretBatchCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    return await create_secrets_batch(db, batch_data.secrets, request.client.host)
+
+
+@router.post("/stream", response_model=schemas.SecretResponse)
+async def create_new_streamed_secret(
+    request: Request,
+    passphrase: Optional[str] = None,
+    ttl_seconds: Optional[int] = Query(3600, gt=0),
+    db: AsyncSession = Depends(get_db)
 ):
-    return create_secret(db, secret_data, request.client.host)
+    # Тело запроса (произвольные байты) читается потоком, без загрузки целиком в память
+    return await create_streamed_secret(
+        db,
+        request.stream(),
+        passphrase=passphrase,
+        ttl_seconds=ttl_seconds,
+        ip_address=request.client.host
+    )
 
 
-@router.get("/{secret_key}", response_model=schemas.SecretReadResponse)
+@router.get("/{secret_key}/stream", dependencies=[Depends(rate_limit("secret_read"))])
+async def api_get_secret_stream(
+    secret_key: str,
+    request: Request,
+    passphrase: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    chunks = await get_secret_stream(
+        db=db,
+        secret_key=secret_key,
+        passphrase=passphrase,
+        ip_address=request.client.host
+    )
+    return StreamingResponse(chunks, media_type="application/octet-stream")
+
+
+@router.get(
+    "/{secret_key}",
+    response_model=schemas.SecretReadResponse,
+    dependencies=[Depends(rate_limit("secret_read"))]
+)
 async def api_get_secret(
     secret_key: str,
     request: Request,
     passphrase: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     try:
-        secret_content = get_secret(
+        secret_content = await get_secret(
             db=db,
             secret_key=secret_key,
             passphrase=passphrase,  # Передаём passphrase (может быть None)
@@ -46,24 +102,23 @@ async def api_get_secret(
 @router.delete(
     "/{secret_key}",
     response_model=schemas.SecretDeleteResponse,
-    status_code=http_status.HTTP_200_OK
+    status_code=http_status.HTTP_200_OK,
+    dependencies=[Depends(rate_limit("secret_delete"))]
 )
 async def api_delete_secret(
     secret_key: str,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    operation_success, secret_id = delete_secret(db, secret_key, request.client.host)
+    operation_success, secret_id = await delete_secret(db, secret_key, request.client.host)
 
     if not operation_success:
-        log = models.SecretLog(
+        await record_audit_event(
             secret_id=secret_id,
             secret_key=secret_key,
             action="delete_attempt_failed",
             ip_address=request.client.host
         )
-        db.add(log)
-        db.commit()
 
         raise HTTPException(
             status_code=http_status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,239 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .logger_config import setup_logger
+from .metrics import admission_queue_wait, admission_rejections, register_collector
+from ..config import app_config_instance
+from ..database.config import pool_wait_tracker
+
+logger = setup_logger(__name__)
+
+# Причины отказа
+REJECT_QUEUE_FULL = "queue_full"
+REJECT_QUEUE_TIMEOUT = "queue_timeout"
+REJECT_DB_SATURATED = "db_saturated"
+
+# Пути, которые не ограничиваются: мониторинг должен отвечать и при перегрузке
+EXEMPT_PATH_PREFIXES = ("/health", "/metrics")
+
+
+class Overloaded(Exception):
+    """
+    Запрос не допущен к обработке.
+
+    Поля:
+        - reason (str): Причина отказа (queue_full / queue_timeout / db_saturated).
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Ограничение числа одновременно обрабатываемых запросов воркера.
+
+    Запросы сверх max_in_flight ждут в очереди (FIFO) не дольше queue_timeout;
+    если очередь заполнена, ожидание истекло или соединения PostgreSQL выдаются
+    дольше db_wait_threshold, запрос сразу отклоняется. Допущенные запросы
+    не стоят в длинных очередях пулов, поэтому их время ответа остаётся стабильным.
+
+    Поля:
+        - max_in_flight (int): Сколько запросов обрабатывается одновременно.
+        - max_queue (int): Сколько запросов может ждать свободного места.
+        - queue_timeout (float): Максимальное ожидание в очереди (в секундах).
+        - db_wait_threshold (float): Порог ожидания соединения из пула (в секундах, 0 — не учитывать).
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float, db_wait_threshold: float = 0.0):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.db_wait_threshold = db_wait_threshold
+
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._admitted = 0
+        self._queued = 0
+        self._rejected: Dict[str, int] = {}
+        self._shedding = False
+
+    @classmethod
+    def from_config(cls) -> "AdmissionController":
+        return cls(
+            max_in_flight=app_config_instance.ADMISSION_MAX_IN_FLIGHT,
+            max_queue=app_config_instance.ADMISSION_MAX_QUEUE,
+            queue_timeout=app_config_instance.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+            db_wait_threshold=app_config_instance.ADMISSION_DB_WAIT_THRESHOLD_SECONDS
+        )
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    async def acquire(self) -> None:
+        """
+        Получение места для обработки запроса.
+
+        Вызывает:
+            - Overloaded: Запрос не допущен (причина — в поле reason).
+        """
+        if self.db_wait_threshold and pool_wait_tracker.current_wait() > self.db_wait_threshold:
+            self._reject(REJECT_DB_SATURATED)
+
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self._admit()
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self._reject(REJECT_QUEUE_FULL)
+
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._queued += 1
+        try:
+            # asyncio.wait, а не wait_for: место, переданное в момент истечения ожидания, не теряется
+            await asyncio.wait((waiter,), timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            self._leave_queue(waiter)
+            raise
+        if not waiter.done():
+            self._leave_queue(waiter)
+            self._reject(REJECT_QUEUE_TIMEOUT)
+
+        admission_queue_wait.observe(time.perf_counter() - started)
+        self._admit()
+
+    def release(self) -> None:
+        """
+        Освобождение места: оно передаётся первому ожидающему запросу, а не освобождается.
+        """
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int | float | bool | Dict[str, int]]:
+        """
+        Состояние: занятые места, очередь, ожидание соединения из пула и счётчики решений.
+        """
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "db_wait_seconds": round(pool_wait_tracker.current_wait(), 4),
+            "db_wait_threshold_seconds": self.db_wait_threshold,
+            "db_checkouts_waiting": pool_wait_tracker.waiting(),
+            "shedding": self._shedding,
+            "admitted": self._admitted,
+            "queued_total": self._queued,
+            "rejected": dict(self._rejected)
+        }
+
+    def _leave_queue(self, waiter: asyncio.Future) -> None:
+        if waiter.done() and not waiter.cancelled():
+            # Место уже передано этому запросу: возвращаем его следующему
+            self.release()
+        else:
+            waiter.cancel()
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def _admit(self) -> None:
+        self._admitted += 1
+        if self._shedding and not self._waiters:
+            logger.info("Admission control stopped shedding load (in flight: %d)", self.in_flight)
+            self._shedding = False
+
+    def _reject(self, reason: str) -> None:
+        self._rejected[reason] = self._rejected.get(reason, 0) + 1
+        admission_rejections.inc(reason)
+        if not self._shedding:
+            # Один раз на эпизод перегрузки, а не на каждый отклонённый запрос
+            logger.warning(
+                "Admission control is shedding load: %s (in flight: %d, queued: %d, db wait: %.3fs)",
+                reason, self.in_flight, self.queued, pool_wait_tracker.current_wait()
+            )
+            self._shedding = True
+        raise Overloaded(reason)
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController.from_config()
+    return _controller
+
+
+def get_admission_stats() -> Dict[str, int | float | bool | Dict[str, int]]:
+    return get_admission_controller().stats()
+
+
+def _admission_state():
+    if _controller is None:
+        return {}
+    return {
+        ("in_flight",): _controller.in_flight,
+        ("queued",): _controller.queued
+    }
+
+
+# Заполненность воркера вычисляется при чтении /metrics
+register_collector("admission_requests", "Requests in flight and waiting in the admission queue.", ("state",), _admission_state)
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware контроля допуска (подключается последним, то есть выполняется первым:
+    отклонённый запрос не проходит остальные middleware).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+                scope["type"] != "http"
+                or not app_config_instance.ADMISSION_ENABLED
+                or scope["path"].startswith(EXEMPT_PATH_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        controller = get_admission_controller()
+        try:
+            await controller.acquire()
+        except Overloaded as e:
+            response = JSONResponse(
+                {"detail": "Service is overloaded, retry later"},
+                status_code=503,
+                headers={
+                    "Retry-After": str(app_config_instance.ADMISSION_RETRY_AFTER_SECONDS),
+                    "Cache-Control": "no-store",
+                    "X-Shed-Reason": e.reason
+                }
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release()
@@ -0,0 +1,291 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert
+
+from .logger_config import setup_logger
+from .metrics import audit_events, audit_flush_duration, audit_flush_errors, register_collector
+from .profiling import SPAN_AUDIT, profiled
+from ..config import app_config_instance
+from ..database import models
+from ..database.config import AsyncSessionLocal
+
+logger = setup_logger(__name__)
+
+# Политики поведения при переполнении очереди
+OVERFLOW_BLOCK = "block"    # ждать освобождения места в очереди
+OVERFLOW_DROP = "drop"      # отбрасывать новые события при заполненной очереди
+OVERFLOW_SAMPLE = "sample"  # при заполнении очереди наполовину и более сохранять только часть событий
+
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP, OVERFLOW_SAMPLE)
+
+
+class AuditLogWriter:
+    """
+    Фоновая запись журнала действий (SecretLog) пачками.
+
+    События складываются в ограниченную очередь и записываются в БД одним
+    многострочным INSERT, когда набирается batch_size событий или проходит
+    flush_interval секунд с момента первого события в пачке.
+
+    Поля:
+        - max_queue_size (int): Ёмкость очереди.
+        - batch_size (int): Максимальный размер пачки.
+        - flush_interval (float): Максимальное время ожидания пачки (в секундах).
+        - overflow_policy (str): Политика при переполнении очереди (block / drop / sample).
+        - sample_rate (float): Доля сохраняемых событий для политики sample.
+    """
+
+    def __init__(
+            self,
+            max_queue_size: int,
+            batch_size: int,
+            flush_interval: float,
+            overflow_policy: str = OVERFLOW_BLOCK,
+            sample_rate: float = 0.1
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown audit overflow policy: {overflow_policy}")
+
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.sample_rate = sample_rate
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        # Пачка, которую фоновая задача уже забрала из очереди, но ещё не записала
+        self._pending: List[Dict] = []
+
+        # Счётчики для мониторинга
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    @classmethod
+    def from_config(cls) -> "AuditLogWriter":
+        return cls(
+            max_queue_size=app_config_instance.AUDIT_QUEUE_MAX_SIZE,
+            batch_size=app_config_instance.AUDIT_BATCH_SIZE,
+            flush_interval=app_config_instance.AUDIT_FLUSH_INTERVAL,
+            overflow_policy=app_config_instance.AUDIT_OVERFLOW_POLICY,
+            sample_rate=app_config_instance.AUDIT_SAMPLE_RATE
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Остановка фоновой задачи с записью всех накопленных событий.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # Финальная запись: прерванная пачка и всё, что осталось в очереди
+        pending, self._pending = self._pending, []
+        await self._flush(pending)
+        while not self._queue.empty():
+            await self._flush(self._drain(self.batch_size))
+
+    async def log(self, secret_id: Optional[int], secret_key: str, action: str, ip_address: str) -> None:
+        """
+        Постановка события в очередь на запись.
+
+        Параметры:
+            - secret_id (Optional[int]): ID секрета (если известен).
+            - secret_key (str): Уникальный ключ секрета.
+            - action (str): Действие (например, "access_successful").
+            - ip_address (str): IP-адрес клиента.
+        """
+        event = {
+            "secret_id": secret_id,
+            "secret_key": secret_key,
+            "action": action,
+            "ip_address": ip_address,
+            # Время события, а не время записи пачки
+            "created_at": datetime.now(timezone.utc)
+        }
+
+        if self.overflow_policy == OVERFLOW_BLOCK:
+            await self._queue.put(event)
+            self.enqueued += 1
+            return
+
+        if (
+                self.overflow_policy == OVERFLOW_SAMPLE
+                and self._queue.qsize() * 2 >= self.max_queue_size
+                and random.random() >= self.sample_rate
+        ):
+            self._drop()
+            return
+
+        try:
+            self._queue.put_nowait(event)
+            self.enqueued += 1
+        except asyncio.QueueFull:
+            self._drop()
+
+    def _drop(self) -> None:
+        self.dropped += 1
+        audit_events.inc("dropped")
+
+    def stats(self) -> Dict[str, int | float | str | bool]:
+        """
+        Состояние очереди и статистика записи.
+        """
+        return {
+            "running": self.running,
+            "overflow_policy": self.overflow_policy,
+            "queue_depth": self._queue.qsize() + len(self._pending),
+            "queue_capacity": self.max_queue_size,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 3),
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 3)
+        }
+
+    def _drain(self, limit: int) -> List[Dict]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # Ждём первое событие пачки, затем добираем остальные до порога по размеру или времени
+            self._pending = batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+                batch.extend(self._drain(self.batch_size - len(batch)))
+
+            await self._flush(batch)
+            self._pending = []
+
+    async def _flush(self, batch: List[Dict]) -> None:
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        try:
+            async with AsyncSessionLocal() as db:
+                # Многострочный INSERT на всю пачку
+                await db.execute(insert(models.SecretLog), batch)
+                await db.commit()
+        except Exception as e:
+            self.flush_errors += 1
+            audit_flush_errors.inc()
+            logger.error("Audit log flush failed, %s events lost: %s", len(batch), e, exc_info=True)
+            return
+
+        elapsed = time.perf_counter() - started
+        self.written += len(batch)
+        self.flushes += 1
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        audit_events.inc("written", amount=len(batch))
+        audit_flush_duration.observe(elapsed)
+
+
+_audit_writer: Optional[AuditLogWriter] = None
+
+
+def start_audit_writer() -> AuditLogWriter:
+    """
+    Создание и запуск фоновой записи журнала (вызывается из lifespan).
+    """
+    global _audit_writer
+    if _audit_writer is None:
+        _audit_writer = AuditLogWriter.from_config()
+    _audit_writer.start()
+    return _audit_writer
+
+
+async def stop_audit_writer() -> None:
+    """
+    Остановка фоновой записи журнала с записью накопленных событий.
+    """
+    global _audit_writer
+    if _audit_writer is not None:
+        await _audit_writer.stop()
+        logger.info("Audit log writer stopped: %s", _audit_writer.stats())
+    _audit_writer = None
+
+
+def get_audit_stats() -> Dict[str, int | float | str | bool]:
+    if _audit_writer is None:
+        return {"running": False}
+    return _audit_writer.stats()
+
+
+def _audit_queue_depth() -> Dict[tuple, int]:
+    # Счётчики событий и ошибок записи обновляются при записи (audit_log_events_total и др.)
+    stats = get_audit_stats()
+    if not stats["running"]:
+        return {}
+    return {(): stats["queue_depth"]}
+
+
+register_collector("audit_log_queue_depth", "Audit log events waiting to be written.", (), _audit_queue_depth)
+
+
+@profiled(SPAN_AUDIT)
+async def record_audit_event(
+        secret_id: Optional[int],
+        secret_key: str,
+        action: str,
+        ip_address: str
+) -> None:
+    """
+    Запись события в журнал действий.
+
+    Если фоновая запись запущена, событие ставится в очередь; иначе (например,
+    при запуске вне приложения) записывается в БД сразу.
+
+    Параметры:
+        - secret_id (Optional[int]): ID секрета (если известен).
+        - secret_key (str): Уникальный ключ секрета.
+        - action (str): Действие (например, "secret_created").
+        - ip_address (str): IP-адрес клиента.
+    """
+    if _audit_writer is not None and _audit_writer.running:
+        await _audit_writer.log(secret_id, secret_key, action, ip_address)
+        return
+
+    async with AsyncSessionLocal() as db:
+        db.add(models.SecretLog(
+            secret_id=secret_id,
+            secret_key=secret_key,
+            action=action,
+            ip_address=ip_address
+        ))
+        await db.commit()
@@ -0,0 +1,223 @@
+import asyncio
+import time
+from datetime import timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import and_, delete, func, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .logger_config import configure_logging, setup_logger
+from .metrics import compaction_bytes, compaction_rows
+from ..config import app_config_instance
+from ..database import models
+from ..database.config import AsyncSessionLocal, dispose_engine
+
+logger = setup_logger(__name__)
+
+PAYLOAD_KIND = "payload"
+CHUNKS_KIND = "chunks"
+
+# Сегменты прочитанного потокового секрета может ещё читать передача (даже если секрет
+# потом удалён или истёк), поэтому они удаляются не раньше, чем через час после его истечения.
+# Завершённая передача удаляет их сама
+STREAM_GRACE = timedelta(hours=1)
+
+
+def _dead_payload_condition():
+    """
+    Условие «секрет прочитан или удалён, но его данные не очищены».
+
+    Совпадает с условием частичного индекса ix_secrets_dead_payload.
+    """
+    return and_(
+        or_(models.Secret.is_accessed == True, models.Secret.is_deleted == True),
+        models.Secret.encrypted_secret.isnot(None)
+    )
+
+
+async def _purge_payload_batch(db: AsyncSession, after_id: int, batch_size: int) -> Dict[str, int]:
+    """
+    Очистка шифротекста и дайджеста пароля пачки прочитанных и удалённых секретов одним запросом.
+
+    WITH candidates AS (SELECT id, expires_at, <размер данных> ... FOR UPDATE SKIP LOCKED)
+    UPDATE secrets ... FROM candidates RETURNING id, <размер данных>
+
+    Параметры:
+        - db (AsyncSession): Асинхронная сессия базы данных SQLAlchemy.
+        - after_id (int): ID, после которого начинается пачка.
+        - batch_size (int): Максимальный размер пачки.
+
+    Возвращает:
+        - Dict[str, int]: {"last_id": ..., "rows": ..., "bytes": ...}
+    """
+    secrets_table = models.Secret.__table__
+    candidates = (
+        select(
+            secrets_table.c.id,
+            secrets_table.c.expires_at,
+            (
+                func.coalesce(func.octet_length(secrets_table.c.encrypted_secret), 0)
+                + func.coalesce(func.octet_length(secrets_table.c.passphrase_digest), 0)
+            ).label("payload_bytes")
+        )
+        .where(secrets_table.c.id > after_id, _dead_payload_condition())
+        .order_by(secrets_table.c.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .cte("candidates")
+    )
+    result = await db.execute(
+        update(secrets_table)
+        .where(secrets_table.c.id == candidates.c.id, secrets_table.c.expires_at == candidates.c.expires_at)
+        .values(**models.PURGED_PAYLOAD)
+        .returning(secrets_table.c.id, candidates.c.payload_bytes)
+    )
+    rows = result.all()
+    return {
+        "last_id": max((row.id for row in rows), default=after_id),
+        "rows": len(rows),
+        "bytes": sum(row.payload_bytes for row in rows)
+    }
+
+
+async def _purge_chunks_batch(db: AsyncSession, batch_size: int) -> Dict[str, int]:
+    """
+    Удаление пачки сегментов потоковых секретов: удалённых (в том числе истёкших) и не прочитанных —
+    сразу, прочитанных — через STREAM_GRACE после истечения.
+
+    Параметры:
+        - db (AsyncSession): Асинхронная сессия базы данных SQLAlchemy.
+        - batch_size (int): Максимальный размер пачки.
+
+    Возвращает:
+        - Dict[str, int]: {"rows": ..., "bytes": ...}
+    """
+    chunks_table = models.SecretChunk.__table__
+    dead_secrets = select(models.Secret.id).where(
+        models.Secret.is_streamed == True,
+        or_(
+            and_(models.Secret.is_deleted == True, models.Secret.is_accessed == False),
+            and_(models.Secret.is_accessed == True, models.Secret.expires_at < func.now() - STREAM_GRACE)
+        )
+    )
+    doomed = (
+        select(chunks_table.c.secret_id, chunks_table.c.seq)
+        .where(chunks_table.c.secret_id.in_(dead_secrets))
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        delete(chunks_table)
+        .where(tuple_(chunks_table.c.secret_id, chunks_table.c.seq).in_(doomed))
+        .returning(func.octet_length(chunks_table.c.data))
+    )
+    sizes = result.scalars().all()
+    return {"rows": len(sizes), "bytes": sum(sizes)}
+
+
+async def run_compaction(
+        batch_size: Optional[int] = None,
+        pause_seconds: Optional[float] = None,
+        time_budget: Optional[float] = None
+) -> Dict[str, str | int | float | bool]:
+    """
+    Очистка данных прочитанных и удалённых секретов, оставшихся в таблицах, пачками с паузами.
+
+    Чтение, удаление и истечение очищают данные в том же запросе, поэтому уплотнение находит
+    строки, оставшиеся от прежних версий, и сегменты прерванных передач. Каждая пачка —
+    отдельная транзакция; пауза между пачками ограничивает поток записи и WAL.
+    Освобождённое место используется повторно после VACUUM (autovacuum), файлы таблиц не уменьшаются.
+
+    Параметры:
+        - batch_size (Optional[int]): Размер пачки (по умолчанию COMPACTION_BATCH_SIZE).
+        - pause_seconds (Optional[float]): Пауза между пачками (по умолчанию COMPACTION_PAUSE_SECONDS).
+        - time_budget (Optional[float]): Бюджет времени в секундах (по умолчанию COMPACTION_TIME_BUDGET_SECONDS).
+
+    Возвращает:
+        - Dict[str, str | int | float | bool]: Итог уплотнения (размеры — до сжатия TOAST).
+          Пример:
+          {
+              "status": "success",
+              "purged_payloads": 12000,
+              "payload_bytes": 2150000,
+              "purged_chunks": 64,
+              "chunk_bytes": 4194304,
+              "bytes_reclaimed": 6344304,
+              "batches": 13,
+              "duration_seconds": 2.61,
+              "complete": True
+          }
+    """
+    batch_size = batch_size or app_config_instance.COMPACTION_BATCH_SIZE
+    pause_seconds = app_config_instance.COMPACTION_PAUSE_SECONDS if pause_seconds is None else pause_seconds
+    time_budget = app_config_instance.COMPACTION_TIME_BUDGET_SECONDS if time_budget is None else time_budget
+
+    started = time.perf_counter()
+    totals = {PAYLOAD_KIND: {"rows": 0, "bytes": 0}, CHUNKS_KIND: {"rows": 0, "bytes": 0}}
+    batches = 0
+    complete = False
+
+    def _summary(status: str) -> Dict[str, str | int | float | bool]:
+        return {
+            "status": status,
+            "purged_payloads": totals[PAYLOAD_KIND]["rows"],
+            "payload_bytes": totals[PAYLOAD_KIND]["bytes"],
+            "purged_chunks": totals[CHUNKS_KIND]["rows"],
+            "chunk_bytes": totals[CHUNKS_KIND]["bytes"],
+            "bytes_reclaimed": totals[PAYLOAD_KIND]["bytes"] + totals[CHUNKS_KIND]["bytes"],
+            "batches": batches,
+            "duration_seconds": round(time.perf_counter() - started, 3),
+            "complete": complete
+        }
+
+    async with AsyncSessionLocal() as db:
+        try:
+            last_id = 0
+            for kind in (PAYLOAD_KIND, CHUNKS_KIND):
+                while True:
+                    if kind == PAYLOAD_KIND:
+                        batch = await _purge_payload_batch(db, last_id, batch_size)
+                        last_id = batch["last_id"]
+                    else:
+                        batch = await _purge_chunks_batch(db, batch_size)
+                    await db.commit()  # Один коммит на пачку: блокировки строк держатся недолго
+                    batches += 1
+                    totals[kind]["rows"] += batch["rows"]
+                    totals[kind]["bytes"] += batch["bytes"]
+                    compaction_rows.inc(kind, amount=batch["rows"])
+                    compaction_bytes.inc(kind, amount=batch["bytes"])
+
+                    if batch["rows"] < batch_size:
+                        break
+                    if time.perf_counter() - started >= time_budget:
+                        logger.info("Compaction time budget of %ss exhausted", time_budget)
+                        return _summary("success")
+                    # Троттлинг: уплотнение не должно занимать БД в ущерб запросам пользователей
+                    await asyncio.sleep(pause_seconds)
+
+            complete = True
+            result = _summary("success")
+            if result["bytes_reclaimed"]:
+                logger.info(
+                    "Compaction reclaimed %s bytes (%s payloads, %s chunks)",
+                    result["bytes_reclaimed"], result["purged_payloads"], result["purged_chunks"]
+                )
+            return result
+
+        except Exception as e:
+            logger.error("Compaction error: %s", e, exc_info=True)
+            await db.rollback()
+            return {**_summary("error"), "message": f"Compaction failed: {str(e)}"}
+
+
+async def _main() -> None:
+    try:
+        logger.info("Compaction result: %s", await run_compaction())
+    finally:
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    # Разовый запуск уплотнения: python -m app.tools.compaction
+    configure_logging()
+    asyncio.run(_main())
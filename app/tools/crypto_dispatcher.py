@@ -0,0 +1,244 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .encryption import decrypt_chunk, decrypt_data, encrypt_chunk, encrypt_data, rotate_data
+from .logger_config import setup_logger
+from .metrics import crypto_bytes, crypto_duration
+from .profiling import SPAN_CRYPTO, span
+from ..config import app_config_instance
+
+logger = setup_logger(__name__)
+
+# Виды пула для тяжёлых операций
+EXECUTOR_THREAD = "thread"    # потоки: без накладных расходов на передачу данных
+EXECUTOR_PROCESS = "process"  # процессы: не зависят от GIL, но данные сериализуются
+
+EXECUTOR_KINDS = (EXECUTOR_THREAD, EXECUTOR_PROCESS)
+
+
+def _apply_batch(func: Callable, items: Sequence) -> List:
+    # Функция уровня модуля: передаётся в пул процессов
+    return [func(item) for item in items]
+
+
+class CryptoDispatcher:
+    """
+    Выполнение шифрования вне цикла событий для больших данных.
+
+    Данные меньше offload_threshold байт обрабатываются сразу (передача в пул
+    дороже самой операции), а большие — в пуле потоков или процессов, чтобы
+    шифрование одного большого секрета не задерживало остальные запросы.
+
+    Поля:
+        - offload_threshold (int): Размер данных (в байтах), начиная с которого операция уходит в пул.
+        - executor_kind (str): Вид пула (thread / process).
+        - max_workers (int): Размер пула.
+    """
+
+    def __init__(self, offload_threshold: int, executor_kind: str = EXECUTOR_THREAD, max_workers: int = 4):
+        if executor_kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown crypto executor: {executor_kind}")
+
+        self.offload_threshold = offload_threshold
+        self.executor_kind = executor_kind
+        self.max_workers = max_workers
+        self._executor: Optional[Executor] = None
+
+        # Статистика по операциям: имя -> счётчики
+        self._stats: Dict[str, Dict[str, int | float]] = {}
+
+    @classmethod
+    def from_config(cls) -> "CryptoDispatcher":
+        return cls(
+            offload_threshold=app_config_instance.CRYPTO_OFFLOAD_THRESHOLD_BYTES,
+            executor_kind=app_config_instance.CRYPTO_EXECUTOR,
+            max_workers=app_config_instance.CRYPTO_MAX_WORKERS
+        )
+
+    @property
+    def executor(self) -> Executor:
+        # Пул создаётся при первой большой операции
+        if self._executor is None:
+            if self.executor_kind == EXECUTOR_PROCESS:
+                # Модуль пула процессов загружает multiprocessing: импортируется только при выборе этого пула
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crypto")
+        return self._executor
+
+    async def warm_up(self) -> None:
+        """
+        Создание пула и запуск его рабочих заранее: процессы стартуют (и загружают ключи)
+        при первых задачах, а не при первом большом секрете.
+        """
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self.executor, encrypt_data, "warmup") for _ in range(self.max_workers)
+        ))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def call(self, op: str, func: Callable, item: Any, size: int) -> Any:
+        """
+        Выполнение одной операции: сразу или в пуле, в зависимости от размера данных.
+
+        Параметры:
+            - op (str): Имя операции (для статистики).
+            - func (Callable): Функция одного аргумента.
+            - item (Any): Аргумент функции.
+            - size (int): Размер данных в байтах.
+        """
+        started = time.perf_counter()
+        offloaded = size >= self.offload_threshold
+        with span(SPAN_CRYPTO, op):
+            if offloaded:
+                result = await asyncio.get_running_loop().run_in_executor(self.executor, func, item)
+            else:
+                result = func(item)
+        self._record(op, 1, size, offloaded, time.perf_counter() - started)
+        return result
+
+    async def map(self, op: str, func: Callable, items: Sequence, sizes: Sequence[int]) -> List:
+        """
+        Выполнение операции над пачкой данных с сохранением порядка.
+
+        Небольшая пачка обрабатывается сразу, большая делится на max_workers частей,
+        каждая из которых обрабатывается в пуле одним вызовом.
+
+        Параметры:
+            - op (str): Имя операции (для статистики).
+            - func (Callable): Функция одного аргумента.
+            - items (Sequence): Аргументы.
+            - sizes (Sequence[int]): Размеры данных в байтах (по элементу на аргумент).
+        """
+        if not items:
+            return []
+
+        started = time.perf_counter()
+        total = sum(sizes)
+        offloaded = total >= self.offload_threshold
+        with span(SPAN_CRYPTO, op):
+            if offloaded:
+                loop = asyncio.get_running_loop()
+                part = -(-len(items) // self.max_workers)  # Округление вверх
+                parts = await asyncio.gather(*(
+                    loop.run_in_executor(self.executor, _apply_batch, func, items[i:i + part])
+                    for i in range(0, len(items), part)
+                ))
+                results = [result for part_results in parts for result in part_results]
+            else:
+                results = _apply_batch(func, items)
+        self._record(op, len(items), total, offloaded, time.perf_counter() - started)
+        return results
+
+    def stats(self) -> Dict[str, Dict[str, int | float]]:
+        """
+        Статистика по операциям: количество вызовов и элементов, объём данных, время.
+        """
+        return {
+            op: {
+                **counters,
+                "total_ms": round(counters["total_ms"], 3),
+                "max_ms": round(counters["max_ms"], 3)
+            }
+            for op, counters in self._stats.items()
+        }
+
+    def _record(self, op: str, items: int, size: int, offloaded: bool, elapsed: float) -> None:
+        counters = self._stats.setdefault(op, {
+            "calls": 0,
+            "offloaded": 0,
+            "items": 0,
+            "bytes": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0
+        })
+        crypto_duration.observe(elapsed, op, "offloaded" if offloaded else "inline")
+        crypto_bytes.inc(op, amount=size)
+
+        elapsed_ms = elapsed * 1000
+        counters["calls"] += 1
+        counters["offloaded"] += int(offloaded)
+        counters["items"] += items
+        counters["bytes"] += size
+        counters["total_ms"] += elapsed_ms
+        counters["max_ms"] = max(counters["max_ms"], elapsed_ms)
+
+
+_dispatcher: Optional[CryptoDispatcher] = None
+
+
+def get_crypto_dispatcher() -> CryptoDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = CryptoDispatcher.from_config()
+    return _dispatcher
+
+
+def shutdown_crypto_dispatcher() -> None:
+    """
+    Остановка пула (вызывается из lifespan).
+    """
+    if _dispatcher is not None:
+        _dispatcher.shutdown()
+
+
+def get_crypto_stats() -> Dict[str, Dict[str, int | float]]:
+    if _dispatcher is None:
+        return {}
+    return _dispatcher.stats()
+
+
+def _size(data: Optional[str | bytes]) -> int:
+    return len(data) if data is not None else 0
+
+
+async def encrypt_data_async(data: Optional[str]) -> Optional[str]:
+    """
+    encrypt_data вне цикла событий для больших данных.
+    """
+    return await get_crypto_dispatcher().call("encrypt", encrypt_data, data, _size(data))
+
+
+async def decrypt_data_async(encrypted_data: Optional[str]) -> Optional[str]:
+    """
+    decrypt_data вне цикла событий для больших данных.
+    """
+    return await get_crypto_dispatcher().call("decrypt", decrypt_data, encrypted_data, _size(encrypted_data))
+
+
+async def encrypt_many(items: Sequence[Optional[str]]) -> List[Optional[str]]:
+    """
+    Шифрование пачки строк (пакетное создание секретов).
+    """
+    return await get_crypto_dispatcher().map("encrypt", encrypt_data, items, [_size(item) for item in items])
+
+
+async def rotate_many(items: Sequence[Optional[str]]) -> List[Optional[str]]:
+    """
+    Перешифрование пачки токенов основным ключом (ротация ключей).
+    """
+    return await get_crypto_dispatcher().map("rotate", rotate_data, items, [_size(item) for item in items])
+
+
+async def encrypt_chunk_async(data_key: bytes, secret_key: str, seq: int, data: bytes, final: bool) -> bytes:
+    """
+    encrypt_chunk вне цикла событий для больших сегментов.
+    """
+    func = partial(encrypt_chunk, data_key, secret_key, seq, final=final)
+    return await get_crypto_dispatcher().call("encrypt_chunk", func, data, len(data))
+
+
+async def decrypt_chunk_async(data_key: bytes, secret_key: str, seq: int, data: bytes, final: bool) -> bytes:
+    """
+    decrypt_chunk вне цикла событий для больших сегментов.
+    """
+    func = partial(decrypt_chunk, data_key, secret_key, seq, final=final)
+    return await get_crypto_dispatcher().call("decrypt_chunk", func, data, len(data))
@@ -1,18 +1,16 @@
-from cryptography.fernet import Fernet
-from dotenv import load_dotenv
+import base64
+import hashlib
+import hmac
 import os
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Tuple
 
-# Загрузка переменных окружения из .env
-load_dotenv()
-
-# Получение ключа из переменной окружения
-ENCRYPTION_KEY: bytes = os.getenv("ENCRYPTION_KEY").encode()
+from .keyring import get_keyring
 
 
 def encrypt_data(data: Optional[str]) -> Optional[str]:
     """
-    Шифрует строку с использованием Fernet.
+    Шифрует строку основным ключом из набора ключей (Fernet).
 
     Параметры:
         - data (Optional[str]): Данные для шифрования.
@@ -23,14 +21,13 @@ def encrypt_data(data: Optional[str]) -> Optional[str]:
     if data is None:
         return None  # Если данные отсутствуют, возвращаем None
 
-    fernet = Fernet(ENCRYPTION_KEY)
-    encrypted = fernet.encrypt(data.encode())  # Шифруем данные
+    encrypted = get_keyring().encrypt(data.encode())  # Шифруем данные
     return encrypted.decode()  # Возвращаем зашифрованные данные как строку
 
 
 def decrypt_data(encrypted_data: Optional[str]) -> Optional[str]:
     """
-    Дешифрует строку с использованием Fernet.
+    Дешифрует строку любым ключом из набора ключей (основным или выведенным из оборота).
 
     Параметры:
         - encrypted_data (Optional[str]): Зашифрованные данные.
@@ -41,6 +38,133 @@ def decrypt_data(encrypted_data: Optional[str]) -> Optional[str]:
     if encrypted_data is None:
         return None  # Если данные отсутствуют, возвращаем None
 
-    fernet = Fernet(ENCRYPTION_KEY)
-    decrypted = fernet.decrypt(encrypted_data.encode())  # Дешифруем данные
-    return decrypted.decode()  # Возвращаем расшифрованные данные как строку
\ No newline at end of file
+    decrypted = get_keyring().decrypt(encrypted_data.encode())  # Дешифруем данные
+    return decrypted.decode()  # Возвращаем расшифрованные данные как строку
+
+
+def rotate_data(encrypted_data: Optional[str]) -> Optional[str]:
+    """
+    Перешифровывает строку основным ключом.
+
+    Параметры:
+        - encrypted_data (Optional[str]): Данные, зашифрованные любым ключом из набора.
+
+    Возвращает:
+        - Optional[str]: Данные, зашифрованные основным ключом, или None.
+    """
+    if encrypted_data is None:
+        return None
+
+    return get_keyring().rotate(encrypted_data.encode()).decode()
+
+
+@lru_cache(maxsize=1)
+def _get_passphrase_digest_key() -> bytes:
+    """
+    Ключ HMAC для паролей секретов (PASSPHRASE_DIGEST_KEY).
+
+    Ключ не зависит от ключей шифрования: их ротация не должна менять дайджесты паролей.
+    """
+    key = os.getenv("PASSPHRASE_DIGEST_KEY")
+    if not key:
+        raise ValueError("PASSPHRASE_DIGEST_KEY is not set in environment variables.")
+    return key.encode()
+
+
+def digest_passphrase(passphrase: Optional[str]) -> Optional[str]:
+    """
+    Вычисляет ключевой дайджест пароля (HMAC-SHA256).
+
+    Параметры:
+        - passphrase (Optional[str]): Пароль.
+
+    Возвращает:
+        - Optional[str]: Дайджест в виде hex-строки или None, если пароль не задан.
+    """
+    if passphrase is None:
+        return None
+
+    return hmac.new(_get_passphrase_digest_key(), passphrase.encode(), hashlib.sha256).hexdigest()
+
+
+def verify_passphrase(passphrase: Optional[str], passphrase_digest: Optional[str]) -> bool:
+    """
+    Проверяет пароль по сохранённому дайджесту сравнением за постоянное время.
+
+    Параметры:
+        - passphrase (Optional[str]): Пароль из запроса.
+        - passphrase_digest (Optional[str]): Сохранённый дайджест.
+
+    Возвращает:
+        - bool: True, если пароль верен.
+    """
+    if passphrase is None or passphrase_digest is None:
+        return False
+
+    return hmac.compare_digest(digest_passphrase(passphrase), passphrase_digest)
+
+
+def new_stream_key() -> Tuple[bytes, str]:
+    """
+    Создаёт ключ данных (AES-256-GCM) для потокового секрета.
+
+    Ключ данных свой у каждого секрета и хранится зашифрованным набором ключей
+    (как обычный секрет), поэтому ротация ключей перешифровывает только его,
+    а не все сегменты.
+
+    Возвращает:
+        - Tuple[bytes, str]: Ключ данных и он же, зашифрованный основным ключом.
+    """
+    data_key = _aesgcm_class().generate_key(bit_length=256)
+    return data_key, encrypt_data(base64.urlsafe_b64encode(data_key).decode())
+
+
+def open_stream_key(encrypted_data_key: str) -> bytes:
+    """
+    Расшифровывает ключ данных потокового секрета.
+    """
+    return base64.urlsafe_b64decode(decrypt_data(encrypted_data_key))
+
+
+def _aesgcm_class():
+    # Потоковые секреты используются редко: AES-GCM загружается при первом обращении, а не при импорте
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    return AESGCM
+
+
+def _chunk_nonce_and_aad(secret_key: str, seq: int, final: bool) -> Tuple[bytes, bytes]:
+    # Ключ данных уникален для секрета, поэтому номер сегмента годится как nonce.
+    # Ключ секрета, номер и признак последнего сегмента входят в AAD: сегменты
+    # нельзя переставить, подменить из другого секрета или отрезать хвост.
+    nonce = seq.to_bytes(12, "big")
+    aad = f"{secret_key}:{seq}:{int(final)}".encode()
+    return nonce, aad
+
+
+def encrypt_chunk(data_key: bytes, secret_key: str, seq: int, data: bytes, final: bool) -> bytes:
+    """
+    Шифрует сегмент потокового секрета (AES-GCM).
+
+    Параметры:
+        - data_key (bytes): Ключ данных секрета.
+        - secret_key (str): Уникальный ключ секрета.
+        - seq (int): Номер сегмента (с 0).
+        - data (bytes): Открытые данные сегмента.
+        - final (bool): Последний ли это сегмент.
+
+    Возвращает:
+        - bytes: Зашифрованный сегмент (с тегом аутентификации).
+    """
+    nonce, aad = _chunk_nonce_and_aad(secret_key, seq, final)
+    return _aesgcm_class()(data_key).encrypt(nonce, data, aad)
+
+
+def decrypt_chunk(data_key: bytes, secret_key: str, seq: int, data: bytes, final: bool) -> bytes:
+    """
+    Расшифровывает и проверяет сегмент потокового секрета.
+
+    Вызывает:
+        - cryptography.exceptions.InvalidTag: Если сегмент повреждён, переставлен или отрезан.
+    """
+    nonce, aad = _chunk_nonce_and_aad(secret_key, seq, final)
+    return _aesgcm_class()(data_key).decrypt(nonce, data, aad)
@@ -0,0 +1,238 @@
+import asyncio
+import uuid
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, func, select, update
+
+from .crypto_dispatcher import rotate_many
+from .keyring import get_keyring
+from .logger_config import configure_logging, setup_logger
+from ..cache.redis_config import close_redis, get_redis_client, init_redis
+from ..cache.secret_cache import SECRET_FIELD, rewrite_cached_secrets
+from ..config import app_config_instance
+from ..database import models
+from ..database.config import AsyncSessionLocal, dispose_engine
+
+logger = setup_logger(__name__)
+
+# Прогресс ротации хранится в Redis, поэтому прерванная ротация продолжается
+# с последнего обработанного ID (в том числе после перезапуска процесса)
+PROGRESS_KEY = "key_rotation:progress"
+# Блокировка не даёт нескольким воркерам перешифровывать одни и те же строки
+LOCK_KEY = "key_rotation:lock"
+LOCK_TTL_SECONDS = 60
+
+# Продление и снятие блокировки только владельцем: блокировка, истёкшая во время
+# долгой пачки и взятая другим процессом, не продлевается и не удаляется чужим процессом
+RENEW_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_renew_lock_script = None
+_release_lock_script = None
+
+
+async def _renew_lock(redis_client, token: str) -> bool:
+    global _renew_lock_script
+    if _renew_lock_script is None or _renew_lock_script.registered_client is not redis_client:
+        _renew_lock_script = redis_client.register_script(RENEW_LOCK_SCRIPT)
+    return bool(await _renew_lock_script(keys=[LOCK_KEY], args=[token, LOCK_TTL_SECONDS]))
+
+
+async def _release_lock(redis_client, token: str) -> None:
+    global _release_lock_script
+    if _release_lock_script is None or _release_lock_script.registered_client is not redis_client:
+        _release_lock_script = redis_client.register_script(RELEASE_LOCK_SCRIPT)
+    await _release_lock_script(keys=[LOCK_KEY], args=[token])
+
+
+async def _load_progress(redis_client, fingerprint: str) -> Dict[str, int | bool]:
+    """
+    Чтение прогресса ротации для текущего основного ключа.
+    Прогресс, сохранённый для другого основного ключа, игнорируется (начинается новая ротация).
+    """
+    progress = await redis_client.hgetall(PROGRESS_KEY)
+    if progress.get("fingerprint") != fingerprint:
+        return {"last_id": 0, "rotated": 0, "done": False}
+    return {
+        "last_id": int(progress.get("last_id", 0)),
+        "rotated": int(progress.get("rotated", 0)),
+        "done": progress.get("done") == "1"
+    }
+
+
+async def _save_progress(redis_client, fingerprint: str, last_id: int, rotated: int, done: bool) -> None:
+    await redis_client.hset(PROGRESS_KEY, mapping={
+        "fingerprint": fingerprint,
+        "last_id": last_id,
+        "rotated": rotated,
+        "done": "1" if done else "0"
+    })
+
+
+async def rotate_batch(after_id: int, batch_size: int) -> Dict[str, int]:
+    """
+    Перешифрование одной пачки живых секретов (и их записей в кеше) основным ключом.
+
+    Параметры:
+        - after_id (int): ID, после которого начинается пачка.
+        - batch_size (int): Максимальный размер пачки.
+
+    Возвращает:
+        - Dict[str, int]: {"last_id": ..., "rotated": ..., "cached": ...}
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(
+                models.Secret.id,
+                models.Secret.expires_at,
+                models.Secret.secret_key,
+                models.Secret.encrypted_secret
+            )
+            .where(
+                models.Secret.id > after_id,
+                models.Secret.is_deleted == False,
+                models.Secret.is_accessed == False,
+                # Потоковый секрет без ключа данных ещё загружается: перешифровывать нечего
+                models.Secret.encrypted_secret.isnot(None),
+                models.Secret.expires_at > func.now()
+            )
+            .order_by(models.Secret.id)
+            .limit(batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            return {"last_id": after_id, "rotated": 0, "cached": 0}
+
+        # Вся пачка перешифровывается одним вызовом (при большом объёме — в пуле)
+        rotated_secrets = await rotate_many([row.encrypted_secret for row in rows])
+
+        params = []
+        cache_entries: Dict[str, Dict[str, str]] = {}
+        for row, encrypted_secret in zip(rows, rotated_secrets):
+            params.append({
+                "b_id": row.id,
+                "b_expires_at": row.expires_at,
+                "b_old": row.encrypted_secret,
+                "b_secret": encrypted_secret
+            })
+            cache_entries[row.secret_key] = {SECRET_FIELD: encrypted_secret}
+
+        # Одно выполнение UPDATE на всю пачку (executemany); expires_at ограничивает UPDATE одной секцией.
+        # Секрет, прочитанный или удалённый во время перешифрования, уже очищен: шифротекст не возвращается.
+        # Условие на прежний шифротекст (сравнение с заменой) не даёт затереть данные, изменённые за это время
+        secrets_table = models.Secret.__table__
+        await db.execute(
+            update(secrets_table)
+            .where(
+                secrets_table.c.id == bindparam("b_id"),
+                secrets_table.c.expires_at == bindparam("b_expires_at"),
+                secrets_table.c.is_accessed == False,
+                secrets_table.c.is_deleted == False,
+                secrets_table.c.encrypted_secret == bindparam("b_old")
+            )
+            .values(encrypted_secret=bindparam("b_secret")),
+            params
+        )
+        await db.commit()
+
+    cached = 0
+    try:
+        cached = await rewrite_cached_secrets(get_redis_client(), cache_entries)
+    except Exception as e:
+        # Кеш живёт не дольше 5 минут: старые записи расшифровываются выведенным ключом до истечения
+        logger.error("Redis error during key rotation: %s", e)
+
+    return {"last_id": rows[-1].id, "rotated": len(rows), "cached": cached}
+
+
+async def run_key_rotation(
+        batch_size: Optional[int] = None,
+        pause_seconds: Optional[float] = None
+) -> Dict[str, int | str | bool]:
+    """
+    Перешифрование всех живых секретов основным ключом пачками с паузами между ними.
+
+    Параметры:
+        - batch_size (Optional[int]): Размер пачки (по умолчанию KEY_ROTATION_BATCH_SIZE).
+        - pause_seconds (Optional[float]): Пауза между пачками (по умолчанию KEY_ROTATION_PAUSE_SECONDS).
+
+    Возвращает:
+        - Dict[str, int | str | bool]: Итог ротации.
+          Пример:
+          {
+              "status": "success",
+              "fingerprint": "3f1a9c0b2d4e",
+              "rotated": 1200,
+              "last_id": 5321
+          }
+    """
+    batch_size = batch_size or app_config_instance.KEY_ROTATION_BATCH_SIZE
+    pause_seconds = app_config_instance.KEY_ROTATION_PAUSE_SECONDS if pause_seconds is None else pause_seconds
+
+    keyring = get_keyring()
+    fingerprint = keyring.primary_fingerprint
+    redis_client = get_redis_client()
+
+    # Значение блокировки уникально для запуска: у процессов с тем же основным ключом совпадает отпечаток
+    token = f"{fingerprint}:{uuid.uuid4().hex}"
+    if not await redis_client.set(LOCK_KEY, token, nx=True, ex=LOCK_TTL_SECONDS):
+        logger.info("Key rotation is already running in another process")
+        return {"status": "skipped", "fingerprint": fingerprint, "rotated": 0, "done": False}
+
+    try:
+        progress = await _load_progress(redis_client, fingerprint)
+        if progress["done"]:
+            return {"status": "success", "fingerprint": fingerprint, **progress}
+
+        last_id, rotated = progress["last_id"], progress["rotated"]
+        logger.info("Key rotation to %s started from id=%s", fingerprint, last_id)
+
+        while True:
+            batch = await rotate_batch(last_id, batch_size)
+            last_id = batch["last_id"]
+            rotated += batch["rotated"]
+            done = batch["rotated"] < batch_size
+
+            # Продлеваем блокировку, пока ротация идёт. Если она истекла и перешла к другому
+            # процессу, ротация останавливается, не перезаписывая его прогресс
+            # (уже перешифрованные строки повторно не меняются: UPDATE сравнивает старый шифротекст)
+            if not await _renew_lock(redis_client, token):
+                logger.warning("Key rotation lock expired at id=%s, another process continues the rotation", last_id)
+                return {"status": "lost_lock", "fingerprint": fingerprint, "rotated": rotated, "last_id": last_id, "done": False}
+            await _save_progress(redis_client, fingerprint, last_id, rotated, done)
+
+            if done:
+                break
+            # Троттлинг: ротация не должна занимать БД в ущерб запросам пользователей
+            await asyncio.sleep(pause_seconds)
+
+        logger.info("Key rotation to %s finished: rotated=%s, last_id=%s", fingerprint, rotated, last_id)
+        return {"status": "success", "fingerprint": fingerprint, "rotated": rotated, "last_id": last_id, "done": True}
+    finally:
+        await _release_lock(redis_client, token)
+
+
+async def _main() -> None:
+    await init_redis()
+    try:
+        logger.info("Key rotation result: %s", await run_key_rotation())
+    finally:
+        await close_redis()
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    # Разовый запуск ротации: python -m app.tools.key_rotation
+    configure_logging()
+    asyncio.run(_main())
@@ -0,0 +1,101 @@
+import hashlib
+import os
+from functools import lru_cache
+from typing import List, Optional, TYPE_CHECKING
+
+# .env загружается при импорте конфигурации (в том числе в процессах пула шифрования)
+from ..config import app_config_instance  # noqa: F401
+
+if TYPE_CHECKING:
+    from cryptography.fernet import Fernet, MultiFernet
+
+
+class KeyRing:
+    """
+    Набор ключей шифрования: основной ключ и выведенные из оборота (retired).
+
+    Новые данные всегда шифруются основным ключом, а расшифровываются любым ключом
+    из набора, поэтому смена ключа не ломает уже сохранённые секреты.
+
+    Поля:
+        - primary (Fernet): Шифр основного ключа.
+        - cipher (MultiFernet): Шифр всего набора (основной ключ — первый).
+        - primary_fingerprint (str): Отпечаток основного ключа (для логов и прогресса ротации).
+        - size (int): Количество ключей в наборе.
+    """
+
+    def __init__(self, keys: List[bytes]):
+        if not keys:
+            raise ValueError("Encryption key ring is empty: set ENCRYPTION_KEY or ENCRYPTION_KEY_FILE.")
+
+        # Шифры создаются при первом обращении к набору ключей (прогрев в lifespan), а не при импорте
+        from cryptography.fernet import Fernet, MultiFernet
+
+        fernets = [Fernet(key) for key in keys]
+        self.primary: "Fernet" = fernets[0]
+        self.cipher: "MultiFernet" = MultiFernet(fernets)
+        self.primary_fingerprint: str = hashlib.sha256(keys[0]).hexdigest()[:12]
+        self.size: int = len(fernets)
+
+    def encrypt(self, data: bytes) -> bytes:
+        return self.cipher.encrypt(data)
+
+    def decrypt(self, token: bytes) -> bytes:
+        return self.cipher.decrypt(token)
+
+    def rotate(self, token: bytes) -> bytes:
+        """
+        Перешифрование токена основным ключом (токен может быть зашифрован любым ключом набора).
+        """
+        return self.cipher.rotate(token)
+
+
+def _read_key_file(path: str) -> List[bytes]:
+    """
+    Чтение ключей из файла: по одному ключу на строку, первая строка — основной ключ.
+    Пустые строки и строки, начинающиеся с '#', пропускаются.
+    """
+    with open(path, encoding="utf-8") as f:
+        return [
+            line.strip().encode()
+            for line in f
+            if line.strip() and not line.strip().startswith("#")
+        ]
+
+
+def _load_keys() -> List[bytes]:
+    """
+    Загрузка ключей из окружения.
+
+    Источники (в порядке приоритета):
+        - ENCRYPTION_KEY_FILE: путь к файлу с ключами;
+        - ENCRYPTION_KEY (основной) и ENCRYPTION_RETIRED_KEYS (через запятую).
+    """
+    key_file: Optional[str] = os.getenv("ENCRYPTION_KEY_FILE")
+    if key_file:
+        return _read_key_file(key_file)
+
+    keys: List[bytes] = []
+    primary = os.getenv("ENCRYPTION_KEY")
+    if primary:
+        keys.append(primary.strip().encode())
+
+    retired = os.getenv("ENCRYPTION_RETIRED_KEYS", "")
+    keys.extend(key.strip().encode() for key in retired.split(",") if key.strip())
+    return keys
+
+
+@lru_cache(maxsize=1)
+def get_keyring() -> KeyRing:
+    """
+    Набор ключей процесса. Объекты шифров создаются один раз и переиспользуются.
+    """
+    return KeyRing(_load_keys())
+
+
+def reload_keyring() -> KeyRing:
+    """
+    Повторное чтение ключей (например, после замены файла с ключами).
+    """
+    get_keyring.cache_clear()
+    return get_keyring()
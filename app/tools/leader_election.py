@@ -0,0 +1,313 @@
+import asyncio
+import os
+import socket
+import time
+from typing import Awaitable, Dict, Optional, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from .logger_config import setup_logger
+from ..cache.redis_config import get_redis_client
+from ..database.config import get_engine
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+# Способы выбора лидера
+BACKEND_POSTGRES = "postgres"  # pg_try_advisory_lock на выделенном соединении
+BACKEND_REDIS = "redis"        # аренда ключа в Redis (SET NX PX с продлением)
+
+LEADER_BACKENDS = (BACKEND_POSTGRES, BACKEND_REDIS)
+
+# Продление и освобождение аренды только владельцем (сравнение значения ключа с идентификатором)
+RENEW_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeadershipLost(Exception):
+    """
+    Лидерство потеряно во время выполнения задачи лидера.
+    """
+
+
+class LeaderElection:
+    """
+    Выбор одного лидера среди всех процессов (воркеров и реплик) для фоновой задачи.
+
+    Основной способ — сессионная advisory-блокировка Postgres на выделенном
+    соединении: при падении процесса соединение закрывается и блокировка
+    освобождается сама. Держатель блокировки также занимает аренду ключа в Redis
+    с TTL, которую продлевает при каждой проверке. Если advisory-блокировки
+    недоступны (например, за PgBouncer в режиме транзакций или при сбое Postgres),
+    лидером становится процесс, получивший свободную аренду.
+
+    Состояние (текущий лидер, способ выбора, время последнего запуска задачи)
+    публикуется в Redis и доступно всем процессам.
+
+    Поля:
+        - name (str): Имя задачи (используется в ключах Redis).
+        - lock_id (int): Идентификатор advisory-блокировки.
+        - lease_ttl (float): TTL аренды в Redis (в секундах).
+        - backend (str): Предпочтительный способ выбора (postgres / redis).
+        - identity (str): Идентификатор процесса (host:pid).
+    """
+
+    def __init__(self, name: str, lock_id: int, lease_ttl: float, backend: str = BACKEND_POSTGRES):
+        if backend not in LEADER_BACKENDS:
+            raise ValueError(f"Unknown leader election backend: {backend}")
+
+        self.name = name
+        self.lock_id = lock_id
+        self.lease_ttl = lease_ttl
+        self.backend = backend
+        self.identity = f"{socket.gethostname()}:{os.getpid()}"
+
+        self.lease_key = f"leader:{name}:lease"
+        self.status_key = f"leader:{name}:status"
+
+        # Способ, которым получено лидерство (None — процесс не лидер)
+        self.held_by: Optional[str] = None
+        self._connection: Optional[AsyncConnection] = None
+        self._renew_script = None
+        self._release_script = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.held_by is not None
+
+    async def ensure(self) -> bool:
+        """
+        Проверка (или продление) лидерства, а если процесс не лидер — попытка им стать.
+
+        Держатель advisory-блокировки занимает и продлевает ту же аренду в Redis, поэтому
+        процесс, перешедший на аренду из-за сбоя Postgres, становится лидером только
+        при отсутствии другого лидера. Лидер по аренде при каждой проверке снова пробует
+        advisory-блокировку и уступает лидерство, как только Postgres доступен.
+
+        Возвращает:
+            - bool: True, если процесс — лидер.
+        """
+        if self.backend == BACKEND_POSTGRES:
+            try:
+                locked = await self._hold_advisory_lock()
+            except Exception as e:
+                logger.warning("Advisory lock for %s is unavailable, falling back to Redis lease: %s", self.name, e)
+            else:
+                if not locked:
+                    # Блокировку держит другой процесс (лидер по аренде уступает ему)
+                    if self.is_leader:
+                        await self._lost_leadership()
+                    return False
+                if await self._hold_lease():
+                    if self.held_by != BACKEND_POSTGRES:
+                        await self._elected(BACKEND_POSTGRES)
+                    return True
+                # Аренду держит процесс, перешедший на Redis: он уступит её при следующей проверке
+                if self.is_leader:
+                    logger.warning("%s lost %s leadership: Redis lease is held by another process", self.identity, self.name)
+                    self.held_by = None
+                return False
+
+        try:
+            if await self._renew_lease() or await self._try_lease():
+                if self.held_by != BACKEND_REDIS:
+                    await self._elected(BACKEND_REDIS)
+                return True
+        except Exception as e:
+            logger.error("Redis lease for %s is unavailable: %s", self.name, e)
+        if self.is_leader:
+            await self._lost_leadership()
+        return False
+
+    async def run_as_leader(self, work: Awaitable[T]) -> T:
+        """
+        Выполнение задачи лидера с продлением лидерства каждые lease_ttl / 3 секунд.
+
+        Между проверками ensure() аренда иначе не продлевается, и долгая задача
+        пережила бы её TTL. Если продлить лидерство не удалось (аренду занял другой
+        процесс или Redis недоступен для лидера по аренде), задача отменяется:
+        новый лидер может уже выполнять ту же работу.
+
+        Параметры:
+            - work (Awaitable[T]): Задача лидера.
+
+        Возвращает:
+            - T: Результат задачи.
+
+        Вызывает:
+            - LeadershipLost: Лидерство потеряно, задача отменена.
+        """
+        task = asyncio.ensure_future(work)
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.lease_ttl / 3)
+                if done:
+                    return task.result()
+                if not await self._renew_leadership():
+                    task.cancel()
+                    await asyncio.wait({task})
+                    await self._lost_leadership()
+                    raise LeadershipLost(f"{self.identity} lost {self.name} leadership during the leader task")
+        finally:
+            if not task.done():
+                # Отмена снаружи (остановка приложения) отменяет и задачу
+                task.cancel()
+                await asyncio.wait({task})
+
+    async def release(self) -> None:
+        """
+        Добровольное освобождение лидерства (при остановке приложения).
+        """
+        if self._connection is not None:
+            try:
+                await self._connection.execute(
+                    text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": self.lock_id}
+                )
+            except Exception as e:
+                logger.warning("Failed to release advisory lock for %s: %s", self.name, e)
+        if self.is_leader:
+            await self._release_lease()
+            await self.publish(released_at=time.time())
+            logger.info("%s released %s leadership", self.identity, self.name)
+        self.held_by = None
+        await self._close_connection()
+
+    async def publish(self, **fields: str | int | float) -> None:
+        """
+        Публикация состояния лидера в Redis (только для лидера, ошибки Redis не критичны).
+        """
+        if not self.is_leader:
+            return
+        try:
+            await get_redis_client().hset(self.status_key, mapping={"leader": self.identity, **fields})
+        except Exception as e:
+            logger.warning("Failed to publish %s leader status: %s", self.name, e)
+
+    async def get_status(self) -> Dict[str, str | bool]:
+        """
+        Общее состояние выбора лидера и состояние текущего процесса.
+        """
+        status: Dict[str, str | bool] = {"identity": self.identity, "is_leader": self.is_leader}
+        try:
+            status.update(await get_redis_client().hgetall(self.status_key))
+        except Exception as e:
+            status["error"] = str(e)
+        return status
+
+    async def _try_advisory_lock(self) -> bool:
+        # Соединение остаётся открытым всё время лидерства: блокировка живёт, пока жива сессия.
+        # AUTOCOMMIT — чтобы соединение не висело в состоянии "idle in transaction".
+        connection = await get_engine().connect()
+        try:
+            connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+            acquired = (await connection.execute(
+                text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": self.lock_id}
+            )).scalar_one()
+        except Exception:
+            await connection.close()
+            raise
+
+        if not acquired:
+            await connection.close()
+            return False
+        self._connection = connection
+        return True
+
+    async def _hold_advisory_lock(self) -> bool:
+        """
+        Проверка удерживаемой advisory-блокировки или попытка её получить.
+
+        Вызывает:
+            - Exception: Postgres недоступен.
+        """
+        if self._connection is not None:
+            try:
+                await self._connection.execute(text("SELECT 1"))
+                return True
+            except Exception as e:
+                # Соединение потеряно — вместе с ним освобождена и блокировка
+                logger.warning("Lost advisory lock connection for %s: %s", self.name, e)
+                await self._close_connection()
+        return await self._try_advisory_lock()
+
+    async def _hold_lease(self) -> bool:
+        """
+        Аренда в Redis для держателя advisory-блокировки: продление своей или получение свободной.
+
+        Если Redis недоступен, лидерство остаётся за держателем блокировки: без Redis
+        никто не может получить аренду.
+        """
+        try:
+            return await self._renew_lease() or await self._try_lease()
+        except Exception as e:
+            logger.warning("Redis lease for %s is unavailable, keeping advisory lock leadership: %s", self.name, e)
+            return True
+
+    async def _renew_leadership(self) -> bool:
+        """
+        Продление лидерства без попытки его получить (во время задачи лидера).
+        """
+        if self.held_by == BACKEND_POSTGRES:
+            return await self._hold_lease()
+        try:
+            return await self._renew_lease()
+        except Exception as e:
+            logger.error("Failed to renew Redis lease for %s: %s", self.name, e)
+            return False
+
+    async def _try_lease(self) -> bool:
+        return bool(await get_redis_client().set(
+            self.lease_key, self.identity, nx=True, px=int(self.lease_ttl * 1000)
+        ))
+
+    async def _renew_lease(self) -> bool:
+        redis_client = get_redis_client()
+        if self._renew_script is None or self._renew_script.registered_client is not redis_client:
+            self._renew_script = redis_client.register_script(RENEW_LEASE_SCRIPT)
+        return bool(await self._renew_script(
+            keys=[self.lease_key], args=[self.identity, int(self.lease_ttl * 1000)]
+        ))
+
+    async def _release_lease(self) -> None:
+        try:
+            redis_client = get_redis_client()
+            if self._release_script is None or self._release_script.registered_client is not redis_client:
+                self._release_script = redis_client.register_script(RELEASE_LEASE_SCRIPT)
+            await self._release_script(keys=[self.lease_key], args=[self.identity])
+        except Exception as e:
+            logger.warning("Failed to release Redis lease for %s: %s", self.name, e)
+
+    async def _elected(self, backend: str) -> None:
+        self.held_by = backend
+        logger.info("%s became %s leader via %s", self.identity, self.name, backend)
+        await self.publish(backend=backend, elected_at=time.time())
+
+    async def _lost_leadership(self) -> None:
+        logger.warning("%s lost %s leadership", self.identity, self.name)
+        self.held_by = None
+        # Аренда освобождается сразу, чтобы новый лидер не ждал истечения её TTL
+        await self._release_lease()
+        await self._close_connection()
+
+    async def _close_connection(self) -> None:
+        if self._connection is not None:
+            try:
+                # Соединение не возвращается в пул: вместе с сессией гарантированно снимается и блокировка
+                await self._connection.invalidate()
+                await self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
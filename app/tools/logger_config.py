@@ -1,21 +1,153 @@
+import atexit
+import copy
+import json
 import logging
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
 
-def setup_logger(name: str, level=logging.INFO) -> logging.Logger:
+from ..config import app_config_instance
+
+# Атрибуты LogRecord, которые не считаются дополнительными полями (extra=...)
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
     """
-    Настройка логгера с выводом только в консоль.
-    :param name: Имя логгера (обычно __name__).
-    :param level: Уровень логирования (по умолчанию INFO).
-    :return: Экземпляр Logger.
+    Одна запись — одна строка JSON: время, уровень, логгер, сообщение,
+    дополнительные поля (extra=...) и трассировка исключения.
     """
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
 
-    # Формат логов
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
 
-    # Логирование в консоль
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
 
-    return logger
\ No newline at end of file
+class SamplingFilter(logging.Filter):
+    """
+    Выборка записей частых событий: для логгеров из rates (с учётом вложенности имён)
+    сохраняется указанная доля записей ниже WARNING. Предупреждения и ошибки не отбрасываются.
+
+    Поля:
+        - rates (Dict[str, float]): Имя логгера -> доля сохраняемых записей.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        name = record.name
+        while name:
+            rate = self.rates.get(name)
+            if rate is not None:
+                return random.random() < rate
+            name = name.rpartition(".")[0]
+        return True
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    # Стандартный prepare() превращает трассировку в часть сообщения; здесь сообщение
+    # подставляется (аргументы могут измениться после возврата), а трассировка сохраняется
+    # отдельно, чтобы форматтер в потоке записи вывел её своим полем
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _parse_mapping(value: str) -> Dict[str, str]:
+    # "app.crud=WARNING,sqlalchemy.pool=DEBUG" -> {"app.crud": "WARNING", "sqlalchemy.pool": "DEBUG"}
+    result = {}
+    for item in value.split(","):
+        name, sep, setting = item.partition("=")
+        if sep and name.strip():
+            result[name.strip()] = setting.strip()
+    return result
+
+
+def configure_logging() -> None:
+    """
+    Настройка логирования приложения (один раз при запуске; повторные вызовы ничего не делают).
+
+    Записи из любых потоков и задач ставятся в очередь (QueueHandler), а вывод в консоль
+    выполняет отдельный поток (QueueListener): запрос не ждёт записи в консоль.
+    Формат (json / text), общий уровень, уровни отдельных модулей, доли выборки
+    и вывод SQL-запросов задаются в конфигурации (LOG_* и DATABASE_ECHO).
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    if app_config_instance.LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    queue_handler = _NonBlockingQueueHandler(queue.SimpleQueue())
+    rates = {name: float(rate) for name, rate in _parse_mapping(app_config_instance.LOG_SAMPLE_RATES).items()}
+    queue_handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(app_config_instance.LOG_LEVEL.upper())
+
+    # SQL-запросы выводятся через общий конвейер, а не собственным обработчиком SQLAlchemy (echo=True)
+    logging.getLogger("sqlalchemy.engine").setLevel(
+        logging.INFO if app_config_instance.DATABASE_ECHO else logging.WARNING
+    )
+    for name, level in _parse_mapping(app_config_instance.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """
+    Остановка потока записи с выводом оставшихся в очереди записей.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logger(name: str, level: Optional[int] = None) -> logging.Logger:
+    """
+    Получение логгера модуля. Обработчики не добавляются: записи передаются
+    корневому логгеру, который настраивается один раз в configure_logging.
+    :param name: Имя логгера (обычно __name__).
+    :param level: Уровень логирования (по умолчанию — общий уровень или LOG_LEVELS).
+    :return: Экземпляр Logger.
+    """
+    logger = logging.getLogger(name)
+    if level is not None:
+        logger.setLevel(level)
+    return logger
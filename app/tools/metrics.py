@@ -0,0 +1,364 @@
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Метрики обновляются из потока цикла событий (в том числе результаты операций,
+# выполненных в пулах), поэтому блокировки не нужны: обновление — это поиск
+# в словаре и увеличение числа, а сериализация выполняется только при чтении /metrics.
+
+# Границы корзин по умолчанию (в секундах): от 1 мс до 10 с
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == math.inf else repr(float(bound))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _check(self, labels: LabelValues) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return labels
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """
+    Монотонно растущий счётчик.
+    """
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        labels = self._check(labels)
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self._values.items()):
+            yield "", self.labelnames, labels, value
+
+
+class Gauge(_Metric):
+    """
+    Текущее значение. Вместо явной установки можно передать функцию,
+    которая вычисляет значения при чтении /metrics (labels -> value).
+    """
+    type_name = "gauge"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            collect: Optional[Callable[[], Dict[LabelValues, float]]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._collect = collect
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[self._check(labels)] = value
+
+    def samples(self):
+        values = self._values
+        if self._collect is not None:
+            try:
+                values = self._collect()
+            except Exception:
+                values = {}  # Источник недоступен (например, пул ещё не создан)
+        for labels, value in sorted(values.items()):
+            yield "", self.labelnames, labels, value
+
+
+class Histogram(_Metric):
+    """
+    Гистограмма с фиксированными корзинами: на одно наблюдение — бинарный поиск и два сложения.
+    """
+    type_name = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [счётчики по корзинам (без накопления) + корзина +Inf, сумма]
+        self._values: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        labels = self._check(labels)
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def samples(self):
+        bucket_names = self.labelnames + ("le",)
+        for labels, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield "_bucket", bucket_names, labels + (_format_bound(bound),), cumulative
+            yield "_sum", self.labelnames, labels, total
+            yield "_count", self.labelnames, labels, cumulative
+
+
+class MetricsRegistry:
+    """
+    Набор метрик с выводом в текстовом формате Prometheus.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), collect=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, collect))
+
+    def histogram(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# === HTTP ===
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until response headers are sent.",
+    ("method", "route")
+)
+http_responses = registry.counter(
+    "http_responses_total",
+    "HTTP responses by route and status code.",
+    ("method", "route", "status")
+)
+
+# === Чтение секретов ===
+# branch="cache": результат атомарного чтения из Redis (hit / miss / tombstone / error);
+# branch="db_fallback": чтения, дошедшие до БД, по причине (miss / error / claim_failed),
+# и ошибки Redis на этом пути (redis_error)
+secret_reads = registry.counter(
+    "secret_read_redis_total",
+    "get_secret Redis outcomes for the cache branch and the DB fallback.",
+    ("branch", "result")
+)
+
+# === Ограничение запросов ===
+rate_limit_rejections = registry.counter(
+    "rate_limit_rejected_requests_total",
+    "Requests rejected with 429 by limit and scope.",
+    ("limit", "scope")
+)
+rate_limit_fallbacks = registry.counter(
+    "rate_limit_local_fallback_total",
+    "Rate limit checks done in process because Redis was unavailable.",
+    ("limit",)
+)
+
+# === Контроль допуска ===
+admission_rejections = registry.counter(
+    "admission_rejected_requests_total",
+    "Requests rejected with 503 by the admission controller, by reason.",
+    ("reason",)
+)
+admission_queue_wait = registry.histogram(
+    "admission_queue_wait_seconds",
+    "Time admitted requests spent in the admission queue.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+db_pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time to get a connection from the SQLAlchemy pool.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+# === Журнал действий ===
+# result="written": события, записанные в БД; result="dropped": отброшенные при переполнении очереди
+audit_events = registry.counter(
+    "audit_log_events_total",
+    "Audit log events written to the database or dropped on queue overflow.",
+    ("result",)
+)
+audit_flush_errors = registry.counter(
+    "audit_log_flush_errors_total",
+    "Audit log batch writes that failed (their events are lost)."
+)
+audit_flush_duration = registry.histogram(
+    "audit_log_flush_duration_seconds",
+    "Duration of successful audit log batch INSERTs.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+# === Шифрование ===
+crypto_duration = registry.histogram(
+    "crypto_operation_duration_seconds",
+    "Encryption call latency by operation and execution mode.",
+    ("op", "mode"),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+)
+crypto_bytes = registry.counter(
+    "crypto_processed_bytes_total",
+    "Bytes passed through encryption calls.",
+    ("op",)
+)
+
+# === Очистка ===
+cleanup_duration = registry.histogram(
+    "cleanup_cycle_duration_seconds",
+    "Duration of clean_expired_secrets runs.",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0)
+)
+cleanup_deleted = registry.counter(
+    "cleanup_deleted_secrets_total",
+    "Expired secrets deleted by the periodic cleanup."
+)
+cleanup_backlog = registry.gauge(
+    "cleanup_backlog_secrets",
+    "Expired secrets left after the last cleanup run."
+)
+cleanup_last_run = registry.gauge(
+    "cleanup_last_run_timestamp_seconds",
+    "Unix time of the last cleanup run in this process."
+)
+partition_changes = registry.counter(
+    "partition_changes_total",
+    "Partitions created or dropped by maintenance, by table.",
+    ("table", "action")
+)
+log_archived_rows = registry.counter(
+    "secret_logs_archived_rows_total",
+    "Audit log rows written to archive files before their partition was dropped."
+)
+compaction_rows = registry.counter(
+    "compaction_purged_rows_total",
+    "Rows whose dead payload was purged by compaction, by kind (payload / chunks).",
+    ("kind",)
+)
+compaction_bytes = registry.counter(
+    "compaction_reclaimed_bytes_total",
+    "Bytes of dead ciphertext purged by compaction, by kind (payload / chunks).",
+    ("kind",)
+)
+
+
+def register_collector(name: str, documentation: str, labelnames: Sequence[str], collect) -> Gauge:
+    """
+    Регистрация показателя, который вычисляется при чтении /metrics (например, состояние пула).
+    """
+    return registry.gauge(name, documentation, labelnames, collect)
+
+
+def render_metrics() -> str:
+    return registry.render()
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Шаблон маршрута ("/secret/{secret_key}"), а не фактический путь: число рядов ограничено.
+    Маршрутизатор записывает найденный маршрут в scope, поэтому значение доступно к отправке ответа.
+    """
+    route = scope.get("route")
+    return route.path if route is not None else "unmatched"
+
+
+class HttpMetricsMiddleware:
+    """
+    ASGI middleware метрик HTTP: время до отправки заголовков ответа и число ответов по кодам.
+    Оборачивает только send, поэтому тело ответа передаётся без промежуточных задач и очередей.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        responded = False
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal responded
+            if message["type"] == "http.response.start" and not responded:
+                responded = True
+                route = route_template(scope)
+                http_request_duration.observe(time.perf_counter() - started, scope["method"], route)
+                http_responses.inc(scope["method"], route, str(message["status"]))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            if not responded:
+                # Обработчик упал до отправки заголовков: ответ формирует сервер
+                route = route_template(scope)
+                http_request_duration.observe(time.perf_counter() - started, scope["method"], route)
+                http_responses.inc(scope["method"], route, "500")
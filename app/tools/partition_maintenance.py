@@ -0,0 +1,377 @@
+import asyncio
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from .logger_config import setup_logger
+from .metrics import log_archived_rows, partition_changes
+from ..config import app_config_instance
+from ..database.config import get_engine
+from ..database.partitions import (
+    DEFAULT_PARTITION,
+    LOG_DEFAULT_PARTITION,
+    LOG_PARENT_TABLE,
+    PARENT_TABLE,
+    add_months,
+    day_bounds,
+    log_partition_name,
+    month_bounds,
+    month_start,
+    parse_log_partition_name,
+    parse_partition_name,
+    partition_name
+)
+
+logger = setup_logger(__name__)
+
+# Секции журнала создаются на текущий и следующие месяцы
+LOG_PRECREATE_MONTHS = 2
+# Строк журнала на одну выборку из серверного курсора при выгрузке в архив
+ARCHIVE_FETCH_SIZE = 5000
+LOG_ARCHIVE_COLUMNS = ("id", "secret_id", "secret_key", "action", "ip_address", "created_at")
+
+
+async def _list_partitions(
+        connection: AsyncConnection,
+        parent: str = PARENT_TABLE,
+        parse: Callable[[str], Optional[date]] = parse_partition_name
+) -> Dict[date, str]:
+    """
+    Секции таблицы parent (кроме секции по умолчанию): день или месяц -> имя секции.
+    """
+    result = await connection.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :parent"
+    ), {"parent": parent})
+    partitions = {}
+    for (name,) in result:
+        key = parse(name)
+        if key is not None:
+            partitions[key] = name
+    return partitions
+
+
+async def _set_lock_timeout(connection: AsyncConnection) -> None:
+    # DDL ждёт блокировку таблицы не дольше заданного: иначе ожидающий ALTER
+    # остановил бы все запросы к secrets. Не успели — повтор при следующем запуске
+    timeout_ms = int(app_config_instance.PARTITION_LOCK_TIMEOUT_SECONDS * 1000)
+    await connection.execute(text(f"SET LOCAL lock_timeout = {timeout_ms}"))
+
+
+async def create_partition(
+        connection: AsyncConnection,
+        parent: str,
+        default: str,
+        column: str,
+        name: str,
+        start: datetime,
+        end: datetime
+) -> None:
+    """
+    Создание секции [start, end) таблицы parent. Строки диапазона, уже попавшие
+    в секцию по умолчанию, переносятся в новую секцию в той же транзакции.
+    """
+    values = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    params = {"start": start, "end": end}
+    in_range = f"{column} >= :start AND {column} < :end"
+
+    in_default = (await connection.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})"),
+        params
+    )).scalar_one()
+    if not in_default:
+        await connection.execute(text(f"CREATE TABLE {name} PARTITION OF {parent} FOR VALUES {values}"))
+        return
+
+    await connection.execute(text(f"CREATE TABLE {name} (LIKE {parent} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    await connection.execute(
+        text(f"WITH moved AS (DELETE FROM {default} WHERE {in_range} RETURNING *) INSERT INTO {name} SELECT * FROM moved"),
+        params
+    )
+    await connection.execute(text(f"ALTER TABLE {parent} ATTACH PARTITION {name} FOR VALUES {values}"))
+
+
+async def drop_partition(connection: AsyncConnection, name: str) -> int:
+    """
+    Удаление секции secrets вместе с сегментами потоковых секретов из неё.
+
+    Возвращает:
+        - int: Количество строк в удалённой секции.
+    """
+    rows = (await connection.execute(text(f"SELECT count(*) FROM {name}"))).scalar_one()
+    await connection.execute(text(f"DELETE FROM secret_chunks WHERE secret_id IN (SELECT id FROM {name} WHERE is_streamed)"))
+    await connection.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+    await connection.execute(text(f"DROP TABLE {name}"))
+    return rows
+
+
+async def purge_default_partition(connection: AsyncConnection, cutoff: datetime) -> int:
+    """
+    Удаление истёкших строк из секции по умолчанию (её нельзя удалить целиком).
+
+    Возвращает:
+        - int: Количество удалённых строк.
+    """
+    result = await connection.execute(
+        text(
+            f"WITH purged AS (DELETE FROM {DEFAULT_PARTITION} WHERE expires_at < :cutoff RETURNING id, is_streamed), "
+            "chunks AS (DELETE FROM secret_chunks WHERE secret_id IN (SELECT id FROM purged WHERE is_streamed)) "
+            "SELECT count(*) FROM purged"
+        ),
+        {"cutoff": cutoff}
+    )
+    return result.scalar_one()
+
+
+async def maintain_partitions(
+        days_ahead: Optional[int] = None,
+        grace: Optional[timedelta] = None
+) -> Dict[str, str | int | List[str]]:
+    """
+    Обслуживание секций secrets (вызывается лидером очистки): создание секций на days_ahead
+    дней вперёд и удаление секций, все строки которых истекли больше grace назад.
+
+    Запас grace оставляет периодической очистке время пометить истёкшие секреты
+    и записать их в журнал до удаления секции.
+    Каждая секция обрабатывается в своей транзакции: ошибка (например, тайм-аут
+    блокировки) не отменяет остальные изменения.
+
+    Параметры:
+        - days_ahead (Optional[int]): На сколько дней вперёд создавать секции (по умолчанию PARTITION_PRECREATE_DAYS).
+        - grace (Optional[timedelta]): Запас после истечения (по умолчанию PARTITION_DROP_GRACE_HOURS).
+
+    Возвращает:
+        - Dict[str, str | int | List[str]]: Результат обслуживания.
+          Пример:
+          {
+              "status": "success",
+              "created": ["secrets_p20261031"],
+              "dropped": ["secrets_p20261015"],
+              "dropped_rows": 48210,
+              "purged_default_rows": 3,
+              "errors": 0
+          }
+    """
+    days_ahead = app_config_instance.PARTITION_PRECREATE_DAYS if days_ahead is None else days_ahead
+    if grace is None:
+        grace = timedelta(hours=app_config_instance.PARTITION_DROP_GRACE_HOURS)
+
+    now = datetime.now(timezone.utc)
+    cutoff = now - grace
+    engine = get_engine()
+    created: List[str] = []
+    dropped: List[str] = []
+    dropped_rows = 0
+    purged = 0
+    errors = 0
+
+    async with engine.connect() as connection:
+        existing = await _list_partitions(connection)
+        await connection.rollback()
+
+    today = now.date()
+    for day in (today + timedelta(days=offset) for offset in range(days_ahead + 1)):
+        if day in existing:
+            continue
+        try:
+            async with engine.begin() as connection:
+                await _set_lock_timeout(connection)
+                await create_partition(connection, PARENT_TABLE, DEFAULT_PARTITION, "expires_at", partition_name(day), *day_bounds(day))
+            created.append(partition_name(day))
+            partition_changes.inc(PARENT_TABLE, "created")
+        except Exception as e:
+            errors += 1
+            logger.warning("Failed to create partition for %s: %s", day, e)
+
+    for day, name in sorted(existing.items()):
+        if day_bounds(day)[1] > cutoff:
+            continue
+        try:
+            async with engine.begin() as connection:
+                await _set_lock_timeout(connection)
+                dropped_rows += await drop_partition(connection, name)
+            dropped.append(name)
+            partition_changes.inc(PARENT_TABLE, "dropped")
+        except Exception as e:
+            errors += 1
+            logger.warning("Failed to drop partition %s: %s", name, e)
+
+    try:
+        async with engine.begin() as connection:
+            purged = await purge_default_partition(connection, cutoff)
+    except Exception as e:
+        errors += 1
+        logger.warning("Failed to purge the default partition: %s", e)
+
+    result = {
+        "status": "success" if not errors else "partial",
+        "created": created,
+        "dropped": dropped,
+        "dropped_rows": dropped_rows,
+        "purged_default_rows": purged,
+        "errors": errors
+    }
+    if created or dropped or purged or errors:
+        logger.info("Partition maintenance: %s", result)
+    return result
+
+
+def _write_archive_lines(archive, rows) -> None:
+    archive.write("".join(
+        json.dumps(dict(zip(LOG_ARCHIVE_COLUMNS, row)), ensure_ascii=False, default=datetime.isoformat) + "\n"
+        for row in rows
+    ))
+
+
+def _close_archive(archive, tmp_path: str, path: str) -> None:
+    archive.close()
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+async def archive_log_partition(name: str, archive_dir: str) -> int:
+    """
+    Выгрузка секции журнала в сжатый файл JSONL ({archive_dir}/{name}.jsonl.gz).
+
+    Строки читаются серверным курсором по ARCHIVE_FETCH_SIZE и сразу записываются
+    в файл (сжатие и запись — в потоке), поэтому секция не загружается в память целиком.
+    Файл появляется под итоговым именем только после полной записи.
+
+    Возвращает:
+        - int: Количество выгруженных строк.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.jsonl.gz")
+    tmp_path = f"{path}.tmp"
+    rows = 0
+
+    archive = await asyncio.to_thread(gzip.open, tmp_path, "wt", encoding="utf-8")
+    try:
+        async with get_engine().connect() as connection:
+            result = await connection.stream(
+                text(f"SELECT {', '.join(LOG_ARCHIVE_COLUMNS)} FROM {name} ORDER BY id"),
+                execution_options={"yield_per": ARCHIVE_FETCH_SIZE}
+            )
+            async for part in result.partitions():
+                await asyncio.to_thread(_write_archive_lines, archive, part)
+                rows += len(part)
+        await asyncio.to_thread(_close_archive, archive, tmp_path, path)
+    except BaseException:
+        archive.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return rows
+
+
+async def drop_log_partition(connection: AsyncConnection, name: str, archived_rows: Optional[int]) -> int:
+    """
+    Отсоединение и удаление секции журнала.
+
+    Если секция выгружена в архив, после отсоединения (новые строки в неё уже не попадут)
+    количество строк сверяется с архивом: при расхождении секция не удаляется.
+
+    Возвращает:
+        - int: Количество строк в удалённой секции.
+    """
+    await connection.execute(text(f"ALTER TABLE {LOG_PARENT_TABLE} DETACH PARTITION {name}"))
+    rows = (await connection.execute(text(f"SELECT count(*) FROM {name}"))).scalar_one()
+    if archived_rows is not None and rows != archived_rows:
+        raise RuntimeError(f"{name} has {rows} rows, archived {archived_rows}; keeping the partition")
+    await connection.execute(text(f"DROP TABLE {name}"))
+    return rows
+
+
+async def maintain_log_partitions(
+        retention_months: Optional[int] = None,
+        archive_dir: Optional[str] = None
+) -> Dict[str, str | int | List[str]]:
+    """
+    Обслуживание секций журнала secret_logs (вызывается лидером очистки после maintain_partitions):
+    создание секций на текущий и LOG_PRECREATE_MONTHS следующих месяцев, выгрузка в архив
+    и удаление секций старше срока хранения.
+
+    Параметры:
+        - retention_months (Optional[int]): Сколько полных месяцев хранить кроме текущего
+          (по умолчанию LOG_RETENTION_MONTHS, 0 — хранить всё).
+        - archive_dir (Optional[str]): Каталог архива (по умолчанию LOG_ARCHIVE_DIR, пусто — удалять без выгрузки).
+
+    Возвращает:
+        - Dict[str, str | int | List[str]]: Результат обслуживания.
+          Пример:
+          {
+              "status": "success",
+              "created": ["secret_logs_p202612"],
+              "dropped": ["secret_logs_p202509"],
+              "archived_rows": 120400,
+              "errors": 0
+          }
+    """
+    retention_months = app_config_instance.LOG_RETENTION_MONTHS if retention_months is None else retention_months
+    archive_dir = app_config_instance.LOG_ARCHIVE_DIR if archive_dir is None else archive_dir
+
+    current_month = month_start(datetime.now(timezone.utc).date())
+    engine = get_engine()
+    created: List[str] = []
+    dropped: List[str] = []
+    archived_rows = 0
+    errors = 0
+
+    async with engine.connect() as connection:
+        existing = await _list_partitions(connection, LOG_PARENT_TABLE, parse_log_partition_name)
+        await connection.rollback()
+
+    for month in (add_months(current_month, offset) for offset in range(LOG_PRECREATE_MONTHS + 1)):
+        if month in existing:
+            continue
+        name = log_partition_name(month)
+        try:
+            async with engine.begin() as connection:
+                await _set_lock_timeout(connection)
+                await create_partition(
+                    connection, LOG_PARENT_TABLE, LOG_DEFAULT_PARTITION, "created_at", name, *month_bounds(month)
+                )
+            created.append(name)
+            partition_changes.inc(LOG_PARENT_TABLE, "created")
+        except Exception as e:
+            errors += 1
+            logger.warning("Failed to create partition %s: %s", name, e)
+
+    if retention_months > 0:
+        oldest_kept = add_months(current_month, -retention_months)
+        for month, name in sorted(existing.items()):
+            if month >= oldest_kept:
+                continue
+            try:
+                rows = await archive_log_partition(name, archive_dir) if archive_dir else None
+                async with engine.begin() as connection:
+                    await _set_lock_timeout(connection)
+                    await drop_log_partition(connection, name, rows)
+            except Exception as e:
+                errors += 1
+                logger.warning("Failed to archive and drop partition %s: %s", name, e)
+                continue
+            dropped.append(name)
+            partition_changes.inc(LOG_PARENT_TABLE, "dropped")
+            if rows is not None:
+                archived_rows += rows
+                log_archived_rows.inc(amount=rows)
+
+    result = {
+        "status": "success" if not errors else "partial",
+        "created": created,
+        "dropped": dropped,
+        "archived_rows": archived_rows,
+        "errors": errors
+    }
+    if created or dropped or errors:
+        logger.info("Log partition maintenance: %s", result)
+    return result
@@ -0,0 +1,247 @@
+import asyncio
+import functools
+import json
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .logger_config import setup_logger
+from .metrics import route_template
+from ..config import app_config_instance
+
+logger = setup_logger(__name__)
+
+# Виды участков запроса
+SPAN_DB = "db"
+SPAN_REDIS = "redis"
+SPAN_CRYPTO = "crypto"
+SPAN_AUDIT = "audit"
+
+# Заголовок, которым администратор запрашивает профиль конкретного запроса
+PROFILE_HEADER = "X-Profile-Token"
+
+
+class RequestProfile:
+    """
+    Участки (spans) одного запроса: вид, имя, начало относительно начала запроса и длительность.
+
+    Поля:
+        - method (str): HTTP-метод.
+        - path (str): Путь запроса.
+        - sampled (bool): Попал ли запрос в выборку — такой профиль сохраняется в файл.
+        - flagged (bool): Профиль запрошен администратором (заголовок X-Profile-Token).
+    """
+
+    def __init__(self, method: str, path: str, sampled: bool, flagged: bool = False):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.route = path
+        self.sampled = sampled or flagged
+        self.flagged = flagged
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, str | float]] = []
+
+    def add(self, kind: str, name: str, started: float, duration: float) -> None:
+        self.spans.append({
+            "kind": kind,
+            "name": name,
+            "start_ms": round((started - self.started) * 1000, 3),
+            "duration_ms": round(duration * 1000, 3)
+        })
+
+    def breakdown(self, total: float) -> Dict[str, float]:
+        """
+        Суммарное время по видам участков и остаток ("other": маршрутизация, валидация, сериализация).
+        Вложенные (запрос к БД внутри записи журнала) и параллельные (asyncio.gather)
+        участки могут давать сумму больше общего времени.
+        """
+        result: Dict[str, float] = {}
+        for span in self.spans:
+            result[span["kind"]] = result.get(span["kind"], 0.0) + span["duration_ms"]
+        result = {kind: round(value, 3) for kind, value in result.items()}
+        result["other"] = round(max(0.0, total * 1000 - sum(result.values())), 3)
+        return result
+
+    def to_dict(self, total: float, status: int) -> Dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            # Только шаблон маршрута: фактический путь содержит ключ секрета
+            "route": self.route,
+            "status": status,
+            "total_ms": round(total * 1000, 3),
+            "breakdown_ms": self.breakdown(total),
+            "spans": self.spans
+        }
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+@contextmanager
+def span(kind: str, name: str) -> Iterator[None]:
+    """
+    Замер участка текущего запроса. Вне профилируемого запроса ничего не делает.
+
+    Параметры:
+        - kind (str): Вид участка (db / redis / crypto / audit).
+        - name (str): Имя участка (например, имя операции).
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(kind, name, started, time.perf_counter() - started)
+
+
+def profiled(kind: str):
+    """
+    Декоратор асинхронной функции: вызов замеряется как участок вида kind с именем функции.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(kind, func.__name__):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    if profile is None or not conn.info.get("profile_started"):
+        return
+    started = conn.info["profile_started"].pop()
+    # Первые слова запроса достаточно отличают запросы друг от друга и не раскрывают параметры
+    name = " ".join(statement.split()[:6])
+    profile.add(SPAN_DB, name, started, time.perf_counter() - started)
+
+
+def instrument_engine(engine) -> None:
+    """
+    Замер запросов к БД (события SQLAlchemy, контекст передаётся в greenlet драйвера).
+    """
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def start_request_profile(method: str, path: str, profile_token: Optional[str]) -> Optional[RequestProfile]:
+    """
+    Начало профилирования запроса (вызывается из middleware).
+
+    Участки записываются для каждого запроса, если профилирование включено, —
+    чтобы для любого медленного запроса можно было вывести разбивку по времени.
+    В файл сохраняются только профили запросов из выборки (PROFILE_SAMPLE_RATE)
+    и запросов с заголовком X-Profile-Token, совпадающим с PROFILE_ADMIN_TOKEN.
+
+    Возвращает:
+        - Optional[RequestProfile]: Профиль или None, если профилирование выключено.
+    """
+    if not app_config_instance.PROFILING_ENABLED:
+        return None
+
+    admin_token = app_config_instance.PROFILE_ADMIN_TOKEN
+    flagged = bool(admin_token) and profile_token == admin_token
+    sampled = random.random() < app_config_instance.PROFILE_SAMPLE_RATE
+
+    profile = RequestProfile(method, path, sampled, flagged)
+    _current_profile.set(profile)
+    return profile
+
+
+async def finish_request_profile(profile: RequestProfile, route: Optional[str], status: int) -> Dict:
+    """
+    Завершение профилирования: вывод разбивки для медленного запроса и сохранение профиля из выборки.
+
+    Возвращает:
+        - Dict: Профиль запроса.
+    """
+    total = time.perf_counter() - profile.started
+    if route:
+        profile.route = route
+    result = profile.to_dict(total, status)
+
+    if total * 1000 >= app_config_instance.PROFILE_SLOW_REQUEST_MS:
+        logger.warning(
+            "Slow request %s %s (%s): %s ms, breakdown: %s, profile: %s",
+            profile.method, profile.route, status, result["total_ms"], result["breakdown_ms"], profile.id,
+            extra={"route": profile.route, "total_ms": result["total_ms"], "breakdown_ms": result["breakdown_ms"]}
+        )
+
+    if profile.sampled:
+        try:
+            await asyncio.to_thread(_dump_profile, result)
+        except Exception as e:
+            logger.error("Failed to dump request profile %s: %s", profile.id, e)
+    return result
+
+
+def server_timing(result: Dict) -> str:
+    """
+    Разбивка в формате заголовка Server-Timing (для запросов, запрошенных администратором).
+    """
+    return ", ".join(f"{kind};dur={duration}" for kind, duration in result["breakdown_ms"].items())
+
+
+def _dump_profile(result: Dict) -> None:
+    directory = app_config_instance.PROFILE_DUMP_DIR
+    os.makedirs(directory, exist_ok=True)
+    filename = f"{time.strftime('%Y%m%dT%H%M%S')}-{result['method']}-{result['id']}.json"
+    with open(os.path.join(directory, filename), "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware профилирования запросов. При выключенном профилировании
+    запрос передаётся дальше без обёрток; иначе профиль завершается при отправке
+    заголовков ответа, а для запросов администратора в них добавляется разбивка.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not app_config_instance.PROFILING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        profile = start_request_profile(scope["method"], scope["path"], Headers(scope=scope).get(PROFILE_HEADER))
+        finished = False
+
+        async def send_with_profile(message: Message) -> None:
+            nonlocal finished
+            if message["type"] == "http.response.start" and not finished:
+                finished = True
+                result = await finish_request_profile(profile, route_template(scope), message["status"])
+                if profile.flagged:
+                    # Разбивка видна администратору прямо в ответе (DevTools / curl -v)
+                    headers = MutableHeaders(scope=message)
+                    headers["Server-Timing"] = server_timing(result)
+                    headers["X-Profile-Id"] = profile.id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            if not finished:
+                # Обработчик упал до отправки заголовков: ответ формирует сервер
+                await finish_request_profile(profile, route_template(scope), 500)
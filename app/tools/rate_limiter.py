@@ -0,0 +1,237 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from .logger_config import setup_logger
+from .metrics import rate_limit_fallbacks, rate_limit_rejections
+from ..cache.redis_config import get_redis_client
+from ..config import app_config_instance
+
+logger = setup_logger(__name__)
+
+# Атомарная проверка нескольких корзин (например, по IP и по ключу секрета) за один запрос к Redis.
+# KEYS — ключи корзин, ARGV — пары (ёмкость, скорость пополнения в токенах за мс).
+# Время берётся у Redis (TIME): у всех воркеров и реплик одни часы.
+# Запрос пропускается, только если токен есть во всех корзинах; тогда из каждой списывается по токену.
+# Возвращает {номер первой отказавшей корзины (0 — пропущен), через сколько мс появится токен}.
+TOKEN_BUCKET_SCRIPT = """
+local now_t = redis.call('TIME')
+local now = tonumber(now_t[1]) * 1000 + math.floor(tonumber(now_t[2]) / 1000)
+local tokens = {}
+local rejected = 0
+local retry_ms = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local available = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    available = math.min(capacity, available + math.max(0, now - ts) * rate)
+    if available < 1 then
+        if rejected == 0 then
+            rejected = i
+        end
+        retry_ms = math.max(retry_ms, math.ceil((1 - available) / rate))
+    end
+    tokens[i] = available
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local available = tokens[i]
+    if rejected == 0 then
+        available = available - 1
+    end
+    redis.call('HSET', key, 'tokens', tostring(available), 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate))
+end
+return {rejected, retry_ms}
+"""
+
+# Области ограничения
+SCOPE_IP = "ip"
+SCOPE_KEY = "key"
+
+# Максимальное количество корзин в памяти процесса (для резервного режима)
+LOCAL_BUCKETS_MAX_SIZE = 10000
+
+
+def parse_rate(value: str) -> Optional[Tuple[int, float]]:
+    """
+    Разбор лимита вида "30/60" (30 запросов за 60 секунд; 30 — и размер всплеска).
+
+    Возвращает:
+        - Optional[Tuple[int, float]]: Ёмкость корзины и период (в секундах) или None, если лимит не задан.
+
+    Вызывает:
+        - ValueError: Некорректный формат лимита.
+    """
+    value = value.strip()
+    if not value:
+        return None
+    requests, sep, period = value.partition("/")
+    try:
+        capacity, seconds = int(requests), float(period) if sep else 1.0
+    except ValueError:
+        raise ValueError(f"Invalid rate limit {value!r}, expected '<requests>/<seconds>'") from None
+    if capacity < 1 or seconds <= 0:
+        raise ValueError(f"Invalid rate limit {value!r}, expected positive values")
+    return capacity, seconds
+
+
+class RateLimit:
+    """
+    Лимит маршрута: корзина токенов на IP-адрес клиента и (необязательно) на ключ секрета.
+
+    Поля:
+        - name (str): Имя лимита (в ключах Redis и метриках).
+        - per_ip (Optional[Tuple[int, float]]): Ёмкость и период корзины на IP-адрес.
+        - per_key (Optional[Tuple[int, float]]): Ёмкость и период корзины на ключ секрета.
+    """
+
+    def __init__(self, name: str, per_ip: str, per_key: str = ""):
+        self.name = name
+        self.per_ip = parse_rate(per_ip)
+        self.per_key = parse_rate(per_key)
+
+    def buckets(self, ip_address: str, secret_key: Optional[str]) -> List[Tuple[str, str, int, float]]:
+        """
+        Корзины запроса: (область, ключ, ёмкость, скорость пополнения в токенах за мс).
+        """
+        result = []
+        if self.per_ip is not None:
+            capacity, seconds = self.per_ip
+            result.append((SCOPE_IP, f"ratelimit:{self.name}:ip:{ip_address}", capacity, capacity / (seconds * 1000)))
+        if self.per_key is not None and secret_key is not None:
+            capacity, seconds = self.per_key
+            result.append((SCOPE_KEY, f"ratelimit:{self.name}:key:{secret_key}", capacity, capacity / (seconds * 1000)))
+        return result
+
+
+class _LocalBuckets:
+    """
+    Корзины в памяти процесса на время недоступности Redis.
+
+    Лимит действует отдельно в каждом воркере, поэтому общий лимит в этом режиме
+    в число воркеров раз выше; зато проверка не зависит от Redis.
+    """
+
+    def __init__(self, max_size: int = LOCAL_BUCKETS_MAX_SIZE):
+        self.max_size = max_size
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def check(self, buckets: List[Tuple[str, str, int, float]]) -> Tuple[int, int]:
+        now = time.monotonic() * 1000
+        available = []
+        rejected, retry_ms = 0, 0
+        for index, (_, key, capacity, rate) in enumerate(buckets, start=1):
+            tokens, ts = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+            if tokens < 1:
+                rejected = rejected or index
+                retry_ms = max(retry_ms, math.ceil((1 - tokens) / rate))
+            available.append(tokens)
+
+        for (_, key, _, _), tokens in zip(buckets, available):
+            self._buckets[key] = (tokens - (0 if rejected else 1), now)
+            self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_size:
+            self._buckets.popitem(last=False)
+        return rejected, retry_ms
+
+
+class RateLimiter:
+    """
+    Проверка лимитов: атомарный Lua-скрипт в Redis, при недоступности Redis — корзины в памяти процесса.
+    """
+
+    def __init__(self):
+        self._script = None
+        self._local = _LocalBuckets()
+        self._redis_available = True
+
+    async def check(self, limit: RateLimit, ip_address: str, secret_key: Optional[str] = None) -> Tuple[Optional[str], int]:
+        """
+        Проверка и списание токена.
+
+        Возвращает:
+            - Tuple[Optional[str], int]: Область, по которой запрос отклонён (None — пропущен),
+              и через сколько миллисекунд появится токен.
+        """
+        buckets = limit.buckets(ip_address, secret_key)
+        if not buckets:
+            return None, 0
+
+        try:
+            redis_client = get_redis_client()
+            if self._script is None or self._script.registered_client is not redis_client:
+                self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+            rejected, retry_ms = await self._script(
+                keys=[key for _, key, _, _ in buckets],
+                args=[value for _, _, capacity, rate in buckets for value in (capacity, repr(rate))]
+            )
+            if not self._redis_available:
+                logger.info("Rate limiter is using Redis again")
+                self._redis_available = True
+        except Exception as e:
+            if self._redis_available:
+                logger.warning("Rate limiter falls back to in-process buckets, Redis is unavailable: %s", e)
+                self._redis_available = False
+            rate_limit_fallbacks.inc(limit.name)
+            rejected, retry_ms = self._local.check(buckets)
+
+        if not rejected:
+            return None, 0
+        scope = buckets[int(rejected) - 1][0]
+        rate_limit_rejections.inc(limit.name, scope)
+        return scope, int(retry_ms)
+
+
+_rate_limiter = RateLimiter()
+
+# Лимиты маршрутов (разбираются при импорте: ошибка в настройке обнаруживается при запуске)
+RATE_LIMITS: Dict[str, RateLimit] = {
+    "secret_read": RateLimit(
+        "secret_read",
+        app_config_instance.RATE_LIMIT_READ_PER_IP,
+        app_config_instance.RATE_LIMIT_READ_PER_KEY
+    ),
+    "secret_delete": RateLimit(
+        "secret_delete",
+        app_config_instance.RATE_LIMIT_DELETE_PER_IP,
+        app_config_instance.RATE_LIMIT_DELETE_PER_KEY
+    )
+}
+
+
+def rate_limit(name: str):
+    """
+    Зависимость FastAPI: проверка лимита до вызова обработчика (и до обращения к БД).
+
+    Параметры:
+        - name (str): Имя лимита из RATE_LIMITS.
+
+    Вызывает:
+        - HTTPException (429): Лимит исчерпан; заголовок Retry-After — через сколько секунд повторить.
+    """
+    limit = RATE_LIMITS[name]
+
+    async def dependency(request: Request) -> None:
+        if not app_config_instance.RATE_LIMIT_ENABLED:
+            return
+        scope, retry_ms = await _rate_limiter.check(
+            limit,
+            request.client.host,
+            request.path_params.get("secret_key")
+        )
+        if scope is not None:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+                headers={"Retry-After": str(max(1, math.ceil(retry_ms / 1000)))}
+            )
+
+    return dependency
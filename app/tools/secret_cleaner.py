@@ -1,111 +1,254 @@
 import asyncio
+import time
 from contextlib import asynccontextmanager
-from datetime import datetime, timedelta, timezone
-from typing import AsyncIterator, Dict, List
+from typing import AsyncIterator, Dict, List, Optional
 
 from fastapi import FastAPI
-from sqlalchemy import func
-from sqlalchemy.orm import Session
-
+from sqlalchemy import and_, func, insert, literal, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .audit_log import start_audit_writer, stop_audit_writer
+from .compaction import run_compaction
+from .crypto_dispatcher import shutdown_crypto_dispatcher
+from .key_rotation import run_key_rotation
+from .leader_election import LeaderElection, LeadershipLost
 from .logger_config import setup_logger
-from ..cache.redis_config import get_redis_client
+from .metrics import cleanup_backlog, cleanup_deleted, cleanup_duration, cleanup_last_run
+from .partition_maintenance import maintain_log_partitions, maintain_partitions
+from .warmup import warm_up
+from ..cache.redis_config import close_redis, get_redis_client, init_redis
+from ..cache.expiry_queue import pop_due_secrets, restore_due_secrets
+from ..cache.secret_cache import TOMBSTONE_EXPIRED, evict_cached_secrets
+from ..config import app_config_instance
 from ..database import models
-from ..database.config import SessionLocal
+from ..database.config import AsyncSessionLocal, dispose_engine, get_engine
 
 # Настройка логгера для этого модуля
 logger = setup_logger(__name__)
 
+_cleaner_election: Optional[LeaderElection] = None
+
 
-def clean_expired_secrets(batch_size: int = 100) -> Dict[str, str | int]:
+def _expired_condition():
+    """
+    Условие «секрет истёк, не прочитан и не удалён».
+
+    Совпадает с условием частичного индекса ix_secrets_expires_at_live,
+    поэтому поиск истёкших секретов идёт по индексу.
+    """
+    return and_(
+        models.Secret.is_deleted == False,
+        models.Secret.is_accessed == False,
+        models.Secret.expires_at < func.now()
+    )
+
+
+async def _expire_chunk(
+        db: AsyncSession,
+        chunk_size: int,
+        secret_keys: Optional[List[str]] = None
+) -> List[str]:
     """
-    Очистка истёкших секретов.
+    Пометка пачки истёкших секретов как удалённых (с очисткой их данных) и запись журнала одним запросом.
+
+    WITH expired AS (UPDATE secrets ... RETURNING id, secret_key)
+    INSERT INTO secret_logs (...) SELECT ... FROM expired RETURNING secret_key
+
+    Строки, заблокированные другим процессом, пропускаются (SKIP LOCKED).
 
     Параметры:
-        - batch_size (int): Максимальное количество секретов для удаления за один раз.
+        - db (AsyncSession): Асинхронная сессия базы данных SQLAlchemy.
+        - chunk_size (int): Максимальный размер пачки.
+        - secret_keys (Optional[List[str]]): Если переданы, пачка ограничивается этими ключами.
 
     Возвращает:
-        - Dict[str, str | int]: Результат очистки.
+        - List[str]: Ключи удалённых секретов.
+    """
+    secrets_table = models.Secret.__table__
+    logs_table = models.SecretLog.__table__
+
+    condition = _expired_condition()
+    if secret_keys is not None:
+        condition = and_(condition, secrets_table.c.secret_key.in_(secret_keys))
+
+    # Первичный ключ — (id, expires_at): строка выбирается в своей секции
+    chunk_ids = (
+        select(secrets_table.c.id, secrets_table.c.expires_at)
+        .where(condition)
+        .order_by(secrets_table.c.id)
+        .limit(chunk_size)
+        .with_for_update(skip_locked=True)
+    )
+    expired = (
+        update(secrets_table)
+        .where(tuple_(secrets_table.c.id, secrets_table.c.expires_at).in_(chunk_ids))
+        .values(is_deleted=True, **models.PURGED_PAYLOAD)
+        .returning(secrets_table.c.id, secrets_table.c.secret_key)
+        .cte("expired")
+    )
+    statement = (
+        insert(logs_table)
+        .from_select(
+            ["secret_id", "secret_key", "action", "ip_address", "created_at"],
+            select(
+                expired.c.id,
+                expired.c.secret_key,
+                literal("auto_cleanup_expired"),
+                literal("system"),
+                func.now()
+            )
+        )
+        .returning(logs_table.c.secret_key)
+    )
+    result = await db.execute(statement)
+    return list(result.scalars().all())
+
+
+async def clean_expired_secrets(
+        chunk_size: Optional[int] = None,
+        time_budget: Optional[float] = None
+) -> Dict[str, str | int | float]:
+    """
+    Очистка истёкших секретов пачками до исчерпания очереди или бюджета времени.
+
+    На каждую пачку приходится один запрос к БД (UPDATE ... RETURNING вместе
+    с INSERT ... SELECT в журнал) и одна команда UNLINK в Redis.
+
+    Параметры:
+        - chunk_size (Optional[int]): Размер пачки (по умолчанию CLEANUP_CHUNK_SIZE).
+        - time_budget (Optional[float]): Бюджет времени в секундах (по умолчанию CLEANUP_TIME_BUDGET_SECONDS).
+
+    Возвращает:
+        - Dict[str, str | int | float]: Результат очистки.
           Пример:
           {
-              "deleted_count": 5,
+              "deleted_count": 5000,
+              "chunks": 5,
+              "duration_seconds": 1.25,
+              "rows_per_second": 4000.0,
+              "remaining_backlog": 0,
               "status": "success",
-              "message": "Deleted 5 expired secrets"
+              "message": "Deleted 5000 expired secrets"
           }
     """
-    db: Session = SessionLocal()
-    deleted_count: int = 0
+    chunk_size = chunk_size or app_config_instance.CLEANUP_CHUNK_SIZE
+    time_budget = app_config_instance.CLEANUP_TIME_BUDGET_SECONDS if time_budget is None else time_budget
 
-    try:
-        now = datetime.now(timezone.utc)
-        logger.info(f"Starting cleanup at {now.isoformat()}")
+    started = time.perf_counter()
+    deleted_count = 0
+    chunks = 0
 
-        # Получаем текущее время из БД для проверки
-        db_now = db.query(func.now()).scalar()
-        logger.info(f"Database current time: {db_now}")
+    async with AsyncSessionLocal() as db:
+        try:
+            logger.info("Starting cleanup")
+
+            while True:
+                expired_keys = await _expire_chunk(db, chunk_size)
+                await db.commit()  # Один коммит на пачку
+                chunks += 1
+                deleted_count += len(expired_keys)
+
+                # Удаляем из кеша всю пачку одной командой UNLINK
+                if expired_keys:
+                    try:
+                        await evict_cached_secrets(get_redis_client(), expired_keys, tombstone=TOMBSTONE_EXPIRED)
+                    except Exception as e:
+                        logger.error("Redis error during cleanup: %s", e)
+
+                if len(expired_keys) < chunk_size:
+                    break  # Очередь истёкших секретов исчерпана
+                if time.perf_counter() - started >= time_budget:
+                    logger.info("Cleanup time budget of %ss exhausted", time_budget)
+                    break
+
+            # Сколько истёкших секретов осталось на следующий запуск
+            remaining_backlog = (await db.execute(
+                select(func.count()).select_from(models.Secret).where(_expired_condition())
+            )).scalar_one()
+
+            duration = time.perf_counter() - started
+            return {
+                "deleted_count": deleted_count,
+                "chunks": chunks,
+                "duration_seconds": round(duration, 3),
+                "rows_per_second": round(deleted_count / duration, 1) if duration else 0.0,
+                "remaining_backlog": remaining_backlog,
+                "status": "success",
+                "message": f"Deleted {deleted_count} expired secrets"
+            }
 
-        # Ищем истёкшие секреты на стороне базы данных
-        expired_secrets: List[models.Secret] = db.query(models.Secret).filter(
-            models.Secret.is_deleted == False,
-            models.Secret.created_at + func.make_interval(0, 0, 0, 0, 0, 0, models.Secret.ttl_seconds) < now
-        ).limit(batch_size).all()
+        except Exception as e:
+            logger.error("Cleanup error: %s", e, exc_info=True)
+            await db.rollback()
+            return {
+                "deleted_count": deleted_count,
+                "chunks": chunks,
+                "status": "error",
+                "message": f"Cleanup failed: {str(e)}"
+            }
 
-        logger.info(f"Found {len(expired_secrets)} expired secrets")
 
-        # Создаём клиент Redis
-        redis_client = get_redis_client()
+async def expire_secrets_by_keys(secret_keys: List[str]) -> List[str]:
+    """
+    Удаление истёкших секретов из заданного списка ключей (пачка из очереди истечения).
 
-        for secret in expired_secrets:
-            try:
-                expires_at = secret.created_at + timedelta(seconds=secret.ttl_seconds)
-                logger.info(
-                    f"Deleting secret ID={secret.id}: "
-                    f"created={secret.created_at}, "
-                    f"ttl={secret.ttl_seconds}s, "
-                    f"expired_at={expires_at}"
-                )
-
-                # Удаляем секрет и пароль из Redis
+    Ключи уже прочитанных, удалённых или ещё не истёкших секретов пропускаются.
+
+    Параметры:
+        - secret_keys (List[str]): Ключи секретов.
+
+    Возвращает:
+        - List[str]: Ключи удалённых секретов.
+    """
+    async with AsyncSessionLocal() as db:
+        expired_keys = await _expire_chunk(db, len(secret_keys), secret_keys)
+        await db.commit()
+    return expired_keys
+
+
+async def run_expiry_scheduler(
+        interval: Optional[float] = None,
+        batch_size: Optional[int] = None
+) -> None:
+    """
+    Фоновая задача точного истечения секретов по очереди в Redis (sorted set).
+
+    Забирает из очереди ключи, срок которых наступил, удаляет секреты пачкой
+    и вычищает их из кеша. Если очередь пуста, ждёт interval секунд.
+    Ежечасная очистка clean_expired_secrets остаётся сверкой для секретов,
+    которые не попали в очередь (например, Redis был недоступен при создании).
+
+    Параметры:
+        - interval (Optional[float]): Пауза при пустой очереди (по умолчанию EXPIRY_SCHEDULER_INTERVAL).
+        - batch_size (Optional[int]): Размер пачки (по умолчанию EXPIRY_SCHEDULER_BATCH_SIZE).
+    """
+    interval = interval or app_config_instance.EXPIRY_SCHEDULER_INTERVAL
+    batch_size = batch_size or app_config_instance.EXPIRY_SCHEDULER_BATCH_SIZE
+    logger.info("Expiry scheduler started (interval: %ss, batch size: %s)", interval, batch_size)
+
+    while True:
+        due_keys: List[str] = []
+        try:
+            redis_client = get_redis_client()
+            due_keys = await pop_due_secrets(redis_client, time.time(), batch_size)
+            if due_keys:
+                expired_keys = await expire_secrets_by_keys(due_keys)
+                await evict_cached_secrets(redis_client, expired_keys, tombstone=TOMBSTONE_EXPIRED)
+                logger.info("Expiry scheduler: %s of %s due secrets expired", len(expired_keys), len(due_keys))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Expiry scheduler error: %s", e, exc_info=True)
+            # Возвращаем извлечённые ключи в очередь: они будут обработаны на следующем шаге
+            if due_keys:
                 try:
-                    redis_client.delete(f"secret:{secret.secret_key}")
-                    redis_client.delete(f"passphrase:{secret.secret_key}")
-                    logger.info(f"Deleted secret and passphrase from Redis: key={secret.secret_key}")
-                except Exception as e:
-                    logger.error(f"Redis error during cleanup: {e}")
-
-                # Помечаем секрет как удалённый
-                secret.is_deleted = True
-
-                # Логируем действие
-                log = models.SecretLog(
-                    secret_id=secret.id,
-                    secret_key=secret.secret_key,
-                    action="auto_cleanup_expired",
-                    ip_address="system"
-                )
-                db.add(log)
-                db.commit()  # Коммит для каждого секрета
-                deleted_count += 1
-            except Exception as e:
-                logger.error(f"Error processing secret ID={secret.id}: {str(e)}", exc_info=True)
-                db.rollback()  # Откатываем только текущую транзакцию
-
-        return {
-            "deleted_count": deleted_count,
-            "status": "success",
-            "message": f"Deleted {deleted_count} expired secrets"
-        }
-
-    except Exception as e:
-        logger.error(f"Cleanup error: {str(e)}", exc_info=True)
-        db.rollback()
-        return {
-            "deleted_count": 0,
-            "status": "error",
-            "message": f"Cleanup failed: {str(e)}"
-        }
-    finally:
-        db.close()
-        logger.info("Cleanup session closed")
+                    await restore_due_secrets(get_redis_client(), due_keys, time.time())
+                except Exception as restore_error:
+                    logger.error("Failed to restore due secrets: %s", restore_error)
+            due_keys = []
+
+        if len(due_keys) < batch_size:
+            await asyncio.sleep(interval)
 
 
 def get_lifespan(test_mode: bool = False) -> AsyncIterator[None]:
@@ -115,54 +258,160 @@ def get_lifespan(test_mode: bool = False) -> AsyncIterator[None]:
 
     @asynccontextmanager
     async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        # Движок БД и пул соединений Redis (по одному на процесс) создаются до приёма запросов,
+        # а не при импорте: импорт приложения не загружает драйверы
+        get_engine()
+        await init_redis()
+        # Соединения, шифры и частые запросы готовятся до приёма первого запроса
+        if app_config_instance.WARMUP_ENABLED:
+            await warm_up()
+        # Фоновая запись журнала действий пачками
+        start_audit_writer()
+
         logger.info("Starting background cleanup task")
 
         # Для тестов можно использовать интервал 5 секунд
         interval = 5 if test_mode else 3600
-        logger.info(f"Cleanup interval set to {interval} seconds")
+        logger.info("Cleanup interval set to %s seconds", interval)
+
+        tasks: List[asyncio.Task] = [asyncio.create_task(periodic_cleanup(interval))]
+
+        # Точное истечение секретов по очереди в Redis
+        if app_config_instance.EXPIRY_SCHEDULER_ENABLED:
+            logger.info("Starting expiry scheduler task")
+            tasks.append(asyncio.create_task(run_expiry_scheduler()))
 
-        task = asyncio.create_task(periodic_cleanup(interval))
+        # Фоновое перешифрование секретов основным ключом (после смены ключа)
+        if app_config_instance.KEY_ROTATION_ENABLED:
+            logger.info("Starting background key rotation task")
+            tasks.append(asyncio.create_task(run_key_rotation()))
 
         try:
             yield
         finally:
-            logger.info("Stopping background task")
-            task.cancel()
-            try:
-                await task
-            except asyncio.CancelledError:
-                logger.info("Background task cancelled successfully")
-            except Exception as e:
-                logger.error(f"Error during task cancellation: {e}")
+            logger.info("Stopping background tasks")
+            for task in tasks:
+                task.cancel()
+            for task in tasks:
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    logger.info("Background task cancelled successfully")
+                except Exception as e:
+                    logger.error("Error during task cancellation: %s", e)
+
+            # Записываем накопленные события журнала до закрытия соединений
+            await stop_audit_writer()
+            await close_redis()
+            shutdown_crypto_dispatcher()
+            await dispose_engine()
 
     return lifespan
 
 
+def get_cleaner_election() -> LeaderElection:
+    """
+    Выбор лидера для периодической очистки (один экземпляр на процесс).
+    """
+    global _cleaner_election
+    if _cleaner_election is None:
+        _cleaner_election = LeaderElection(
+            name="cleaner",
+            lock_id=app_config_instance.CLEANER_ADVISORY_LOCK_ID,
+            lease_ttl=app_config_instance.CLEANER_LEASE_TTL_SECONDS,
+            backend=app_config_instance.CLEANER_LEADER_BACKEND
+        )
+    return _cleaner_election
+
+
+async def get_cleaner_status() -> Dict[str, str | bool]:
+    """
+    Текущий лидер очистки и результат его последнего запуска.
+    """
+    return await get_cleaner_election().get_status()
+
+
+async def _last_cleanup_run(election: LeaderElection) -> Optional[float]:
+    """
+    Время последнего запуска очистки (любым лидером), unix time.
+    """
+    last_run = (await election.get_status()).get("last_run_at")
+    return float(last_run) if last_run else None
+
+
+def _record_cleanup_metrics(result: Dict[str, str | int | float]) -> None:
+    cleanup_last_run.set(time.time())
+    cleanup_deleted.inc(amount=result["deleted_count"])
+    if "duration_seconds" in result:
+        cleanup_duration.observe(result["duration_seconds"])
+    if "remaining_backlog" in result:
+        cleanup_backlog.set(result["remaining_backlog"])
+
+
 async def periodic_cleanup(interval: int):
-    """Фоновая задача очистки с заданным интервалом"""
-    logger.info(f"Periodic cleanup task started (interval: {interval}s)")
+    """
+    Фоновая задача очистки с заданным интервалом.
+
+    Задача запущена в каждом процессе, но очистку выполняет только лидер:
+    остальные процессы раз в CLEANER_LEADER_CHECK_INTERVAL секунд пытаются
+    занять лидерство и подхватывают его, если лидер остановился или упал.
+    """
+    election = get_cleaner_election()
+    check_interval = min(interval, app_config_instance.CLEANER_LEADER_CHECK_INTERVAL)
+    logger.info("Periodic cleanup task started (interval: %ss, identity: %s)", interval, election.identity)
     retry_count = 0
     max_retries = 3
+    local_last_run: Optional[float] = None  # Если Redis недоступен, расписание ведётся локально
+
+    async def run_cycle() -> None:
+        nonlocal local_last_run
+        logger.info("Starting cleanup cycle")
+        result = await clean_expired_secrets()
+        local_last_run = time.time()
+        _record_cleanup_metrics(result)
+        logger.info("Cleanup result: %s", result)
+        await election.publish(
+            last_run_at=time.time(),
+            last_status=result["status"],
+            last_deleted_count=result["deleted_count"],
+            last_duration_seconds=result.get("duration_seconds", 0),
+            last_remaining_backlog=result.get("remaining_backlog", -1)
+        )
+        # Секции создаются заранее, а полностью истёкшие удаляются целиком
+        # (после очистки: истёкшие секреты уже записаны в журнал)
+        if app_config_instance.PARTITION_MAINTENANCE_ENABLED:
+            await maintain_partitions()
+            await maintain_log_partitions()
+        # Данные прочитанных и удалённых секретов, оставшиеся в таблицах
+        if app_config_instance.COMPACTION_ENABLED:
+            logger.info("Compaction result: %s", await run_compaction())
 
-    while True:
-        try:
-            start_time = datetime.now(timezone.utc)
-            logger.info("Starting cleanup cycle")
-
-            result = await asyncio.to_thread(clean_expired_secrets)
-            logger.info(f"Cleanup result: {result}")
-
-            duration = (datetime.now(timezone.utc) - start_time).total_seconds()
-            logger.info(f"Cleanup completed in {duration:.2f} seconds")
+    try:
+        while True:
+            try:
+                if await election.ensure():
+                    # Новый лидер продолжает расписание предыдущего, а не запускает очистку сразу
+                    last_run = await _last_cleanup_run(election) or local_last_run
+                    if last_run is None or time.time() - last_run >= interval:
+                        # Цикл может длиться дольше аренды: лидерство продлевается во время цикла
+                        await election.run_as_leader(run_cycle())
 
-            logger.info(f"Waiting {interval} seconds before next cleanup")
-            retry_count = 0  # Сбрасываем счётчик ошибок
-            await asyncio.sleep(interval)
+                retry_count = 0  # Сбрасываем счётчик ошибок
+                await asyncio.sleep(check_interval)
 
-        except Exception as e:
-            retry_count += 1
-            logger.error(f"Periodic cleanup error: {e}", exc_info=True)
-            if retry_count >= max_retries:
-                logger.error("Maximum retries reached. Stopping periodic cleanup task.")
-                break
-            await asyncio.sleep(min(60, interval))  # Ждём перед повторной попыткой
\ No newline at end of file
+            except asyncio.CancelledError:
+                raise
+            except LeadershipLost as e:
+                # Цикл прерван: его продолжит новый лидер
+                logger.warning("Cleanup cycle aborted: %s", e)
+                await asyncio.sleep(check_interval)
+            except Exception as e:
+                retry_count += 1
+                logger.error("Periodic cleanup error: %s", e, exc_info=True)
+                if retry_count >= max_retries:
+                    logger.error("Maximum retries reached. Stopping periodic cleanup task.")
+                    break
+                await asyncio.sleep(min(60, interval))  # Ждём перед повторной попыткой
+    finally:
+        # Освобождаем лидерство, чтобы другой процесс подхватил его без ожидания
+        await election.release()
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from typing import Dict, List
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from .crypto_dispatcher import get_crypto_dispatcher
+from .encryption import digest_passphrase
+from .keyring import get_keyring
+from .logger_config import setup_logger
+from ..cache.expiry_queue import POP_DUE_SCRIPT
+from ..cache.redis_config import get_redis_client
+from ..cache.secret_cache import CONSUME_SCRIPT, REWRITE_SCRIPT
+from ..config import app_config_instance
+from ..database import models
+from ..database.config import get_engine
+
+logger = setup_logger(__name__)
+
+# Ключ, которого заведомо нет в БД: запросы прогрева ничего не находят и не меняют.
+# Ключ содержит день секции, как и настоящие ключи: запросы совпадают с запросами чтения
+WARMUP_SECRET_KEY = "19700101.__warmup__"
+
+_warmup_status: Dict[str, str | int | float] = {"status": "not_run"}
+
+
+async def _run_hot_queries(connection: AsyncConnection) -> None:
+    # Те же запросы, что и при чтении секрета (поиск по ключу и атомарная пометка):
+    # asyncpg готовит их на каждом соединении, а SQLAlchemy кеширует компиляцию
+    async with AsyncSession(bind=connection) as session:
+        await session.execute(
+            select(models.Secret).where(
+                models.Secret.key_condition(WARMUP_SECRET_KEY),
+                models.Secret.is_deleted == False
+            )
+        )
+        await session.execute(
+            update(models.Secret)
+            .where(
+                models.Secret.key_condition(WARMUP_SECRET_KEY),
+                models.Secret.is_accessed == False,
+                models.Secret.is_deleted == False
+            )
+            .values(is_accessed=True, **models.PURGED_PAYLOAD)
+            .returning(models.Secret.id)
+        )
+        await session.rollback()
+
+
+async def _warm_database(connections: int) -> int:
+    """
+    Открытие соединений PostgreSQL (не больше DB_POOL_SIZE — остальные пул закрывает при возврате)
+    и выполнение частых запросов на каждом из них.
+    """
+    connections = min(connections, app_config_instance.DB_POOL_SIZE)
+    if connections <= 0:
+        return 0
+
+    # Соединения открываются одновременно: иначе пул выдавал бы одно и то же соединение
+    results = await asyncio.gather(*(get_engine().connect() for _ in range(connections)), return_exceptions=True)
+    opened: List[AsyncConnection] = [result for result in results if isinstance(result, AsyncConnection)]
+    try:
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise errors[0]
+        await asyncio.gather(*(_run_hot_queries(connection) for connection in opened))
+    finally:
+        for connection in opened:
+            await connection.close()
+    return len(opened)
+
+
+async def _warm_redis(connections: int) -> int:
+    """
+    Открытие соединений Redis (одновременные PING занимают разные соединения пула)
+    и загрузка Lua-скриптов, чтобы первые EVALSHA не получали NOSCRIPT.
+    """
+    redis_client = get_redis_client()
+    connections = max(1, min(connections, app_config_instance.REDIS_MAX_CONNECTIONS))
+    await asyncio.gather(*(redis_client.ping() for _ in range(connections)))
+    for script in (CONSUME_SCRIPT, REWRITE_SCRIPT, POP_DUE_SCRIPT):
+        await redis_client.script_load(script)
+    return connections
+
+
+async def _warm_crypto() -> None:
+    """
+    Создание объектов шифров и ключа HMAC, запуск рабочих пула шифрования.
+    """
+    keyring = get_keyring()
+    keyring.decrypt(keyring.encrypt(b"warmup"))
+    digest_passphrase("warmup")
+    await get_crypto_dispatcher().warm_up()
+
+
+async def warm_up() -> Dict[str, str | int | float]:
+    """
+    Прогрев перед приёмом запросов (вызывается из lifespan): соединения PostgreSQL
+    и Redis, объекты шифров и частые запросы. Ошибки прогрева не мешают запуску —
+    соединения будут открыты первыми запросами, как и без прогрева.
+
+    Возвращает:
+        - Dict[str, str | int | float]: Результат прогрева (доступен через GET /health/warmup).
+    """
+    global _warmup_status
+    started = time.perf_counter()
+    status: Dict[str, str | int | float] = {"status": "success"}
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                _warm_database(app_config_instance.WARMUP_DB_CONNECTIONS),
+                _warm_redis(app_config_instance.WARMUP_REDIS_CONNECTIONS),
+                _warm_crypto(),
+                return_exceptions=True
+            ),
+            timeout=app_config_instance.WARMUP_TIMEOUT_SECONDS
+        )
+        for name, result in zip(("db_connections", "redis_connections", "crypto"), results):
+            if isinstance(result, BaseException):
+                logger.warning("Warm-up of %s failed, continuing without it: %r", name, result)
+                status["status"] = "partial"
+                status[name] = f"error: {result!r}"
+            elif result is not None:
+                status[name] = result
+    except asyncio.TimeoutError:
+        logger.warning("Warm-up did not finish in %ss, continuing without it", app_config_instance.WARMUP_TIMEOUT_SECONDS)
+        status["status"] = "timeout"
+
+    status["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    logger.info("Warm-up finished: %s", status)
+    _warmup_status = status
+    return status
+
+
+def get_warmup_status() -> Dict[str, str | int | float]:
+    return _warmup_status
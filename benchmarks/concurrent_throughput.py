@@ -0,0 +1,128 @@
+"""
+Бенчмарк конкурентной пропускной способности сервиса.
+
+Запускает заданное количество параллельных клиентов, каждый из которых
+выполняет сценарий «создать секрет -> прочитать секрет», и измеряет
+пропускную способность (операций в секунду) и задержки.
+
+Сравнение «до/после»:
+    # 1. Сервис на коммите с синхронными обработчиками
+    python -m benchmarks.concurrent_throughput --base-url http://localhost:8000 --output before.json
+
+    # 2. Сервис на коммите с AsyncSession/asyncpg
+    python -m benchmarks.concurrent_throughput --base-url http://localhost:8000 --output after.json --compare before.json
+
+Для честного сравнения сервис должен запускаться одним воркером uvicorn (--workers 1).
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+
+async def _create_then_read(client: httpx.AsyncClient, latencies: List[float], errors: List[str]) -> None:
+    """
+    Один цикл сценария: создание секрета и его однократное чтение.
+
+    Параметры:
+        - client (httpx.AsyncClient): HTTP-клиент.
+        - latencies (List[float]): Список, в который добавляется длительность цикла (в секундах).
+        - errors (List[str]): Список, в который добавляются описания ошибок.
+    """
+    started = time.perf_counter()
+    try:
+        response = await client.post("/secret/", json={"secret": "benchmark", "ttl_seconds": 600})
+        response.raise_for_status()
+        secret_key = response.json()["secret_key"]
+
+        response = await client.get(f"/secret/{secret_key}")
+        response.raise_for_status()
+    except Exception as e:
+        errors.append(str(e))
+        return
+    latencies.append(time.perf_counter() - started)
+
+
+async def _worker(client: httpx.AsyncClient, iterations: int, latencies: List[float], errors: List[str]) -> None:
+    for _ in range(iterations):
+        await _create_then_read(client, latencies, errors)
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_benchmark(base_url: str, concurrency: int, iterations: int) -> Dict[str, float | int]:
+    """
+    Запуск бенчмарка.
+
+    Параметры:
+        - base_url (str): Адрес запущенного сервиса.
+        - concurrency (int): Количество параллельных клиентов.
+        - iterations (int): Количество циклов «создать -> прочитать» на одного клиента.
+
+    Возвращает:
+        - Dict[str, float | int]: Пропускная способность, задержки (мс) и количество ошибок.
+    """
+    latencies: List[float] = []
+    errors: List[str] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            _worker(client, iterations, latencies, errors) for _ in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "operations": len(latencies),
+        "errors": len(errors),
+        "elapsed_seconds": round(elapsed, 3),
+        "operations_per_second": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        "latency_p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "latency_p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "latency_p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def _print_comparison(before: Dict[str, float | int], after: Dict[str, float | int]) -> None:
+    for metric in ("operations_per_second", "latency_p50_ms", "latency_p95_ms", "latency_p99_ms"):
+        old, new = before.get(metric, 0), after.get(metric, 0)
+        ratio = f"x{new / old:.2f}" if old else "n/a"
+        print(f"{metric:>24}: {old:>10} -> {new:>10} ({ratio})")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Concurrent create/read throughput benchmark")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--output", help="Путь к JSON-файлу для сохранения результатов")
+    parser.add_argument("--compare", help="JSON-файл с результатами предыдущего запуска")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run_benchmark(args.base_url, args.concurrency, args.iterations))
+    print(json.dumps(result, indent=2))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            _print_comparison(json.load(f), result)
+
+
+if __name__ == "__main__":
+    main()
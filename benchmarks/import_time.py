@@ -0,0 +1,138 @@
+"""
+Бюджет времени импорта приложения.
+
+Запускает `python -X importtime -c "import app.main"` в отдельных процессах
+(холодный импорт, без кеша модулей текущего процесса) и берёт медиану
+суммарного времени импорта app.main. Код выхода 1 означает, что время импорта
+больше бюджета или что при импорте загружается модуль, который должен
+загружаться только в lifespan (драйверы БД и Redis, криптография, пул процессов).
+
+    python -m benchmarks.import_time --budget-ms 1500
+    python -m benchmarks.import_time --output import.json
+    python -m benchmarks.import_time --compare import.json --max-regression 20
+
+Запускать из корня репозитория с тем же окружением (.env), что и приложение.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+# Модули, которые не должны загружаться при импорте приложения
+DEFERRED_MODULES = (
+    "asyncpg",
+    "redis",
+    "cryptography",
+    "concurrent.futures.process",
+    "multiprocessing"
+)
+
+# "import time: self [us] | cumulative | imported package"
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def _measure_once(module: str) -> Tuple[float, Dict[str, int]]:
+    """
+    Один холодный импорт модуля в отдельном процессе.
+
+    Возвращает:
+        - Tuple[float, Dict[str, int]]: Суммарное время импорта модуля (в мс)
+          и собственное время каждого загруженного модуля (в мкс).
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    total_us = 0
+    self_times: Dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        self_times[name] = int(self_us)
+        if name == module:
+            total_us = int(cumulative_us)
+    return total_us / 1000, self_times
+
+
+def run(module: str, runs: int, top: int) -> Dict:
+    """
+    Несколько холодных импортов: медиана, минимум, самые долгие модули и загруженные отложенные модули.
+    """
+    totals: List[float] = []
+    self_times: Dict[str, List[int]] = {}
+    for _ in range(runs):
+        total_ms, times = _measure_once(module)
+        totals.append(total_ms)
+        for name, value in times.items():
+            self_times.setdefault(name, []).append(value)
+
+    slowest = sorted(
+        ((name, statistics.median(values) / 1000) for name, values in self_times.items()),
+        key=lambda item: item[1],
+        reverse=True
+    )[:top]
+    deferred_loaded = sorted(
+        name for name in self_times
+        if any(name == prefix or name.startswith(prefix + ".") for prefix in DEFERRED_MODULES)
+    )
+    return {
+        "module": module,
+        "runs": runs,
+        "import_median_ms": round(statistics.median(totals), 2),
+        "import_min_ms": round(min(totals), 2),
+        "modules_loaded": len(self_times),
+        "deferred_modules_loaded": deferred_loaded,
+        "slowest_modules_ms": {name: round(value, 2) for name, value in slowest}
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Import-time budget for app.main")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Сколько самых долгих модулей вывести")
+    parser.add_argument("--budget-ms", type=float, help="Максимальная медиана времени импорта (в мс)")
+    parser.add_argument("--output", help="Путь к JSON-файлу для сохранения результатов")
+    parser.add_argument("--compare", help="JSON-файл с результатами предыдущего запуска")
+    parser.add_argument("--max-regression", type=float, default=20.0,
+                        help="Допустимое замедление относительно --compare (в процентах)")
+    args = parser.parse_args(argv)
+
+    result = run(args.module, args.runs, args.top)
+    print(json.dumps(result, indent=2))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    failures = []
+    if result["deferred_modules_loaded"]:
+        failures.append(f"modules loaded at import time: {', '.join(result['deferred_modules_loaded'])}")
+    if args.budget_ms is not None and result["import_median_ms"] > args.budget_ms:
+        failures.append(f"import_median_ms {result['import_median_ms']} > budget {args.budget_ms}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            before = json.load(f)["import_median_ms"]
+        change = (result["import_median_ms"] - before) / before * 100 if before else 0.0
+        print(f"import_median_ms: {before} -> {result['import_median_ms']} ({change:+.1f}%)")
+        if change > args.max_regression:
+            failures.append(f"import_median_ms regressed by {change:.1f}% (> {args.max_regression}%)")
+
+    if failures:
+        print("Import-time budget exceeded:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
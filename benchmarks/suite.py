@@ -0,0 +1,376 @@
+"""
+Воспроизводимый набор нагрузочных сценариев для создания, чтения и удаления секретов.
+
+Приложение запускается в том же процессе (httpx.ASGITransport) вместе со своим
+lifespan: фоновой записью журнала, очисткой и очередью истечения. Нужна локальная
+PostgreSQL с применёнными миграциями (переменные окружения те же, что у сервиса;
+используйте отдельную базу — бенчмарк создаёт в ней секреты). Redis — локальный
+(--redis server) или в памяти процесса (--redis memory, требуется пакет fakeredis).
+
+Сценарии (смесь задаётся весами, выбор операций детерминирован --seed):
+    - create_read:     создать секрет и прочитать его
+    - read_miss:       прочитать несуществующий ключ (404)
+    - bad_passphrase:  создать секрет с паролем и прочитать с неверным (403)
+    - delete:          создать секрет и удалить его
+    - create_expiring: создать секрет с TTL 1 с, который не читается (нагрузка для очистки)
+
+Во время прогона --cleaner-interval > 0 включает очистку истёкших секретов параллельно с нагрузкой.
+
+Примеры:
+    python -m benchmarks.suite --redis memory --output baseline.json
+    python -m benchmarks.suite --redis memory --compare baseline.json --max-regression 10
+    python -m benchmarks.suite --mix create_read=50,create_expiring=50 --cleaner-interval 1
+
+При --compare код выхода 1 означает регрессию: пропускная способность упала или p95
+вырос больше чем на --max-regression процентов хотя бы в одном сценарии.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import event
+
+from benchmarks.concurrent_throughput import _percentile
+
+# Сценарий текущей операции: по нему запросы к БД и Redis относятся к сценарию
+_current_scenario: contextvars.ContextVar[str] = contextvars.ContextVar("benchmark_scenario", default="background")
+
+DEFAULT_MIX = "create_read=60,read_miss=15,bad_passphrase=10,delete=10,create_expiring=5"
+
+
+class OpCounter:
+    """
+    Подсчёт запросов к БД и обменов с Redis по сценариям.
+
+    Запросы к БД считаются событием SQLAlchemy before_cursor_execute (executemany —
+    один запрос), обмены с Redis — по командам клиента и выполнениям конвейеров.
+    """
+
+    def __init__(self):
+        self.db: Dict[str, int] = defaultdict(int)
+        self.redis: Dict[str, int] = defaultdict(int)
+
+    def on_cursor_execute(self, *args, **kwargs) -> None:
+        self.db[_current_scenario.get()] += 1
+
+    def instrument_redis(self, client) -> None:
+        execute_command = client.execute_command
+        pipeline = client.pipeline
+
+        async def counted_execute_command(*args, **kwargs):
+            self.redis[_current_scenario.get()] += 1
+            return await execute_command(*args, **kwargs)
+
+        def counted_pipeline(*args, **kwargs):
+            pipe = pipeline(*args, **kwargs)
+            pipe_execute = pipe.execute
+
+            async def counted_execute(*execute_args, **execute_kwargs):
+                self.redis[_current_scenario.get()] += 1
+                return await pipe_execute(*execute_args, **execute_kwargs)
+
+            pipe.execute = counted_execute
+            return pipe
+
+        client.execute_command = counted_execute_command
+        client.pipeline = counted_pipeline
+
+
+def parse_mix(mix: str) -> List[Tuple[str, int]]:
+    weights = []
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {name} (available: {', '.join(SCENARIOS)})")
+        weights.append((name, int(weight or 1)))
+    return weights
+
+
+async def _create(client: httpx.AsyncClient, **payload) -> str:
+    response = await client.post("/secret/", json={"secret": "benchmark", "ttl_seconds": 600, **payload})
+    response.raise_for_status()
+    return response.json()["secret_key"]
+
+
+def _expect(response: httpx.Response, status: int) -> None:
+    if response.status_code != status:
+        raise RuntimeError(f"{response.request.method} {response.request.url.path}: "
+                           f"expected {status}, got {response.status_code}")
+
+
+async def scenario_create_read(client: httpx.AsyncClient, rng: random.Random) -> None:
+    secret_key = await _create(client)
+    _expect(await client.get(f"/secret/{secret_key}"), 200)
+
+
+async def scenario_read_miss(client: httpx.AsyncClient, rng: random.Random) -> None:
+    _expect(await client.get(f"/secret/missing-{rng.getrandbits(64):x}"), 404)
+
+
+async def scenario_bad_passphrase(client: httpx.AsyncClient, rng: random.Random) -> None:
+    secret_key = await _create(client, passphrase="right")
+    _expect(await client.get(f"/secret/{secret_key}", params={"passphrase": "wrong"}), 403)
+
+
+async def scenario_delete(client: httpx.AsyncClient, rng: random.Random) -> None:
+    secret_key = await _create(client)
+    _expect(await client.delete(f"/secret/{secret_key}"), 200)
+
+
+async def scenario_create_expiring(client: httpx.AsyncClient, rng: random.Random) -> None:
+    await _create(client, ttl_seconds=1)
+
+
+SCENARIOS = {
+    "create_read": scenario_create_read,
+    "read_miss": scenario_read_miss,
+    "bad_passphrase": scenario_bad_passphrase,
+    "delete": scenario_delete,
+    "create_expiring": scenario_create_expiring,
+}
+
+
+async def _worker(
+        client: httpx.AsyncClient,
+        rng: random.Random,
+        mix: List[Tuple[str, int]],
+        iterations: int,
+        latencies: Dict[str, List[float]],
+        errors: Dict[str, List[str]]
+) -> None:
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    for _ in range(iterations):
+        name = rng.choices(names, weights)[0]
+        token = _current_scenario.set(name)
+        started = time.perf_counter()
+        try:
+            await SCENARIOS[name](client, rng)
+            latencies[name].append(time.perf_counter() - started)
+        except Exception as e:
+            errors[name].append(str(e))
+        finally:
+            _current_scenario.reset(token)
+
+
+async def _cleaner_loop(interval: float, runs: List[Dict]) -> None:
+    from app.tools.secret_cleaner import clean_expired_secrets
+
+    token = _current_scenario.set("cleaner")
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            runs.append(await clean_expired_secrets())
+    finally:
+        _current_scenario.reset(token)
+
+
+def _summarize(values: List[float], errors: int, elapsed: float, db_ops: int, redis_ops: int) -> Dict[str, float | int]:
+    count = len(values)
+    per_request = count + errors
+    return {
+        "operations": count,
+        "errors": errors,
+        "operations_per_second": round(count / elapsed, 2) if elapsed else 0.0,
+        "latency_mean_ms": round(statistics.fmean(values) * 1000, 2) if values else 0.0,
+        "latency_p50_ms": round(_percentile(values, 50) * 1000, 2),
+        "latency_p95_ms": round(_percentile(values, 95) * 1000, 2),
+        "latency_p99_ms": round(_percentile(values, 99) * 1000, 2),
+        "db_ops_per_operation": round(db_ops / per_request, 2) if per_request else 0.0,
+        "redis_ops_per_operation": round(redis_ops / per_request, 2) if per_request else 0.0,
+    }
+
+
+async def run_suite(
+        concurrency: int,
+        iterations: int,
+        mix: List[Tuple[str, int]],
+        seed: int,
+        redis_mode: str,
+        cleaner_interval: float,
+        rate_limit: bool = False
+) -> Dict:
+    """
+    Запуск набора сценариев против приложения в том же процессе.
+
+    Параметры:
+        - concurrency (int): Количество параллельных клиентов.
+        - iterations (int): Количество операций на одного клиента.
+        - mix (List[Tuple[str, int]]): Сценарии с весами.
+        - seed (int): Начальное значение генератора (одинаковый seed — одинаковая последовательность операций).
+        - redis_mode (str): server — локальный Redis, memory — fakeredis.
+        - cleaner_interval (float): Интервал очистки во время прогона (0 — без очистки).
+        - rate_limit (bool): Включить ограничение частоты запросов (все клиенты прогона — один IP-адрес).
+
+    Возвращает:
+        - Dict: Параметры прогона и результаты по сценариям и в целом.
+    """
+    from app.cache import redis_config
+    from app.config import app_config_instance
+    from app.database.config import get_engine
+    from app.main import app
+
+    # Все клиенты прогона приходят с одного адреса: с лимитами на IP прогон измерял бы ответы 429
+    app_config_instance.RATE_LIMIT_ENABLED = rate_limit
+
+    if redis_mode == "memory":
+        try:
+            import fakeredis
+        except ImportError:
+            raise SystemExit("--redis memory requires the fakeredis package (pip install fakeredis)")
+        # init_redis из lifespan вернёт уже созданный клиент
+        redis_config._redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    counter = OpCounter()
+    engine = get_engine()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter.on_cursor_execute)
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, List[str]] = defaultdict(list)
+    cleaner_runs: List[Dict] = []
+
+    try:
+        async with app.router.lifespan_context(app):
+            counter.instrument_redis(redis_config.get_redis_client())
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+                cleaner = (
+                    asyncio.create_task(_cleaner_loop(cleaner_interval, cleaner_runs))
+                    if cleaner_interval > 0 else None
+                )
+                started = time.perf_counter()
+                await asyncio.gather(*(
+                    _worker(client, random.Random(seed + index), mix, iterations, latencies, errors)
+                    for index in range(concurrency)
+                ))
+                elapsed = time.perf_counter() - started
+                if cleaner is not None:
+                    cleaner.cancel()
+                    await asyncio.gather(cleaner, return_exceptions=True)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", counter.on_cursor_execute)
+
+    scenarios = {
+        name: _summarize(latencies[name], len(errors[name]), elapsed, counter.db[name], counter.redis[name])
+        for name, _ in mix
+    }
+    all_latencies = [value for values in latencies.values() for value in values]
+    total_errors = sum(len(values) for values in errors.values())
+    totals = _summarize(
+        all_latencies,
+        total_errors,
+        elapsed,
+        sum(counter.db[name] for name, _ in mix),
+        sum(counter.redis[name] for name, _ in mix)
+    )
+
+    return {
+        "config": {
+            "concurrency": concurrency,
+            "iterations": iterations,
+            "mix": dict(mix),
+            "seed": seed,
+            "redis": redis_mode,
+            "cleaner_interval": cleaner_interval,
+            "rate_limit": rate_limit,
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "totals": totals,
+        "scenarios": scenarios,
+        "background": {
+            "db_ops": counter.db["background"] + counter.db["cleaner"],
+            "redis_ops": counter.redis["background"] + counter.redis["cleaner"],
+            "cleaner_runs": len(cleaner_runs),
+            "cleaner_deleted": sum(run.get("deleted_count", 0) for run in cleaner_runs),
+            "cleaner_max_duration_seconds": max((run.get("duration_seconds", 0) for run in cleaner_runs), default=0),
+        },
+        "error_samples": {name: values[:3] for name, values in errors.items() if values},
+    }
+
+
+def compare(baseline: Dict, result: Dict, max_regression: float) -> List[str]:
+    """
+    Сравнение с сохранённым результатом.
+
+    Возвращает:
+        - List[str]: Описания регрессий (пустой список — регрессий нет).
+    """
+    regressions = []
+    sections = [("totals", baseline.get("totals", {}), result["totals"])]
+    sections += [
+        (name, baseline.get("scenarios", {}).get(name, {}), values)
+        for name, values in result["scenarios"].items()
+    ]
+
+    print(f"{'section':>16} {'metric':>24} {'baseline':>10} {'current':>10} {'change':>8}")
+    for section, old, new in sections:
+        for metric, higher_is_better in (
+                ("operations_per_second", True),
+                ("latency_p50_ms", False),
+                ("latency_p95_ms", False),
+                ("latency_p99_ms", False),
+                ("db_ops_per_operation", False),
+                ("redis_ops_per_operation", False),
+        ):
+            before, after = old.get(metric), new.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            print(f"{section:>16} {metric:>24} {before:>10} {after:>10} {change:>+7.1f}%")
+
+            regressed = change < -max_regression if higher_is_better else change > max_regression
+            # Пороги проверяются для пропускной способности и p95: p99 на коротких прогонах шумит
+            if regressed and metric in ("operations_per_second", "latency_p95_ms"):
+                regressions.append(f"{section}.{metric}: {before} -> {after} ({change:+.1f}%)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="In-process create/read/delete benchmark suite")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=50, help="Операций на одного клиента")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Сценарии с весами (по умолчанию {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--redis", choices=("server", "memory"), default="server")
+    parser.add_argument("--cleaner-interval", type=float, default=0.0)
+    parser.add_argument("--rate-limit", action="store_true", help="Не отключать ограничение частоты запросов")
+    parser.add_argument("--output", help="Путь к JSON-файлу для сохранения результатов")
+    parser.add_argument("--compare", help="JSON-файл с результатами базового прогона")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="Допустимое ухудшение, %%")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run_suite(
+        concurrency=args.concurrency,
+        iterations=args.iterations,
+        mix=parse_mix(args.mix),
+        seed=args.seed,
+        redis_mode=args.redis,
+        cleaner_interval=args.cleaner_interval,
+        rate_limit=args.rate_limit
+    ))
+    print(json.dumps(result, indent=2))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), result, args.max_regression)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import os
+
+from cryptography.fernet import Fernet
+
+# Окружение задаётся до импорта приложения: Config читает его при импорте.
+# Тесты с PostgreSQL выполняются, только если задан TEST_POSTGRES_URL (URL psycopg2):
+# схема этой БД пересоздаётся перед каждым тестом.
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+os.environ["USE_DOCKER"] = "0"
+os.environ["NO_DOCKER_POSTGRES_URL"] = TEST_POSTGRES_URL or "postgresql+psycopg2://postgres@localhost/secrets_test"
+os.environ.setdefault("ENCRYPTION_KEY", Fernet.generate_key().decode())
+os.environ.setdefault("PASSPHRASE_DIGEST_KEY", "test-passphrase-digest-key")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import fakeredis  # noqa: E402
+import pytest  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from app.cache import redis_config  # noqa: E402
+from app.database.config import Base, dispose_engine  # noqa: E402
+from app.database import models  # noqa: E402,F401  (регистрация таблиц в Base.metadata)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def redis_client(monkeypatch):
+    """
+    Общий клиент Redis приложения, подменённый fakeredis (с поддержкой Lua).
+    """
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    await client.flushall()
+    monkeypatch.setattr(redis_config, "_redis_client", client)
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+async def database():
+    """
+    Чистая схема тестовой БД (create_all); без TEST_POSTGRES_URL тест пропускается.
+    """
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    engine = create_engine(TEST_POSTGRES_URL)
+    with engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA public CASCADE; CREATE SCHEMA public;"))
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    yield
+    # Соединения asyncpg привязаны к циклу событий теста
+    await dispose_engine()
@@ -0,0 +1,103 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.tools import admission
+from app.tools.admission import (
+    REJECT_DB_SATURATED,
+    REJECT_QUEUE_FULL,
+    REJECT_QUEUE_TIMEOUT,
+    AdmissionController,
+    AdmissionMiddleware,
+    Overloaded
+)
+
+pytestmark = pytest.mark.anyio
+
+
+async def _rejection(controller: AdmissionController) -> str:
+    with pytest.raises(Overloaded) as error:
+        await controller.acquire()
+    return error.value.reason
+
+
+async def test_admits_up_to_limit_then_rejects_when_queue_is_full():
+    controller = AdmissionController(max_in_flight=2, max_queue=0, queue_timeout=1)
+    await controller.acquire()
+    await controller.acquire()
+
+    assert await _rejection(controller) == REJECT_QUEUE_FULL
+    controller.release()
+    await controller.acquire()
+    assert controller.stats()["rejected"] == {REJECT_QUEUE_FULL: 1}
+
+
+async def test_queued_request_times_out():
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=0.01)
+    await controller.acquire()
+
+    assert await _rejection(controller) == REJECT_QUEUE_TIMEOUT
+    assert controller.queued == 0
+
+
+async def test_release_hands_slot_to_waiters_in_order():
+    controller = AdmissionController(max_in_flight=1, max_queue=2, queue_timeout=1)
+    await controller.acquire()
+    first = asyncio.ensure_future(controller.acquire())
+    second = asyncio.ensure_future(controller.acquire())
+    await asyncio.sleep(0)
+
+    controller.release()
+    await asyncio.wait_for(first, 1)
+    assert not second.done()
+    assert controller.in_flight == 1
+
+    controller.release()
+    await asyncio.wait_for(second, 1)
+    controller.release()
+    assert controller.in_flight == 0
+
+
+async def test_rejects_when_database_pool_is_saturated(monkeypatch):
+    monkeypatch.setattr(admission.pool_wait_tracker, "current_wait", lambda: 1.0)
+    controller = AdmissionController(max_in_flight=10, max_queue=10, queue_timeout=1, db_wait_threshold=0.5)
+
+    assert await _rejection(controller) == REJECT_DB_SATURATED
+    assert controller.in_flight == 0
+
+
+async def test_middleware_sheds_with_503_and_exempts_health(monkeypatch):
+    controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1)
+    monkeypatch.setattr(admission, "_controller", controller)
+    gate = asyncio.Event()
+
+    async def work(request):
+        await gate.wait()
+        return PlainTextResponse("done")
+
+    async def health(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(
+        routes=[Route("/work", work), Route("/health/", health)],
+        middleware=[Middleware(AdmissionMiddleware)]
+    )
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        busy = asyncio.ensure_future(client.get("/work"))
+        while controller.in_flight == 0:
+            await asyncio.sleep(0)
+
+        shed = await client.get("/work")
+        assert shed.status_code == 503
+        assert shed.headers["Retry-After"] == "1"
+        assert shed.headers["X-Shed-Reason"] == REJECT_QUEUE_FULL
+        assert (await client.get("/health/")).status_code == 200
+
+        gate.set()
+        assert (await busy).status_code == 200
+    assert controller.in_flight == 0
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from app.tools import audit_log
+from app.tools.audit_log import OVERFLOW_BLOCK, OVERFLOW_DROP, OVERFLOW_SAMPLE, AuditLogWriter
+from app.tools.metrics import audit_events, audit_flush_duration, audit_flush_errors
+
+pytestmark = pytest.mark.anyio
+
+
+def _metric_values() -> tuple:
+    # Метрики общие для процесса: тесты сравнивают приращения
+    return (
+        audit_events._values.get(("written",), 0),
+        audit_events._values.get(("dropped",), 0),
+        audit_flush_errors._values.get((), 0),
+        sum(audit_flush_duration._values.get((), [[0]])[0])
+    )
+
+
+def _writer(policy: str, max_queue_size: int = 4, sample_rate: float = 0.1) -> AuditLogWriter:
+    # Фоновая задача не запускается: события остаются в очереди
+    return AuditLogWriter(max_queue_size, batch_size=10, flush_interval=0.01, overflow_policy=policy, sample_rate=sample_rate)
+
+
+async def _log(writer: AuditLogWriter, count: int) -> None:
+    for i in range(count):
+        await writer.log(i, f"key{i}", "access_successful", "127.0.0.1")
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        _writer("spill")
+
+
+async def test_block_waits_for_free_space():
+    writer = _writer(OVERFLOW_BLOCK, max_queue_size=2)
+    await _log(writer, 2)
+
+    blocked = asyncio.ensure_future(writer.log(None, "late", "access_successful", "127.0.0.1"))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    writer._drain(1)
+    await asyncio.wait_for(blocked, 1)
+    assert writer.stats()["enqueued"] == 3
+    assert writer.stats()["dropped"] == 0
+
+
+async def test_drop_discards_events_when_full():
+    writer = _writer(OVERFLOW_DROP, max_queue_size=3)
+    before = _metric_values()
+    await _log(writer, 5)
+
+    stats = writer.stats()
+    assert (stats["queue_depth"], stats["enqueued"], stats["dropped"]) == (3, 3, 2)
+    assert _metric_values()[1] - before[1] == 2
+
+
+async def test_sample_keeps_share_of_events_above_half_full(monkeypatch):
+    writer = _writer(OVERFLOW_SAMPLE, max_queue_size=4, sample_rate=0.5)
+    samples = iter([0.9, 0.1, 0.9, 0.1])
+    monkeypatch.setattr(audit_log.random, "random", lambda: next(samples))
+
+    # Первые два события (очередь заполнена меньше чем наполовину) сохраняются без выборки,
+    # дальше сохраняются только события с random() < sample_rate
+    await _log(writer, 6)
+
+    stats = writer.stats()
+    assert (stats["enqueued"], stats["dropped"]) == (4, 2)
+    assert [event["secret_key"] for event in writer._drain(10)] == ["key0", "key1", "key3", "key5"]
+
+
+async def test_flush_writes_batches_and_failed_flush_is_counted(monkeypatch):
+    batches = []
+
+    class Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, statement, rows):
+            if any(row["action"] == "fail" for row in rows):
+                raise RuntimeError("database is unavailable")
+            batches.append(list(rows))
+
+        async def commit(self):
+            pass
+
+    monkeypatch.setattr(audit_log, "AsyncSessionLocal", Session)
+    writer = AuditLogWriter(100, batch_size=2, flush_interval=0.01)
+    before = _metric_values()
+    writer.start()
+    await _log(writer, 3)
+    await writer.stop()
+
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert batches[0][0]["created_at"] <= batches[1][0]["created_at"]
+
+    await writer._flush([{"action": "fail"}])
+    stats = writer.stats()
+    assert (stats["written"], stats["flushes"], stats["flush_errors"]) == (3, 2, 1)
+    # Записанные события, отброшенные, ошибки записи и число наблюдений длительности записи
+    assert tuple(after - was for after, was in zip(_metric_values(), before)) == (3, 0, 1, 2)
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from sqlalchemy import func, select, update
+
+from app.config import app_config_instance
+from app.crud.secrets import get_secret_stream
+from app.database import models
+from app.database.config import AsyncSessionLocal
+from app.main import app
+from app.tools.compaction import run_compaction
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def client(database, redis_client):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def _create_stream(client, payload: bytes) -> str:
+    response = await client.post("/secret/stream", content=payload)
+    assert response.status_code == 200
+    return response.json()["secret_key"]
+
+
+async def _chunk_count(secret_key: str) -> int:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(
+            select(func.count())
+            .select_from(models.SecretChunk)
+            .join(models.Secret, models.Secret.id == models.SecretChunk.secret_id)
+            .where(models.Secret.secret_key == secret_key)
+        )).scalar_one()
+
+
+async def _update(secret_key: str, **values) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(models.Secret).where(models.Secret.secret_key == secret_key).values(**values))
+        await db.commit()
+
+
+async def test_stream_deleted_during_download_keeps_its_chunks(client, monkeypatch):
+    # Сегменты читаются по одному: остальные читаются уже после удаления и уплотнения
+    monkeypatch.setattr(app_config_instance, "STREAM_FETCH_CHUNKS", 1)
+    payload = bytes(range(256)) * (app_config_instance.STREAM_CHUNK_SIZE // 256 * 4)
+    secret_key = await _create_stream(client, payload)
+
+    async with AsyncSessionLocal() as db:
+        chunks = await get_secret_stream(db, secret_key)
+    received = [await chunks.__anext__()]
+
+    assert (await client.delete(f"/secret/{secret_key}")).status_code == 200
+    result = await run_compaction(pause_seconds=0)
+    assert result["purged_chunks"] == 0
+
+    received.extend([chunk async for chunk in chunks])
+    assert b"".join(received) == payload
+    assert await _chunk_count(secret_key) == 0
+
+
+async def test_chunks_of_read_stream_are_kept_until_grace_after_expiry(client):
+    secret_key = await _create_stream(client, b"x" * 1000)
+    now = datetime.now(timezone.utc)
+    # Секрет прочитан (передача могла не завершиться) и уже истёк
+    await _update(secret_key, is_accessed=True, expires_at=now - timedelta(minutes=10))
+
+    assert (await run_compaction(pause_seconds=0))["purged_chunks"] == 0
+    assert await _chunk_count(secret_key) == 1
+
+    await _update(secret_key, expires_at=now - timedelta(hours=2))
+    result = await run_compaction(pause_seconds=0)
+    assert result["purged_chunks"] == 1
+    assert await _chunk_count(secret_key) == 0
+
+
+async def test_chunks_of_unread_deleted_stream_are_purged_immediately(client):
+    secret_key = await _create_stream(client, b"x" * 1000)
+    # Как после истечения: очистка помечает непрочитанный секрет удалённым
+    await _update(secret_key, is_deleted=True)
+
+    result = await run_compaction(pause_seconds=0)
+    assert (result["purged_chunks"], result["chunk_bytes"]) == (1, result["bytes_reclaimed"] - result["payload_bytes"])
+    assert await _chunk_count(secret_key) == 0
+
+
+async def test_compaction_purges_dead_payload_in_batches(database):
+    async with AsyncSessionLocal() as db:
+        for i in range(5):
+            secret = models.Secret()
+            secret.set_expiry(60)
+            secret.encrypted_secret = "c" * 100
+            secret.passphrase_digest = "d" * 64 if i % 2 else None
+            secret.is_accessed = i < 2
+            secret.is_deleted = 2 <= i < 4
+            db.add(secret)
+        await db.commit()
+
+    result = await run_compaction(batch_size=2, pause_seconds=0)
+    assert result["status"] == "success"
+    assert result["complete"]
+    assert (result["purged_payloads"], result["payload_bytes"]) == (4, 4 * 100 + 2 * 64)
+
+    async with AsyncSessionLocal() as db:
+        live = (await db.execute(select(models.Secret).where(models.Secret.encrypted_secret.isnot(None)))).scalars().all()
+    assert [(secret.is_accessed, secret.is_deleted) for secret in live] == [(False, False)]
+    assert (await run_compaction(pause_seconds=0))["bytes_reclaimed"] == 0
@@ -0,0 +1,26 @@
+import pytest
+
+from app.config import Config
+
+
+def test_missing_passphrase_digest_key_fails_at_startup(monkeypatch):
+    monkeypatch.delenv("PASSPHRASE_DIGEST_KEY")
+    with pytest.raises(ValueError, match="PASSPHRASE_DIGEST_KEY"):
+        Config()
+
+    monkeypatch.setenv("PASSPHRASE_DIGEST_KEY", " ")
+    with pytest.raises(ValueError, match="PASSPHRASE_DIGEST_KEY"):
+        Config()
+
+
+
+def test_lease_ttl_must_cover_cleanup_cycle_budget(monkeypatch):
+    monkeypatch.setattr(Config, "CLEANUP_TIME_BUDGET_SECONDS", 60)
+    monkeypatch.setattr(Config, "COMPACTION_TIME_BUDGET_SECONDS", 60)
+    monkeypatch.setattr(Config, "COMPACTION_ENABLED", True)
+    monkeypatch.setattr(Config, "CLEANER_LEASE_TTL_SECONDS", 120)
+    with pytest.raises(ValueError, match="CLEANER_LEASE_TTL_SECONDS"):
+        Config()
+
+    monkeypatch.setattr(Config, "COMPACTION_ENABLED", False)
+    Config()
@@ -0,0 +1,63 @@
+import os
+import threading
+
+import pytest
+
+from app.tools.crypto_dispatcher import EXECUTOR_PROCESS, EXECUTOR_THREAD, CryptoDispatcher
+from app.tools.encryption import decrypt_data, encrypt_data
+
+pytestmark = pytest.mark.anyio
+
+
+def _thread_name(_):
+    return threading.current_thread().name
+
+
+def _pid(_):
+    # Функция уровня модуля: передаётся в пул процессов
+    return os.getpid()
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = CryptoDispatcher(offload_threshold=1024, executor_kind=EXECUTOR_THREAD, max_workers=2)
+    yield dispatcher
+    dispatcher.shutdown()
+
+
+def test_unknown_executor_is_rejected():
+    with pytest.raises(ValueError):
+        CryptoDispatcher(offload_threshold=1024, executor_kind="fiber")
+
+
+async def test_offloads_from_threshold_size(dispatcher):
+    loop_thread = threading.current_thread().name
+
+    assert await dispatcher.call("op", _thread_name, None, 1023) == loop_thread
+    assert (await dispatcher.call("op", _thread_name, None, 1024)).startswith("crypto")
+    assert dispatcher.stats()["op"]["calls"] == 2
+    assert dispatcher.stats()["op"]["offloaded"] == 1
+
+
+async def test_map_uses_total_batch_size_and_keeps_order(dispatcher):
+    items = [f"secret-{i}" * 20 for i in range(7)]
+
+    # 7 элементов по 160 байт — больше порога: пачка делится между рабочими пула
+    encrypted = await dispatcher.map("encrypt", encrypt_data, items, [len(item) for item in items])
+    assert [decrypt_data(token) for token in encrypted] == items
+    assert dispatcher.stats()["encrypt"]["offloaded"] == 1
+
+    names = await dispatcher.map("op", _thread_name, items[:2], [10, 10])
+    assert names == [threading.current_thread().name] * 2
+
+
+async def test_process_executor_runs_large_operations_in_other_processes():
+    dispatcher = CryptoDispatcher(offload_threshold=1024, executor_kind=EXECUTOR_PROCESS, max_workers=1)
+    try:
+        assert await dispatcher.call("op", _pid, None, 10) == os.getpid()
+        assert await dispatcher.call("op", _pid, None, 4096) != os.getpid()
+        # Шифрование в дочернем процессе теми же ключами
+        token = await dispatcher.call("encrypt", encrypt_data, "x" * 4096, 4096)
+        assert decrypt_data(token) == "x" * 4096
+    finally:
+        dispatcher.shutdown()
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+from app.cache.expiry_queue import EXPIRY_QUEUE_KEY, pop_due_secrets, restore_due_secrets, schedule_expiry
+from app.database import models
+from app.database.config import AsyncSessionLocal
+from app.tools import secret_cleaner
+from app.tools.secret_cleaner import expire_secrets_by_keys, run_expiry_scheduler
+
+pytestmark = pytest.mark.anyio
+
+# Планировщик сравнивает сроки с текущим временем
+NOW = datetime.now(timezone.utc)
+
+
+async def _schedule(redis_client, **offsets):
+    for secret_key, seconds in offsets.items():
+        await schedule_expiry(redis_client, secret_key, NOW + timedelta(seconds=seconds))
+
+
+async def test_pop_returns_due_keys_in_expiry_order(redis_client):
+    await _schedule(redis_client, k3=-1, k1=-30, k2=-10, future=60)
+
+    assert await pop_due_secrets(redis_client, NOW.timestamp(), 2) == ["k1", "k2"]
+    assert await pop_due_secrets(redis_client, NOW.timestamp(), 10) == ["k3"]
+    assert await pop_due_secrets(redis_client, NOW.timestamp(), 10) == []
+    # Элементы со сроком в будущем остаются в очереди
+    assert await redis_client.zrange(EXPIRY_QUEUE_KEY, 0, -1) == ["future"]
+
+
+async def test_restored_keys_are_due_again(redis_client):
+    await _schedule(redis_client, k1=-30, k2=-10)
+    popped = await pop_due_secrets(redis_client, NOW.timestamp(), 10)
+
+    assert await restore_due_secrets(redis_client, popped, NOW.timestamp()) == 2
+    assert sorted(await pop_due_secrets(redis_client, NOW.timestamp(), 10)) == ["k1", "k2"]
+
+
+async def test_scheduler_restores_batch_after_failure(redis_client, monkeypatch):
+    await _schedule(redis_client, k1=-30, k2=-10)
+    calls = []
+
+    async def expire(secret_keys):
+        calls.append(list(secret_keys))
+        if len(calls) == 1:
+            raise RuntimeError("database is unavailable")
+        return secret_keys
+
+    monkeypatch.setattr(secret_cleaner, "expire_secrets_by_keys", expire)
+    scheduler = asyncio.ensure_future(run_expiry_scheduler(interval=0.01, batch_size=10))
+    try:
+        for _ in range(500):
+            if len(calls) >= 2:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        scheduler.cancel()
+        await asyncio.gather(scheduler, return_exceptions=True)
+
+    # Пачка после ошибки вернулась в очередь и обработана повторно целиком
+    assert calls == [["k1", "k2"], ["k1", "k2"]]
+    assert await redis_client.zcard(EXPIRY_QUEUE_KEY) == 0
+
+
+async def test_expire_by_keys_skips_live_and_consumed_secrets(database):
+    async with AsyncSessionLocal() as db:
+        secrets = []
+        for _ in range(3):
+            secret = models.Secret()
+            secret.set_expiry(60)
+            secret.set_secret("s3cr3t")
+            secrets.append(secret)
+        secrets[2].is_accessed = True
+        db.add_all(secrets)
+        await db.commit()
+    expired, live, consumed = [secret.secret_key for secret in secrets]
+
+    # Срок наступил у первого и третьего (строки остаются в своей секции)
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(models.Secret)
+            .where(models.Secret.secret_key.in_([expired, consumed]))
+            .values(expires_at=models.Secret.expires_at - timedelta(seconds=120))
+        )
+        await db.commit()
+
+    assert await expire_secrets_by_keys([expired, live, consumed]) == [expired]
+    async with AsyncSessionLocal() as db:
+        rows = dict((await db.execute(select(models.Secret.secret_key, models.Secret.is_deleted))).all())
+    assert rows == {expired: True, live: False, consumed: False}
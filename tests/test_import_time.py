@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+from benchmarks.import_time import run
+
+# Бюджет медианы холодного импорта app.main (в мс); на медленных машинах CI его можно поднять
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500"))
+
+
+def test_app_import_stays_within_budget_and_defers_heavy_modules():
+    result = run("app.main", runs=3, top=5)
+
+    assert result["deferred_modules_loaded"] == [], f"loaded at import time: {result['deferred_modules_loaded']}"
+    assert result["import_median_ms"] <= IMPORT_TIME_BUDGET_MS, (
+        f"import of app.main took {result['import_median_ms']} ms "
+        f"(budget {IMPORT_TIME_BUDGET_MS} ms), slowest: {result['slowest_modules_ms']}"
+    )
+
+
+def test_engine_is_not_created_at_import():
+    # Движок (и пул соединений) создаётся в lifespan
+    check = "import app.main\nfrom app.database import config\nassert config._engine is None, 'engine created at import'"
+    completed = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr[-2000:]
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.config import app_config_instance
+from app.crud.secrets import create_streamed_secret, get_secret_stream
+from app.database import models
+from app.database.config import AsyncSessionLocal
+from app.tools import key_rotation
+from app.tools.key_rotation import rotate_batch
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_rotation_does_not_restore_payload_consumed_meanwhile(database, redis_client, monkeypatch):
+    async with AsyncSessionLocal() as db:
+        secrets = []
+        for _ in range(2):
+            secret = models.Secret()
+            secret.set_expiry(60)
+            secret.set_secret("s3cr3t")
+            secrets.append(secret)
+        db.add_all(secrets)
+        await db.commit()
+        consumed_key, live_key = secrets[0].secret_key, secrets[1].secret_key
+
+    rotate_many = key_rotation.rotate_many
+
+    async def consume_during_rotation(tokens):
+        # Секрет читается, пока пачка перешифровывается (например, в пуле)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(models.Secret)
+                .where(models.Secret.secret_key == consumed_key)
+                .values(is_accessed=True, **models.PURGED_PAYLOAD)
+            )
+            await db.commit()
+        return await rotate_many(tokens)
+
+    monkeypatch.setattr(key_rotation, "rotate_many", consume_during_rotation)
+    assert (await rotate_batch(0, 10))["rotated"] == 2
+
+    async with AsyncSessionLocal() as db:
+        rows = dict((await db.execute(select(models.Secret.secret_key, models.Secret.encrypted_secret))).all())
+    assert rows[consumed_key] is None
+    assert rows[live_key] is not None
+
+
+async def test_rotation_skips_and_keeps_streamed_upload_in_progress(database, redis_client, monkeypatch):
+    monkeypatch.setattr(app_config_instance, "STREAM_CHUNK_SIZE", 4)
+    gate = asyncio.Event()
+
+    async def body():
+        yield b"a" * 40
+        await gate.wait()
+        yield b"b" * 10
+
+    async def upload():
+        async with AsyncSessionLocal() as db:
+            return await create_streamed_secret(db, body(), None, 3600, "127.0.0.1")
+
+    uploading = asyncio.ensure_future(upload())
+    for _ in range(500):
+        async with AsyncSessionLocal() as db:
+            if (await db.execute(select(func.count()).select_from(models.SecretChunk))).scalar_one():
+                break
+        await asyncio.sleep(0.01)
+
+    async with AsyncSessionLocal() as db:
+        secret = models.Secret()
+        secret.set_expiry(60)
+        secret.set_secret("s3cr3t")
+        db.add(secret)
+        await db.commit()
+
+    rotate_many = key_rotation.rotate_many
+
+    async def finish_upload_during_rotation(tokens):
+        # Загрузка записывает ключ данных между выборкой пачки и её UPDATE
+        gate.set()
+        await uploading
+        return await rotate_many(tokens)
+
+    monkeypatch.setattr(key_rotation, "rotate_many", finish_upload_during_rotation)
+    assert (await rotate_batch(0, 10))["rotated"] == 1
+
+    async with AsyncSessionLocal() as db:
+        chunks = await get_secret_stream(db, uploading.result().secret_key)
+        assert b"".join([chunk async for chunk in chunks]) == b"a" * 40 + b"b" * 10
+
+
+async def test_rotation_releases_only_its_own_lock(redis_client, monkeypatch):
+    batches = iter([{"last_id": 10, "rotated": 2}, {"last_id": 20, "rotated": 2}])
+
+    async def lock_taken_over_during_batch(after_id, batch_size):
+        # Блокировка истекла во время пачки, и ротацию начал другой процесс
+        await redis_client.set(key_rotation.LOCK_KEY, "other-process", ex=key_rotation.LOCK_TTL_SECONDS)
+        await redis_client.hset(key_rotation.PROGRESS_KEY, mapping={"last_id": 99})
+        return next(batches)
+
+    monkeypatch.setattr(key_rotation, "rotate_batch", lock_taken_over_during_batch)
+    result = await key_rotation.run_key_rotation(batch_size=2, pause_seconds=0)
+
+    assert result["status"] == "lost_lock"
+    assert await redis_client.get(key_rotation.LOCK_KEY) == "other-process"
+    assert await redis_client.hget(key_rotation.PROGRESS_KEY, "last_id") == "99"
+
+
+async def test_rotation_renews_and_releases_lock(redis_client, monkeypatch):
+    batches = iter([{"last_id": 10, "rotated": 2}, {"last_id": 15, "rotated": 1}])
+    ttls = []
+
+    async def batch(after_id, batch_size):
+        ttls.append(await redis_client.ttl(key_rotation.LOCK_KEY))
+        await redis_client.expire(key_rotation.LOCK_KEY, 1)
+        return next(batches)
+
+    monkeypatch.setattr(key_rotation, "rotate_batch", batch)
+    result = await key_rotation.run_key_rotation(batch_size=2, pause_seconds=0)
+
+    assert result == {"status": "success", "fingerprint": result["fingerprint"], "rotated": 3, "last_id": 15, "done": True}
+    # Вторая пачка начинается с продлённой блокировкой
+    assert ttls == [key_rotation.LOCK_TTL_SECONDS] * 2
+    assert await redis_client.get(key_rotation.LOCK_KEY) is None
+    assert await redis_client.hget(key_rotation.PROGRESS_KEY, "done") == "1"
@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from app.tools.leader_election import BACKEND_REDIS, LeaderElection, LeadershipLost
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_lease_is_renewed_while_leader_task_runs(redis_client):
+    election = LeaderElection("test", lock_id=1, lease_ttl=0.3, backend=BACKEND_REDIS)
+    assert await election.ensure()
+
+    async def work():
+        await asyncio.sleep(1)
+        return "done"
+
+    # Задача длится дольше трёх TTL аренды
+    assert await election.run_as_leader(work()) == "done"
+    assert await redis_client.get(election.lease_key) == election.identity
+    assert election.is_leader
+
+
+async def test_leader_task_is_cancelled_when_lease_is_taken(redis_client):
+    election = LeaderElection("test", lock_id=1, lease_ttl=0.3, backend=BACKEND_REDIS)
+    other = LeaderElection("test", lock_id=1, lease_ttl=0.3, backend=BACKEND_REDIS)
+    other.identity = "other:1"
+    assert await election.ensure()
+    cancelled = asyncio.Event()
+
+    async def work():
+        # Аренда истекла (например, процесс завис), и её занял другой процесс
+        await redis_client.delete(election.lease_key)
+        assert await other.ensure()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(LeadershipLost):
+        await election.run_as_leader(work())
+    assert cancelled.is_set()
+    assert not election.is_leader
+    # Чужая аренда не освобождается
+    assert await redis_client.get(election.lease_key) == "other:1"
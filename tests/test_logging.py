@@ -0,0 +1,81 @@
+import json
+import logging
+
+import pytest
+
+from app.config import app_config_instance
+from app.tools import logger_config
+from app.tools.logger_config import SamplingFilter, configure_logging, shutdown_logging
+
+
+def _record(name: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 0, "message", None, None)
+
+
+def test_sampling_uses_closest_configured_logger(monkeypatch):
+    sampling = SamplingFilter({"app": 1.0, "app.crud": 0.0})
+    monkeypatch.setattr(logger_config.random, "random", lambda: 0.5)
+
+    assert not sampling.filter(_record("app.crud"))
+    assert not sampling.filter(_record("app.crud.secrets", logging.DEBUG))
+    # Вложенность определяется по частям имени, а не по префиксу строки
+    assert sampling.filter(_record("app.crudely"))
+    assert sampling.filter(_record("app.tools.metrics"))
+    assert sampling.filter(_record("sqlalchemy.engine"))
+
+
+def test_sampling_keeps_warnings_and_samples_by_rate(monkeypatch):
+    sampling = SamplingFilter({"app.crud": 0.25})
+
+    monkeypatch.setattr(logger_config.random, "random", lambda: 0.2)
+    assert sampling.filter(_record("app.crud"))
+    monkeypatch.setattr(logger_config.random, "random", lambda: 0.3)
+    assert not sampling.filter(_record("app.crud"))
+    assert sampling.filter(_record("app.crud", logging.WARNING))
+    assert sampling.filter(_record("app.crud", logging.ERROR))
+
+
+@pytest.fixture
+def fresh_logging(monkeypatch):
+    """
+    configure_logging() с нуля; корневой логгер и поток записи приложения восстанавливаются после теста.
+    """
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    monkeypatch.setattr(logger_config, "_listener", None)
+    monkeypatch.setattr(app_config_instance, "LOG_FORMAT", "json")
+    monkeypatch.setattr(app_config_instance, "LOG_LEVEL", "INFO")
+    monkeypatch.setattr(app_config_instance, "LOG_LEVELS", "")
+    yield
+    shutdown_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_shutdown_flushes_queued_records(fresh_logging, monkeypatch, capsys):
+    monkeypatch.setattr(app_config_instance, "LOG_SAMPLE_RATES", "tests.noisy=0")
+    configure_logging()
+    logger = logging.getLogger("tests.logging")
+    noisy = logging.getLogger("tests.noisy")
+
+    for i in range(500):
+        logger.info("record %s", i, extra={"index": i})
+        noisy.info("dropped %s", i)
+    noisy.warning("kept")
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        logger.exception("failed")
+
+    # Остановка дожидается вывода всего, что уже в очереди
+    shutdown_logging()
+    entries = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+
+    assert [e["index"] for e in entries if "index" in e] == list(range(500))
+    assert entries[0]["message"] == "record 0"
+    assert [e["message"] for e in entries if e["logger"] == "tests.noisy"] == ["kept"]
+    assert "RuntimeError: boom" in entries[-1]["exc_info"]
+    assert logger_config._listener is None
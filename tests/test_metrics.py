@@ -0,0 +1,89 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from app.tools.metrics import HttpMetricsMiddleware, MetricsRegistry, http_request_duration, http_responses
+
+pytestmark = pytest.mark.anyio
+
+
+def test_counter_and_histogram_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("method", "status"))
+    latency = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+
+    requests.inc("GET", "200")
+    requests.inc("GET", "200", amount=2)
+    requests.inc("POST", "4\"0\"4")
+    latency.observe(0.05, "/a")
+    latency.observe(0.1, "/a")
+    latency.observe(0.5, "/a")
+    latency.observe(7, "/a")
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{method="GET",status="200"} 3',
+        'requests_total{method="POST",status="4\\"0\\"4"} 1',
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        # Корзины накопительные, граница включается в корзину (le)
+        'latency_seconds_bucket{route="/a",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a",le="1.0"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 7.65',
+        'latency_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_labels_and_names_are_validated():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests.", ("method",))
+
+    with pytest.raises(ValueError):
+        counter.inc("GET", "200")
+    with pytest.raises(ValueError):
+        registry.counter("requests_total", "Requests.")
+
+
+@pytest.fixture
+async def client():
+    # Маршрут в scope записывают маршруты FastAPI (APIRoute)
+    app = FastAPI()
+
+    @app.get("/items/{item_id}", response_class=PlainTextResponse)
+    async def item(item_id: str):
+        return item_id
+
+    @app.get("/fail")
+    async def fail():
+        raise RuntimeError("boom")
+
+    app.add_middleware(HttpMetricsMiddleware)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+async def test_http_metrics_use_route_template_and_status(client):
+    def responses(route, status):
+        return http_responses._values.get(("GET", route, status), 0)
+
+    def observed(route):
+        state = http_request_duration._values.get(("GET", route))
+        return sum(state[0]) if state else 0
+
+    before = (responses("/items/{item_id}", "200"), responses("unmatched", "404"), responses("/fail", "500"))
+    observed_before = observed("/items/{item_id}")
+
+    assert (await client.get("/items/first")).text == "first"
+    await client.get("/items/second")
+    assert (await client.get("/missing")).status_code == 404
+    assert (await client.get("/fail")).status_code == 500
+
+    after = (responses("/items/{item_id}", "200"), responses("unmatched", "404"), responses("/fail", "500"))
+    assert [a - b for a, b in zip(after, before)] == [2, 1, 1]
+    assert observed("/items/{item_id}") - observed_before == 2
+    # Фактический путь с ключом в метки не попадает
+    assert not any("/items/first" in labels for labels in http_responses._values)
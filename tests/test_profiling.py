@@ -0,0 +1,77 @@
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.config import app_config_instance
+from app.tools.profiling import PROFILE_HEADER, SPAN_CRYPTO, SPAN_REDIS, ProfilingMiddleware, profiled, span
+
+pytestmark = pytest.mark.anyio
+
+
+@profiled(SPAN_REDIS)
+async def _load(item_id: str) -> str:
+    return item_id
+
+
+@pytest.fixture
+def profiling(monkeypatch, tmp_path):
+    monkeypatch.setattr(app_config_instance, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(app_config_instance, "PROFILE_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(app_config_instance, "PROFILE_ADMIN_TOKEN", "admin-token")
+    monkeypatch.setattr(app_config_instance, "PROFILE_SLOW_REQUEST_MS", 60_000)
+    monkeypatch.setattr(app_config_instance, "PROFILE_DUMP_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+async def client():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        value = await _load(item_id)
+        with span(SPAN_CRYPTO, "decrypt"):
+            return {"item": value}
+
+    app.add_middleware(ProfilingMiddleware)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def test_admin_request_gets_breakdown_and_dumped_profile(profiling, client):
+    response = await client.get("/items/secret-key", headers={PROFILE_HEADER: "admin-token"})
+
+    assert response.json() == {"item": "secret-key"}
+    timing = dict(part.split(";dur=") for part in response.headers["Server-Timing"].split(", "))
+    assert set(timing) == {SPAN_REDIS, SPAN_CRYPTO, "other"}
+
+    [dump] = list(profiling.iterdir())
+    profile = json.loads(dump.read_text(encoding="utf-8"))
+    assert profile["id"] == response.headers["X-Profile-Id"]
+    # В профиль попадает шаблон маршрута, а не путь с ключом
+    assert profile["route"] == "/items/{item_id}"
+    assert "secret-key" not in dump.read_text(encoding="utf-8")
+    assert profile["status"] == 200
+    assert [(s["kind"], s["name"]) for s in profile["spans"]] == [(SPAN_REDIS, "_load"), (SPAN_CRYPTO, "decrypt")]
+
+
+async def test_unflagged_and_disabled_requests_are_not_exposed(profiling, client, monkeypatch):
+    response = await client.get("/items/a", headers={PROFILE_HEADER: "wrong"})
+    assert "Server-Timing" not in response.headers
+    assert not list(profiling.iterdir())
+
+    monkeypatch.setattr(app_config_instance, "PROFILING_ENABLED", False)
+    response = await client.get("/items/a", headers={PROFILE_HEADER: "admin-token"})
+    assert "Server-Timing" not in response.headers
+    assert not list(profiling.iterdir())
+
+
+async def test_slow_request_breakdown_is_logged(profiling, client, monkeypatch, caplog):
+    monkeypatch.setattr(app_config_instance, "PROFILE_SLOW_REQUEST_MS", 0)
+    await client.get("/items/a")
+
+    [record] = [r for r in caplog.records if r.getMessage().startswith("Slow request")]
+    assert record.route == "/items/{item_id}"
+    assert set(record.breakdown_ms) == {SPAN_REDIS, SPAN_CRYPTO, "other"}
@@ -0,0 +1,78 @@
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+
+from app.cache import redis_config
+from app.config import app_config_instance
+from app.tools import rate_limiter
+from app.tools.rate_limiter import SCOPE_IP, SCOPE_KEY, RateLimit, RateLimiter, parse_rate, rate_limit
+
+pytestmark = pytest.mark.anyio
+
+
+def test_parse_rate():
+    assert parse_rate("30/60") == (30, 60.0)
+    assert parse_rate("5") == (5, 1.0)
+    assert parse_rate(" ") is None
+    for value in ("x/60", "0/60", "5/0"):
+        with pytest.raises(ValueError):
+            parse_rate(value)
+
+
+async def test_ip_bucket_rejects_after_burst(redis_client):
+    limiter = RateLimiter()
+    limit = RateLimit("test", "2/60")
+
+    assert await limiter.check(limit, "10.0.0.1") == (None, 0)
+    assert await limiter.check(limit, "10.0.0.1") == (None, 0)
+    scope, retry_ms = await limiter.check(limit, "10.0.0.1")
+    assert scope == SCOPE_IP
+    assert 0 < retry_ms <= 30000
+    # Корзины других адресов не затронуты
+    assert await limiter.check(limit, "10.0.0.2") == (None, 0)
+
+
+async def test_key_bucket_is_shared_between_addresses(redis_client):
+    limiter = RateLimiter()
+    limit = RateLimit("test", "10/60", "1/60")
+
+    assert await limiter.check(limit, "10.0.0.1", "k1") == (None, 0)
+    assert (await limiter.check(limit, "10.0.0.2", "k1"))[0] == SCOPE_KEY
+    assert await limiter.check(limit, "10.0.0.2", "k2") == (None, 0)
+
+
+async def test_rejected_request_does_not_spend_tokens(redis_client):
+    limiter = RateLimiter()
+    limit = RateLimit("test", "2/60", "1/60")
+
+    assert await limiter.check(limit, "10.0.0.1", "k1") == (None, 0)
+    assert (await limiter.check(limit, "10.0.0.1", "k1"))[0] == SCOPE_KEY
+    # Отказ по ключу не списал токен из корзины адреса
+    assert await limiter.check(limit, "10.0.0.1", "k2") == (None, 0)
+
+
+async def test_falls_back_to_local_buckets_without_redis(monkeypatch):
+    monkeypatch.setattr(redis_config, "_redis_client", None)
+    limiter = RateLimiter()
+    limit = RateLimit("test", "1/60")
+
+    assert await limiter.check(limit, "10.0.0.1") == (None, 0)
+    assert (await limiter.check(limit, "10.0.0.1"))[0] == SCOPE_IP
+
+
+async def test_dependency_returns_429_with_retry_after(redis_client, monkeypatch):
+    monkeypatch.setattr(app_config_instance, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setitem(rate_limiter.RATE_LIMITS, "secret_read", RateLimit("secret_read", "1/60"))
+
+    app = FastAPI()
+
+    @app.get("/secret/{secret_key}", dependencies=[Depends(rate_limit("secret_read"))])
+    async def read(secret_key: str):
+        return {"secret_key": secret_key}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.get("/secret/k1")).status_code == 200
+        response = await client.get("/secret/k1")
+
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 60
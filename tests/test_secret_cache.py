@@ -0,0 +1,67 @@
+import pytest
+
+from app.cache.expiry_queue import EXPIRY_QUEUE_KEY
+from app.cache.secret_cache import (
+    CONSUME_INVALID_PASSPHRASE,
+    CONSUME_OK,
+    CONSUME_PASSPHRASE_NOT_SET,
+    cache_secret,
+    consume_cached_secret,
+    rewrite_cached_secrets,
+    secret_cache_key
+)
+from app.database.models import Secret
+
+pytestmark = pytest.mark.anyio
+
+
+async def _cache(redis_client, secret_key="k1", digest=None):
+    secret = Secret()
+    secret.set_expiry(60)
+    await cache_secret(redis_client, secret_key, "ciphertext", digest, 60, secret.expires_at)
+
+
+async def test_consume_returns_secret_once(redis_client):
+    await _cache(redis_client, digest="d1")
+
+    assert await consume_cached_secret(redis_client, "k1", "d1") == (CONSUME_OK, "ciphertext")
+    assert not await redis_client.exists(secret_cache_key("k1"))
+    assert await redis_client.zscore(EXPIRY_QUEUE_KEY, "k1") is None
+    # Надгробие ставит вызывающий код после пометки секрета прочитанным в БД
+    assert await consume_cached_secret(redis_client, "k1", "d1") is None
+
+
+async def test_wrong_passphrase_does_not_consume(redis_client):
+    await _cache(redis_client, digest="d1")
+
+    assert await consume_cached_secret(redis_client, "k1", "wrong") == (CONSUME_INVALID_PASSPHRASE, None)
+    assert await consume_cached_secret(redis_client, "k1", None) == (CONSUME_INVALID_PASSPHRASE, None)
+    assert await consume_cached_secret(redis_client, "k1", "d1") == (CONSUME_OK, "ciphertext")
+
+
+async def test_passphrase_for_secret_without_one_does_not_consume(redis_client):
+    await _cache(redis_client)
+
+    assert await consume_cached_secret(redis_client, "k1", "d1") == (CONSUME_PASSPHRASE_NOT_SET, None)
+    assert await consume_cached_secret(redis_client, "k1", None) == (CONSUME_OK, "ciphertext")
+
+
+async def test_miss_without_tombstone(redis_client):
+    assert await consume_cached_secret(redis_client, "missing", None) is None
+
+
+async def test_legacy_entry_is_a_miss(redis_client):
+    await redis_client.hset(secret_cache_key("k1"), mapping={"secret": "ciphertext", "passphrase": "old"})
+
+    assert await consume_cached_secret(redis_client, "k1", None) is None
+    assert await redis_client.exists(secret_cache_key("k1"))
+
+
+async def test_rewrite_does_not_resurrect_consumed_entries(redis_client):
+    await _cache(redis_client, "k1")
+    await _cache(redis_client, "k2")
+    await consume_cached_secret(redis_client, "k2", None)
+
+    assert await rewrite_cached_secrets(redis_client, {"k1": {"secret": "new"}, "k2": {"secret": "new"}}) == 1
+    assert await redis_client.hget(secret_cache_key("k1"), "secret") == "new"
+    assert not await redis_client.exists(secret_cache_key("k2"))
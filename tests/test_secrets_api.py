@@ -0,0 +1,89 @@
+import httpx
+import pytest
+from sqlalchemy import select
+
+from app.database import models
+from app.database.config import AsyncSessionLocal
+from app.main import app
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def client(database, redis_client):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def _create(client, **payload) -> str:
+    response = await client.post("/secret/", json={"secret": "s3cr3t", **payload})
+    assert response.status_code == 200
+    return response.json()["secret_key"]
+
+
+async def _row(secret_key: str) -> models.Secret:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(models.Secret).where(models.Secret.secret_key == secret_key))).scalar_one()
+
+
+@pytest.mark.parametrize("evict_cache", [False, True], ids=["cache", "database"])
+async def test_wrong_passphrase_does_not_consume(client, redis_client, evict_cache):
+    secret_key = await _create(client, passphrase="pw")
+    if evict_cache:
+        await redis_client.flushall()
+
+    assert (await client.get(f"/secret/{secret_key}", params={"passphrase": "bad"})).status_code == 403
+    assert (await client.get(f"/secret/{secret_key}")).status_code == 403
+    response = await client.get(f"/secret/{secret_key}", params={"passphrase": "pw"})
+    assert response.status_code == 200
+    assert response.json()["secret"] == "s3cr3t"
+    assert (await client.get(f"/secret/{secret_key}", params={"passphrase": "pw"})).status_code == 410
+
+
+@pytest.mark.parametrize("evict_cache", [False, True], ids=["cache", "database"])
+async def test_read_purges_payload(client, redis_client, evict_cache):
+    secret_key = await _create(client, passphrase="pw")
+    if evict_cache:
+        await redis_client.flushall()
+
+    assert (await client.get(f"/secret/{secret_key}", params={"passphrase": "pw"})).status_code == 200
+    row = await _row(secret_key)
+    assert row.is_accessed
+    assert (row.encrypted_secret, row.passphrase_digest) == (None, None)
+
+
+async def test_delete_purges_payload_and_chunks(client):
+    secret_key = await _create(client, passphrase="pw")
+    stream_key = (await client.post("/secret/stream", content=b"x" * 100000)).json()["secret_key"]
+
+    assert (await client.delete(f"/secret/{secret_key}")).status_code == 200
+    assert (await client.delete(f"/secret/{stream_key}")).status_code == 200
+
+    row = await _row(secret_key)
+    assert row.is_deleted
+    assert (row.encrypted_secret, row.passphrase_digest) == (None, None)
+    stream_row = await _row(stream_key)
+    async with AsyncSessionLocal() as db:
+        chunks = (await db.execute(
+            select(models.SecretChunk).where(models.SecretChunk.secret_id == stream_row.id)
+        )).all()
+    assert stream_row.encrypted_secret is None
+    assert chunks == []
+
+
+async def test_completed_stream_removes_chunks(client):
+    payload = bytes(range(256)) * 1000
+    stream_key = (await client.post("/secret/stream", content=payload)).json()["secret_key"]
+
+    response = await client.get(f"/secret/{stream_key}/stream")
+    assert response.status_code == 200
+    assert response.content == payload
+
+    row = await _row(stream_key)
+    async with AsyncSessionLocal() as db:
+        chunks = (await db.execute(
+            select(models.SecretChunk).where(models.SecretChunk.secret_id == row.id)
+        )).all()
+    assert row.encrypted_secret is None
+    assert chunks == []
+    assert (await client.get(f"/secret/{stream_key}/stream")).status_code == 410
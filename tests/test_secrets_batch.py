@@ -0,0 +1,62 @@
+import httpx
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import select
+
+from app.cache.secret_cache import secret_cache_key
+from app.config import app_config_instance
+from app.database import models
+from app.database.config import AsyncSessionLocal
+from app.database.schemas import SecretBatchCreate
+from app.main import app
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def client(database, redis_client):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+def test_batch_size_is_validated(monkeypatch):
+    monkeypatch.setattr(app_config_instance, "SECRET_BATCH_MAX_SIZE", 2)
+
+    assert len(SecretBatchCreate(secrets=[{"secret": "a"}, {"secret": "b"}]).secrets) == 2
+    for secrets in ([], [{"secret": "a"}] * 3):
+        with pytest.raises(ValidationError):
+            SecretBatchCreate(secrets=secrets)
+
+
+def test_each_secret_is_validated_like_a_single_one():
+    with pytest.raises(ValidationError):
+        SecretBatchCreate(secrets=[{"secret": "a"}, {"secret": "b", "ttl_seconds": 0}])
+
+
+async def test_keys_are_returned_in_request_order(client, redis_client):
+    secrets = [{"secret": f"s{i}", "passphrase": f"p{i}" if i % 2 else None} for i in range(5)]
+    response = await client.post("/secret/batch", json={"secrets": secrets})
+    assert response.status_code == 200
+    secret_keys = response.json()["secret_keys"]
+    assert len(set(secret_keys)) == 5
+
+    # Половина читается из кеша, половина — из БД
+    await redis_client.delete(*[secret_cache_key(key) for key in secret_keys[::2]])
+    for secret, secret_key in zip(secrets, secret_keys):
+        params = {"passphrase": secret["passphrase"]} if secret["passphrase"] else {}
+        read = await client.get(f"/secret/{secret_key}", params=params)
+        assert read.json() == {"secret": secret["secret"]}
+
+    async with AsyncSessionLocal() as db:
+        logged = (await db.execute(
+            select(models.SecretLog.secret_key).where(models.SecretLog.action == "secret_created")
+        )).scalars().all()
+    assert sorted(logged) == sorted(secret_keys)
+
+
+async def test_invalid_batch_is_rejected_without_creating_secrets(client):
+    response = await client.post("/secret/batch", json={"secrets": [{"secret": "a"}, {"secret": "b", "ttl_seconds": -1}]})
+    assert response.status_code == 422
+
+    async with AsyncSessionLocal() as db:
+        assert (await db.execute(select(models.Secret))).all() == []
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+
+from app.config import app_config_instance
+from app.crud.secrets import create_streamed_secret, get_secret_stream
+from app.database import models
+from app.database.config import AsyncSessionLocal, get_engine
+
+pytestmark = pytest.mark.anyio
+
+
+async def _body(parts, gate: asyncio.Event = None):
+    # Тело запроса: после первой части ждёт gate, как медленный клиент
+    for i, part in enumerate(parts):
+        if i == 1 and gate is not None:
+            await gate.wait()
+        yield part
+
+
+async def _pending_secret() -> models.Secret:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(models.Secret))).scalar_one()
+
+
+async def _chunk_count(secret_id: int) -> int:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(
+            select(func.count()).select_from(models.SecretChunk).where(models.SecretChunk.secret_id == secret_id)
+        )).scalar_one()
+
+
+async def _wait_for_first_batch() -> None:
+    # Сегменты видны другим сессиям только после коммита их пачки
+    for _ in range(500):
+        async with AsyncSessionLocal() as db:
+            if (await db.execute(select(func.count()).select_from(models.SecretChunk))).scalar_one():
+                return
+        await asyncio.sleep(0.01)
+    pytest.fail("No chunks were committed while the upload was waiting for the body")
+
+
+async def _upload(parts, gate: asyncio.Event = None):
+    async with AsyncSessionLocal() as db:
+        return await create_streamed_secret(db, _body(parts, gate), None, 3600, "127.0.0.1")
+
+
+async def test_slow_upload_does_not_hold_a_connection(database, redis_client, monkeypatch):
+    monkeypatch.setattr(app_config_instance, "STREAM_CHUNK_SIZE", 4)
+    parts = [b"a" * 40, b"b" * 10]
+    gate = asyncio.Event()
+    upload = asyncio.ensure_future(_upload(parts, gate))
+
+    # Первая пачка сегментов сохранена, клиент ещё не прислал остальное
+    await _wait_for_first_batch()
+    assert get_engine().sync_engine.pool.checkedout() == 0
+
+    # Незавершённый секрет не читается
+    pending = await _pending_secret()
+    assert pending.encrypted_secret is None
+    async with AsyncSessionLocal() as db:
+        with pytest.raises(HTTPException) as error:
+            await get_secret_stream(db, pending.secret_key)
+    assert error.value.status_code == 404
+
+    gate.set()
+    secret_key = (await upload).secret_key
+    async with AsyncSessionLocal() as db:
+        chunks = await get_secret_stream(db, secret_key)
+        assert b"".join([chunk async for chunk in chunks]) == b"".join(parts)
+
+
+async def test_failed_upload_is_discarded(database, redis_client, monkeypatch):
+    monkeypatch.setattr(app_config_instance, "STREAM_CHUNK_SIZE", 4)
+    monkeypatch.setattr(app_config_instance, "STREAM_MAX_BYTES", 45)
+
+    with pytest.raises(HTTPException) as error:
+        await _upload([b"a" * 40, b"b" * 10])
+    assert error.value.status_code == 413
+
+    secret = await _pending_secret()
+    assert secret.is_deleted
+    assert await _chunk_count(secret.id) == 0
+
+
+async def test_upload_that_outlives_its_secret_fails_with_410(database, redis_client, monkeypatch):
+    monkeypatch.setattr(app_config_instance, "STREAM_CHUNK_SIZE", 4)
+    gate = asyncio.Event()
+    upload = asyncio.ensure_future(_upload([b"a" * 40, b"b" * 10], gate))
+    await _wait_for_first_batch()
+
+    # Секрет истёк во время загрузки, и очистка пометила его удалённым
+    secret = await _pending_secret()
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(models.Secret).where(secret.row_condition()).values(is_deleted=True))
+        await db.commit()
+
+    gate.set()
+    with pytest.raises(HTTPException) as error:
+        await upload
+    assert error.value.status_code == 410
+    assert await _chunk_count(secret.id) == 0
@@ -0,0 +1,95 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import update
+
+from app.cache.expiry_queue import EXPIRY_QUEUE_KEY
+from app.cache.secret_cache import (
+    CONSUME_TOMBSTONE,
+    TOMBSTONE_ACCESSED,
+    TOMBSTONE_DELETED,
+    TOMBSTONE_EXPIRED,
+    cache_secret,
+    consume_cached_secret,
+    evict_cached_secrets,
+    get_tombstone,
+    secret_cache_key
+)
+from app.database import models
+from app.database.config import AsyncSessionLocal
+from app.database.models import Secret
+from app.main import app
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def client(database, redis_client):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def _cache(redis_client, secret_key):
+    secret = Secret()
+    secret.set_expiry(60)
+    await cache_secret(redis_client, secret_key, "ciphertext", None, 60, secret.expires_at)
+
+
+async def _create(client) -> str:
+    response = await client.post("/secret/", json={"secret": "s3cr3t"})
+    assert response.status_code == 200
+    return response.json()["secret_key"]
+
+
+async def test_evict_sets_tombstones(redis_client):
+    await _cache(redis_client, "k1")
+    await _cache(redis_client, "k2")
+
+    assert await evict_cached_secrets(redis_client, ["k1", "k2"], tombstone=TOMBSTONE_DELETED) == 2
+    assert await get_tombstone(redis_client, "k1") == TOMBSTONE_DELETED
+    assert await consume_cached_secret(redis_client, "k2", None) == (CONSUME_TOMBSTONE, TOMBSTONE_DELETED)
+    assert await redis_client.zcard(EXPIRY_QUEUE_KEY) == 0
+
+
+async def test_tombstones_answer_410_for_read_and_404_for_deleted(client, redis_client):
+    read_key = await _create(client)
+    deleted_key = await _create(client)
+
+    assert (await client.get(f"/secret/{read_key}")).status_code == 200
+    assert (await client.delete(f"/secret/{deleted_key}")).status_code == 200
+    assert await get_tombstone(redis_client, read_key) == TOMBSTONE_ACCESSED
+    assert await get_tombstone(redis_client, deleted_key) == TOMBSTONE_DELETED
+
+    assert (await client.get(f"/secret/{read_key}")).status_code == 410
+    assert (await client.get(f"/secret/{deleted_key}")).status_code == 404
+    assert (await client.get("/secret/19700101.missing")).status_code == 404
+
+    # Без надгробий ответ тот же — по данным БД
+    await redis_client.flushall()
+    assert (await client.get(f"/secret/{read_key}")).status_code == 410
+    assert (await client.get(f"/secret/{deleted_key}")).status_code == 404
+
+
+
+async def test_cached_read_of_deleted_secret_does_not_leave_accessed_tombstone(client, redis_client):
+    secret_key = await _create(client)
+    # Секрет удалён в БД, а запись в кеше ещё осталась
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(models.Secret).where(models.Secret.key_condition(secret_key)).values(is_deleted=True))
+        await db.commit()
+
+    assert (await client.get(f"/secret/{secret_key}")).status_code == 404
+    assert await get_tombstone(redis_client, secret_key) is None
+
+
+async def test_cached_read_of_expired_secret_leaves_expired_tombstone(client, redis_client):
+    response = await client.post("/secret/", json={"secret": "s3cr3t", "ttl_seconds": 1})
+    secret_key = response.json()["secret_key"]
+    # Запись в кеше пережила секрет (например, очистка ещё не дошла до него)
+    await redis_client.expire(secret_cache_key(secret_key), 60)
+    await asyncio.sleep(1.1)
+
+    assert (await client.get(f"/secret/{secret_key}")).status_code == 410
+    assert await get_tombstone(redis_client, secret_key) == TOMBSTONE_EXPIRED
+    assert (await client.get(f"/secret/{secret_key}")).status_code == 404